@@ -1,8 +1,23 @@
-import streamlit as st
+import startup  # first, so the first run's timer covers the imports below
+
+import hashlib
+import os
+import sys
+import tempfile
 import time
-import math
 from datetime import datetime
 
+import streamlit as st
+
+import formatting
+import metrics
+from formatting import risk_band
+from metrics import span
+
+# Modules that pull in NumPy / pandas / sklearn (predictor, history, memo,
+# scheduler, batch, inference) are imported inside the page functions that
+# need them, so Dashboard and About renders never pay for them.
+
 st.set_page_config(
     page_title="CO₂ Emission Prediction",
     page_icon="🌿",
@@ -10,243 +25,36 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+BACKGROUND_HTML = """
+<div class="bg-wrap">
+    <div class="blob b1"></div>
+    <div class="blob b2"></div>
+    <div class="blob b3"></div>
+</div>
+"""
+
+@st.cache_resource(show_spinner=False)
+def load_stylesheet(name):
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        css = f.read()
+    return css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+def stylesheet_tag(name):
+    # With static serving on (.streamlit/config.toml) the browser fetches and
+    # caches the file once per content hash; otherwise fall back to inlining.
+    css, digest = load_stylesheet(name)
+    if st.get_option("server.enableStaticServing"):
+        return f'<link rel="stylesheet" href="app/static/{name}?v={digest}">'
+    return f"<style>{css}</style>"
+
 def inject_css():
+    sheets = ["style.css"]
+    if st.session_state.low_power:
+        sheets.append("low_power.css")
     st.markdown(
-        """
-        <style>
-        :root{
-            --bg1:#0b1220;
-            --bg2:#082a3a;
-            --bg3:#1a1040;
-            --glass: rgba(255,255,255,0.10);
-            --stroke: rgba(255,255,255,0.16);
-            --shadow: 0 18px 60px rgba(0,0,0,0.45);
-            --txt: rgba(255,255,255,0.92);
-            --muted: rgba(255,255,255,0.72);
-            --muted2: rgba(255,255,255,0.55);
-            --accent: #7CFFB2;
-            --accent2: #5DE2FF;
-            --warn: #FFD36E;
-            --danger: #FF6B8A;
-            --radius: 22px;
-            --mono: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;
-            --sans: ui-sans-serif, system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial;
-        }
-
-        html, body, [class*="css"]{
-            font-family: var(--sans) !important;
-        }
-
-        .stApp{
-            background: transparent;
-        }
-
-        .bg-wrap{
-            position: fixed;
-            inset: 0;
-            z-index: -2;
-            overflow: hidden;
-            background:
-                radial-gradient(1200px 700px at 15% 15%, rgba(124,255,178,0.20), transparent 55%),
-                radial-gradient(1000px 600px at 85% 25%, rgba(93,226,255,0.18), transparent 55%),
-                radial-gradient(900px 600px at 55% 90%, rgba(255,107,138,0.12), transparent 60%),
-                linear-gradient(120deg, var(--bg1), var(--bg2), var(--bg3));
-            background-size: 200% 200%;
-            animation: gradientShift 14s ease-in-out infinite;
-        }
-
-        @keyframes gradientShift{
-            0%{ background-position: 0% 50%; }
-            50%{ background-position: 100% 50%; }
-            100%{ background-position: 0% 50%; }
-        }
-
-        .blob{
-            position: absolute;
-            width: 420px;
-            height: 420px;
-            filter: blur(48px);
-            opacity: 0.55;
-            border-radius: 999px;
-            transform: translate3d(0,0,0);
-            mix-blend-mode: screen;
-            animation: floaty 10s ease-in-out infinite;
-        }
-        .blob.b1{ left: -120px; top: 10%; background: rgba(124,255,178,0.35); animation-duration: 12s;}
-        .blob.b2{ right: -140px; top: 18%; background: rgba(93,226,255,0.32); animation-duration: 14s;}
-        .blob.b3{ left: 35%; bottom: -160px; background: rgba(255,107,138,0.24); animation-duration: 16s;}
-
-        @keyframes floaty{
-            0%{ transform: translate(0px,0px) scale(1); }
-            50%{ transform: translate(25px,-18px) scale(1.05); }
-            100%{ transform: translate(0px,0px) scale(1); }
-        }
-
-        section[data-testid="stSidebar"]{
-            background: rgba(255,255,255,0.06);
-            backdrop-filter: blur(18px);
-            border-right: 1px solid rgba(255,255,255,0.10);
-        }
-
-        header[data-testid="stHeader"]{
-            background: rgba(0,0,0,0) !important;
-        }
-
-        .kicker{
-            display: inline-flex;
-            align-items: center;
-            gap: 10px;
-            font-family: var(--mono);
-            font-size: 12px;
-            letter-spacing: 0.12em;
-            text-transform: uppercase;
-            color: rgba(255,255,255,0.75);
-            padding: 10px 14px;
-            border-radius: 999px;
-            border: 1px solid rgba(255,255,255,0.14);
-            background: rgba(255,255,255,0.06);
-            box-shadow: 0 10px 30px rgba(0,0,0,0.25);
-            width: fit-content;
-        }
-        .pill-dot{
-            width: 8px; height: 8px;
-            border-radius: 999px;
-            background: var(--accent);
-            box-shadow: 0 0 0 6px rgba(124,255,178,0.12);
-            animation: pulse 2.4s ease-in-out infinite;
-        }
-        @keyframes pulse{
-            0%{ transform: scale(1); opacity: 1;}
-            50%{ transform: scale(1.12); opacity: 0.85;}
-            100%{ transform: scale(1); opacity: 1;}
-        }
-
-        .h1{
-            font-size: clamp(34px, 4vw, 54px);
-            font-weight: 780;
-            line-height: 1.05;
-            letter-spacing: -0.02em;
-            color: rgba(255,255,255,0.92);
-            margin: 0;
-        }
-        .sub{
-            font-size: 16px;
-            color: rgba(255,255,255,0.72);
-            line-height: 1.6;
-            margin-top: 10px;
-            max-width: 72ch;
-        }
-
-        .glass{
-            background: var(--glass);
-            border: 1px solid var(--stroke);
-            border-radius: var(--radius);
-            box-shadow: var(--shadow);
-            backdrop-filter: blur(18px);
-            -webkit-backdrop-filter: blur(18px);
-        }
-
-        .card{
-            padding: 18px 18px;
-            transition: transform 260ms ease, border-color 260ms ease, background 260ms ease, box-shadow 260ms ease;
-        }
-        .card:hover{
-            transform: translateY(-4px);
-            border-color: rgba(255,255,255,0.22);
-            background: rgba(255,255,255,0.12);
-            box-shadow: 0 24px 70px rgba(0,0,0,0.52);
-        }
-
-        .card-title{
-            font-size: 14px;
-            color: rgba(255,255,255,0.82);
-            font-weight: 650;
-            letter-spacing: 0.01em;
-            margin: 0 0 8px 0;
-        }
-        .card-value{
-            font-size: 28px;
-            font-weight: 820;
-            letter-spacing: -0.02em;
-            color: rgba(255,255,255,0.92);
-            margin: 0;
-        }
-        .card-note{
-            font-size: 13px;
-            color: rgba(255,255,255,0.55);
-            margin-top: 6px;
-            line-height: 1.45;
-        }
-
-        .stTextInput input, .stNumberInput input, .stTextArea textarea{
-            background: rgba(255,255,255,0.08) !important;
-            border: 1px solid rgba(255,255,255,0.14) !important;
-            color: rgba(255,255,255,0.92) !important;
-            border-radius: 14px !important;
-            box-shadow: 0 12px 30px rgba(0,0,0,0.18);
-        }
-        .stSelectbox div[data-baseweb="select"] > div{
-            background: rgba(255,255,255,0.08) !important;
-            border: 1px solid rgba(255,255,255,0.14) !important;
-            border-radius: 14px !important;
-            box-shadow: 0 12px 30px rgba(0,0,0,0.18);
-        }
-
-        .stButton > button{
-            border-radius: 14px !important;
-            padding: 10px 14px !important;
-            font-weight: 650 !important;
-            border: 1px solid rgba(255,255,255,0.16) !important;
-            background: rgba(255,255,255,0.10) !important;
-            color: rgba(255,255,255,0.92) !important;
-            transition: transform 200ms ease, box-shadow 200ms ease, background 200ms ease, border-color 200ms ease !important;
-            box-shadow: 0 12px 30px rgba(0,0,0,0.25) !important;
-        }
-        .stButton > button:hover{
-            transform: translateY(-2px);
-            background: rgba(255,255,255,0.14) !important;
-            border-color: rgba(255,255,255,0.24) !important;
-            box-shadow: 0 18px 45px rgba(0,0,0,0.34) !important;
-        }
-
-        .divider{
-            height: 1px;
-            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.18), transparent);
-            margin: 18px 0;
-        }
-
-        .ring{
-            width: 44px;
-            height: 44px;
-            border-radius: 999px;
-            border: 4px solid rgba(255,255,255,0.16);
-            border-top-color: rgba(124,255,178,0.85);
-            animation: spin 0.9s linear infinite;
-            margin: 6px auto 0 auto;
-        }
-        @keyframes spin{
-            to{ transform: rotate(360deg); }
-        }
-
-        .footer{
-            margin-top: 26px;
-            padding: 16px 18px;
-            border-radius: 18px;
-            border: 1px solid rgba(255,255,255,0.12);
-            background: rgba(255,255,255,0.06);
-            color: rgba(255,255,255,0.62);
-            text-align: center;
-        }
-
-        footer {visibility: hidden;}
-        </style>
-
-        <div class="bg-wrap">
-            <div class="blob b1"></div>
-            <div class="blob b2"></div>
-            <div class="blob b3"></div>
-        </div>
-        """,
+        "".join(stylesheet_tag(name) for name in sheets) + BACKGROUND_HTML,
         unsafe_allow_html=True,
     )
 
@@ -255,12 +63,16 @@ def init_state():
         st.session_state.page = "Dashboard"
     if "last_pred" not in st.session_state:
         st.session_state.last_pred = None
-    if "history" not in st.session_state:
-        st.session_state.history = []
     if "units" not in st.session_state:
         st.session_state.units = "kg CO₂"
     if "precision" not in st.session_state:
         st.session_state.precision = 2
+    if "low_power" not in st.session_state:
+        st.session_state.low_power = (
+            st.query_params.get("lowpower", os.environ.get("CO2_LOW_POWER", "0")).lower() in ("1", "true", "yes")
+        )
+    if "progress_threshold_ms" not in st.session_state:
+        st.session_state.progress_threshold_ms = float(os.environ.get("CO2_PROGRESS_THRESHOLD_MS", "150"))
 
 def sidebar_nav():
     with st.sidebar:
@@ -280,8 +92,8 @@ def sidebar_nav():
 
         page = st.radio(
             "Navigation",
-            ["Dashboard", "Predict", "Insights", "About"],
-            index=["Dashboard", "Predict", "Insights", "About"].index(st.session_state.page),
+            ["Dashboard", "Predict", "Batch", "Insights", "About"],
+            index=["Dashboard", "Predict", "Batch", "Insights", "About"].index(st.session_state.page),
         )
         st.session_state.page = page
 
@@ -289,35 +101,138 @@ def sidebar_nav():
         st.markdown("**Preferences**")
         st.session_state.units = st.selectbox("Output Units", ["kg CO₂", "t CO₂"], index=0)
         st.session_state.precision = st.slider("Display Precision", 0, 4, 2)
+        st.session_state.low_power = st.toggle(
+            "Low-power theme",
+            value=st.session_state.low_power,
+            help="Turns off background animations and blur effects for thin clients.",
+        )
 
-def clamp(x, lo, hi):
-    return max(lo, min(hi, x))
+        render_diagnostics()
+
+def render_diagnostics():
+    with st.expander("Diagnostics", expanded=False):
+        render_startup_profile()
+        # Process-wide switch (CO2_SPANS sets the initial value), flipped only
+        # when this session changes it; spans are no-ops while it is off.
+        st.toggle(
+            "Record spans",
+            value=metrics.spans_enabled(),
+            key="spans_enabled",
+            on_change=lambda: metrics.set_spans_enabled(st.session_state.spans_enabled),
+        )
+        if metrics.spans_enabled():
+            render_span_stats()
+
+        registry = sys.modules.get("registry")
+        if registry is not None:
+            version, _ = registry.get_predictor()
+            shadow = registry.get_shadow().stats()
+            st.caption("Model registry")
+            st.markdown(
+                f"""
+                <div class="card-note">
+                    Serving: <b>{version}</b> • Shadow: <b>{shadow["candidate"] or "off"}</b> at {shadow["rate"]:.0%}<br/>
+                    Shadow scored: <b>{shadow["scored"]:,}</b> • Dropped: <b>{shadow["dropped"]:,}</b><br/>
+                    Mean |Δ|: <b>{shadow["mean_abs_delta"]:.2f} g/km</b> • Max |Δ|: <b>{shadow["max_abs_delta"]:.2f} g/km</b><br/>
+                    p99 primary ≤ <b>{shadow["primary_p99_s"] * 1e6:.0f} µs</b> • candidate ≤ <b>{shadow["candidate_p99_s"] * 1e6:.0f} µs</b>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        drift = sys.modules.get("drift")
+        monitors = drift.active_monitors() if drift is not None else {}
+        if "catalog" in monitors:
+            st.caption("Input drift (vs first_project.csv)")
+            st.markdown(
+                f'<div class="card-note">{render_drift_report(monitors["catalog"].report())}</div>',
+                unsafe_allow_html=True,
+            )
+        if "trips" in monitors:
+            st.caption("Trip inputs (validation only)")
+            st.markdown(
+                f'<div class="card-note">{render_drift_report(monitors["trips"].report())}</div>',
+                unsafe_allow_html=True,
+            )
+
+        memo = sys.modules.get("memo")
+        if memo is not None:
+            stats = memo.get_cache().stats()
+            st.caption("Prediction cache (shared across sessions)")
+            st.markdown(
+                f"""
+                <div class="card-note">
+                    Entries: <b>{stats["size"]:,}</b> / {stats["maxsize"]:,}<br/>
+                    Hits: <b>{stats["hits"]:,}</b> • Misses: <b>{stats["misses"]:,}</b> • Hit rate: <b>{stats["hit_rate"]:.0%}</b><br/>
+                    Evictions: <b>{stats["evictions"]:,}</b> • Expired: <b>{stats["expirations"]:,}</b> • Invalidations: <b>{stats["invalidations"]:,}</b>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        scheduler = sys.modules.get("scheduler")
+        if scheduler is not None:
+            sched = scheduler.get_scheduler().stats()
+            st.caption("Micro-batch scheduler")
+            st.markdown(
+                f"""
+                <div class="card-note">
+                    Rows: <b>{sched["rows"]:,}</b> • Batches: <b>{sched["batches"]:,}</b> • Mean batch: <b>{sched["mean_batch"]:.1f}</b><br/>
+                    Latency p50 ≤ <b>{sched["p50_latency_s"] * 1000:.2f} ms</b> • p99 ≤ <b>{sched["p99_latency_s"] * 1000:.2f} ms</b><br/>
+                    Predict call p99 ≤ <b>{sched["p99_predict_s"] * 1000:.2f} ms</b>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+def render_span_stats():
+    stats = metrics.span_stats()
+    st.caption("Spans (this process, all sessions)")
+    if not stats:
+        st.markdown('<div class="card-note">No spans recorded yet</div>', unsafe_allow_html=True)
+        return
+    rows = "<br/>".join(
+        f"{name}: <b>{s['mean_s'] * 1000:.2f} ms</b> mean • p99 ≤ {s['p99_s'] * 1000:.2f} ms • n={s['count']:,}"
+        for name, s in stats.items()
+    )
+    st.markdown(f'<div class="card-note">{rows}</div>', unsafe_allow_html=True)
+
+def render_startup_profile():
+    last = st.session_state.get("last_run")
+    heavy = ", ".join(startup.loaded("numpy", "pandas", "joblib", "sklearn")) or "none"
+    timings = "No completed run yet"
+    if last:
+        timings = (
+            f"First paint: <b>{last.get('first_paint', 0) * 1000:.1f} ms</b> • "
+            f"Full render: <b>{last.get('render_complete', 0) * 1000:.1f} ms</b> ({last.get('page', '')})"
+        )
+    st.caption("Startup (last run)")
+    st.markdown(
+        f"""
+        <div class="card-note">
+            {timings}<br/>
+            Heavy modules loaded: <b>{heavy}</b>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    if startup.is_installed():
+        rows = "".join(
+            f"<br/>{r['cumulative_s'] * 1000:.1f} ms • {r['module']}" for r in startup.top_imports(8)
+        )
+        st.markdown(f'<div class="card-note">Slowest imports (cumulative):{rows}</div>', unsafe_allow_html=True)
+    else:
+        st.caption("Set CO2_PROFILE_STARTUP=1 to record per-module import cost.")
 
 def format_emission(value_kg):
-    if st.session_state.units == "t CO₂":
-        return f"{value_kg/1000:.{st.session_state.precision}f} t CO₂"
-    return f"{value_kg:.{st.session_state.precision}f} kg CO₂"
-
-def dummy_predict(distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph):
-    fuel_factor = {"Petrol": 0.192, "Diesel": 0.171, "CNG": 0.120, "Electric": 0.050}.get(fuel_type, 0.180)
-    vehicle_factor = {"Car": 1.00, "Bike": 0.35, "Bus": 0.22, "Truck": 1.75, "Train": 0.12, "Flight": 2.90}.get(vehicle_type, 1.00)
-
-    speed_penalty = 1.0 + clamp((avg_speed_kmph - 60.0) / 180.0, -0.15, 0.35)
-    passenger_factor = 1.0 / clamp(passengers, 1, 6)
-    payload_factor = 1.0 + clamp(payload_kg / 1200.0, 0.0, 0.8)
+    return formatting.format_emission(value_kg, st.session_state.units, st.session_state.precision)
 
-    base = distance_km * 1000.0 * fuel_factor * vehicle_factor * speed_penalty * payload_factor * passenger_factor
-    noise = (math.sin(distance_km * 0.12) + math.cos(avg_speed_kmph * 0.05)) * 0.02
-    base = base * (1.0 + noise)
-
-    return clamp(base, 0.0, 1e9)
+def get_history():
+    if "history" not in st.session_state:
+        from history import DEFAULT_CAPACITY, HistoryStore
 
-def risk_band(value_kg):
-    if value_kg < 2.5:
-        return "Low", "rgba(124,255,178,0.18)"
-    if value_kg < 12.0:
-        return "Moderate", "rgba(255,211,110,0.18)"
-    return "High", "rgba(255,107,138,0.18)"
+        st.session_state.history = HistoryStore(int(os.environ.get("CO2_HISTORY_CAP", DEFAULT_CAPACITY)))
+    return st.session_state.history
 
 def render_hero():
     left, right = st.columns([1.35, 0.65], gap="large")
@@ -351,7 +266,19 @@ def render_hero():
             unsafe_allow_html=True,
         )
 
+def get_prediction_log():
+    if os.environ.get("CO2_LOG_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    import predlog
+
+    try:
+        return predlog.get_log()
+    except (OSError, predlog.sqlite3.Error):
+        return None
+
 def render_input_section():
+    from predictor import FUEL_TYPES, INPUT_BOUNDS, VEHICLE_TYPES
+
     st.markdown(
         """
         <div class="glass card" style="padding: 18px 18px;">
@@ -368,14 +295,14 @@ def render_input_section():
     c1, c2, c3 = st.columns([1, 1, 1], gap="large")
 
     with c1:
-        distance_km = st.number_input("Distance (km)", min_value=0.0, value=12.0, step=1.0)
-        fuel_type = st.selectbox("Fuel Type", ["Petrol", "Diesel", "CNG", "Electric"])
+        distance_km = st.number_input("Distance (km)", min_value=INPUT_BOUNDS["distance_km"][0], value=12.0, step=1.0)
+        fuel_type = st.selectbox("Fuel Type", FUEL_TYPES)
     with c2:
-        vehicle_type = st.selectbox("Vehicle Type", ["Car", "Bike", "Bus", "Truck", "Train", "Flight"])
-        passengers = st.number_input("Passengers", min_value=1, value=1, step=1)
+        vehicle_type = st.selectbox("Vehicle Type", VEHICLE_TYPES)
+        passengers = st.number_input("Passengers", min_value=INPUT_BOUNDS["passengers"][0], value=1, step=1)
     with c3:
-        payload_kg = st.number_input("Payload (kg)", min_value=0.0, value=0.0, step=10.0)
-        avg_speed_kmph = st.number_input("Average Speed (km/h)", min_value=1.0, value=55.0, step=1.0)
+        payload_kg = st.number_input("Payload (kg)", min_value=INPUT_BOUNDS["payload_kg"][0], value=0.0, step=10.0)
+        avg_speed_kmph = st.number_input("Average Speed (km/h)", min_value=INPUT_BOUNDS["avg_speed_kmph"][0], value=55.0, step=1.0)
 
     st.markdown('<div style="height: 8px;"></div>', unsafe_allow_html=True)
 
@@ -394,25 +321,40 @@ def render_input_section():
         "avg_speed_kmph": avg_speed_kmph,
     }
 
-def render_loading():
-    box = st.container()
-    with box:
-        st.markdown(
-            """
-            <div class="glass card" style="padding: 18px 18px; text-align:center;">
-                <div class="card-title">Running model inference</div>
-                <div class="card-note">Preparing features • Executing prediction • Rendering results</div>
-                <div class="ring"></div>
-                <div style="height: 10px;"></div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-        prog = st.progress(0)
-        for i in range(101):
-            time.sleep(0.008)
-            prog.progress(i)
-        time.sleep(0.08)
+INFERENCE_STAGES = ["Preparing features", "Transforming inputs", "Executing prediction", "Rendering results"]
+
+def render_loading(threshold_s):
+    # Returns (stage, finish). Call stage(i) as INFERENCE_STAGES[i] starts
+    # and finish() once the results are rendered. The timer starts here;
+    # the card and bar appear at the first stage that starts after
+    # threshold_s, so fast requests draw nothing.
+    slot = st.empty()
+    started = time.perf_counter()
+    state = {"bar": None}
+
+    def stage(index):
+        if state["bar"] is None:
+            if time.perf_counter() - started < threshold_s:
+                return
+            with slot.container():
+                st.markdown(
+                    f"""
+                    <div class="glass card" style="padding: 18px 18px; text-align:center;">
+                        <div class="card-title">Running model inference</div>
+                        <div class="card-note">{" • ".join(INFERENCE_STAGES)}</div>
+                        <div class="ring"></div>
+                        <div style="height: 10px;"></div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
+                state["bar"] = st.progress(0)
+        state["bar"].progress(int(100 * index / len(INFERENCE_STAGES)), text=INFERENCE_STAGES[index])
+
+    def finish():
+        slot.empty()
+
+    return stage, finish
 
 def render_results(pred_kg, inputs):
     band, tint = risk_band(pred_kg)
@@ -525,32 +467,213 @@ def page_dashboard():
 
     render_footer()
 
+def get_drift_monitor():
+    import drift
+
+    return drift.get_monitor()
+
+def render_drift_report(report):
+    drifted = ", ".join(report["drifted"]) or "none"
+    return (
+        f'Rows: <b>{report["rows"]:,}</b> • Out of range: <b>{report["out_of_range"]:,}</b> • '
+        f'Unknown categories: <b>{report["unknown"]:,}</b> • Invalid: <b>{report["invalid"]:,}</b><br/>Drifted features: <b>{drifted}</b>'
+    )
+
+def render_explanation(explained, top=4):
+    import explain
+
+    contributions = sorted(explained["contributions"].items(), key=lambda kv: abs(kv[1]), reverse=True)
+    drivers = "<br/>".join(f"{col}: <b>{value:+.1f} g/km</b>" for col, value in contributions[:top])
+    c, d = st.columns([1, 1], gap="large")
+    with c:
+        st.markdown(
+            f"""
+            <div class="glass card">
+                <div class="card-title">Prediction Interval</div>
+                <div class="card-value" style="font-size: 22px;">{explained["lower"]:.1f} – {explained["upper"]:.1f} g/km</div>
+                <div class="card-note">{explain.LEVEL:.0%} interval • standard error <b>{explained["se"]:.1f} g/km</b></div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    with d:
+        st.markdown(
+            f"""
+            <div class="glass card">
+                <div class="card-title">Top Drivers</div>
+                <div class="card-note">vs. training average <b>{explained["baseline"]:.1f} g/km</b><br/>{drivers}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
+def render_catalog_lookup(inputs):
+    with st.expander("Vehicle catalog • trained model", expanded=False):
+        import catalog
+        import registry
+
+        vehicles = catalog.get_catalog()
+        query = st.text_input("Search make / model", placeholder="e.g. toyota cam", key="catalog_query")
+        matches = vehicles.search(query) if query else []
+        if not matches:
+            st.markdown(
+                f'<div class="card-note">{"No matching vehicles" if query else f"{vehicles.size:,} vehicles from first_project.csv"}</div>',
+                unsafe_allow_html=True,
+            )
+            return
+        row = st.selectbox("Vehicle", matches, format_func=vehicles.label, key="catalog_pick")
+
+        features = vehicles.features(row)
+        explained, version = registry.explain_row(features)
+        g_km = explained["pred"]
+        # Observed once per vehicle (and model version) picked, not on every
+        # rerun that redraws it.
+        observed = st.session_state.get("catalog_observed")
+        if observed is None or observed[0] != (row, version):
+            observed = ((row, version), get_drift_monitor().observe(features))
+            st.session_state.catalog_observed = observed
+        for issue in observed[1]:
+            st.warning(issue)
+        trip_kg = g_km * inputs["distance_km"] / 1000.0
+        listed = vehicles.listed_g_km(row)
+        a, b = st.columns([1, 1], gap="large")
+        with a:
+            st.markdown(
+                f"""
+                <div class="glass card">
+                    <div class="card-title">Model Prediction</div>
+                    <div class="card-value" style="font-size: 22px;">{g_km:.1f} g/km</div>
+                    <div class="card-note">Listed: <b>{listed} g/km</b> • {inputs["distance_km"]:.0f} km trip ≈ <b>{format_emission(trip_kg)}</b><br/>Model version: <b>{version}</b></div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+        with b:
+            details = "<br/>".join(f"{col}: <b>{value}</b>" for col, value in features.items())
+            st.markdown(
+                f"""
+                <div class="glass card">
+                    <div class="card-title">Model Features</div>
+                    <div class="card-note">{details}</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+        render_explanation(explained)
+
+def render_sensitivity(inputs):
+    import sweeps
+
+    st.markdown(
+        """
+        <div class="glass card" style="padding: 18px 18px;">
+            <div class="card-title" style="font-size: 15px;">Sensitivity Sweep</div>
+            <div style="color: rgba(255,255,255,0.60); font-size: 13px; margin-top: -2px;">
+                One input varied over a dense grid • every vehicle × fuel pair • other inputs held fixed
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
+
+    c1, c2 = st.columns([1, 1], gap="large")
+    with c1:
+        field = st.selectbox("Sweep input", list(sweeps.SWEEP_FIELDS), format_func=lambda f: sweeps.SWEEP_FIELDS[f][0], key="sweep_field")
+        vehicles = st.multiselect("Vehicle types", sweeps.VEHICLE_TYPES, default=sweeps.VEHICLE_TYPES, key="sweep_vehicles")
+    label, lo, hi = sweeps.SWEEP_FIELDS[field]
+    with c2:
+        lo, hi = st.slider("Range", min_value=lo, max_value=hi, value=(lo, hi), key=f"sweep_range_{field}")
+        if field == "passengers":
+            points = hi - lo + 1
+        else:
+            points = st.select_slider("Grid points", options=[100, 250, 500, 1000, 2000, 5000], value=sweeps.DEFAULT_POINTS, key="sweep_points")
+        fuels = st.multiselect("Fuel types", sweeps.FUEL_TYPES, default=sweeps.FUEL_TYPES, key="sweep_fuels")
+
+    if not vehicles or not fuels:
+        st.markdown('<div class="card-note">Select at least one vehicle type and one fuel type.</div>', unsafe_allow_html=True)
+        return
+
+    hits = sweeps.cache_info().hits
+    t0 = time.perf_counter()
+    result = sweeps.sweep(inputs, field, lo, hi, points, vehicles, fuels)
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    cached = sweeps.cache_info().hits > hits
+
+    values = result["values"]
+    fuel = inputs["fuel_type"] if inputs["fuel_type"] in fuels else fuels[0]
+    vehicle = inputs["vehicle_type"] if inputs["vehicle_type"] in vehicles else vehicles[0]
+    by_vehicle = {label: values}
+    by_vehicle.update({v: result["pred"][i, fuels.index(fuel)] for i, v in enumerate(vehicles)})
+    by_fuel = {label: values}
+    by_fuel.update({f: result["pred"][vehicles.index(vehicle), j] for j, f in enumerate(fuels)})
+
+    a, b = st.columns([1, 1], gap="large")
+    with a:
+        st.markdown(f'<div class="card-note">By vehicle type • fuel: <b>{fuel}</b></div>', unsafe_allow_html=True)
+        st.line_chart(by_vehicle, x=label, y=vehicles)
+    with b:
+        st.markdown(f'<div class="card-note">By fuel type • vehicle: <b>{vehicle}</b></div>', unsafe_allow_html=True)
+        st.line_chart(by_fuel, x=label, y=fuels)
+
+    st.markdown(
+        f"""
+        <div class="card-note">
+            Grid: <b>{len(vehicles)} × {len(fuels)} × {len(values):,}</b> = <b>{result["pred"].size:,}</b> predictions
+            in one batched call • {elapsed_ms:.2f} ms{" (cached)" if cached else ""}
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
 def page_predict():
     render_hero()
     st.markdown('<div style="height: 14px;"></div>', unsafe_allow_html=True)
 
-    run, inputs = render_input_section()
+    with span("render_input_section"):
+        run, inputs = render_input_section()
 
+    render_catalog_lookup(inputs)
+
+    # Run and the sweep are independent: Run always scores the trip, and
+    # the sweep renders below it (or on its own) while the toggle is on.
+    sensitivity = st.toggle("Sensitivity mode", key="sweep_mode")
     if run:
-        render_loading()
-        pred_kg = dummy_predict(
-            distance_km=inputs["distance_km"],
-            fuel_type=inputs["fuel_type"],
-            vehicle_type=inputs["vehicle_type"],
-            passengers=int(inputs["passengers"]),
-            payload_kg=inputs["payload_kg"],
-            avg_speed_kmph=inputs["avg_speed_kmph"],
-        )
+        stage, finish = render_loading(st.session_state.progress_threshold_ms / 1000.0)
+        stage(0)
+        from memo import get_cache
+        from predictor import MODEL_VERSION, prepare_features
+        from scheduler import get_scheduler
+
+        def predict(**f):
+            stage(2)
+            return get_scheduler().predict(f)
+
+        with span("prepare_features"):
+            features = prepare_features(inputs)
+        import drift
+
+        issues = drift.get_trip_monitor().observe(features)
+        stage(1)
+        with span("predict"):
+            # Stage 1 is the cache-key normalization and lookup; predict()
+            # only runs (and enters stage 2) on a miss.
+            pred_kg = get_cache().get_or_compute(features, predict)
+        stage(3)
         st.session_state.last_pred = pred_kg
-        st.session_state.history.append(
-            {
-                "ts": datetime.now().isoformat(timespec="seconds"),
-                "inputs": inputs,
-                "pred_kg": pred_kg,
-            }
-        )
-        render_results(pred_kg, inputs)
-    else:
+        get_history().append(datetime.now(), features, pred_kg)
+        log = get_prediction_log()
+        if log is not None:
+            import registry
+
+            # The trip predictor's version plus the registry model in effect.
+            log.log(features, pred_kg, f"{MODEL_VERSION}+{registry.current_version()}")
+        with span("render_results"):
+            render_results(pred_kg, inputs)
+        for issue in issues:
+            st.warning(issue)
+        finish()
+    elif not sensitivity:
         st.markdown(
             """
             <div class="glass card" style="padding: 18px 18px;">
@@ -561,8 +684,287 @@ def page_predict():
             unsafe_allow_html=True,
         )
 
+    if sensitivity:
+        if run:
+            st.markdown('<div style="height: 14px;"></div>', unsafe_allow_html=True)
+        render_sensitivity(inputs)
+
+    render_footer()
+
+def batch_download(out):
+    # Deferred download: Streamlit reads the scored file only when the
+    # button is clicked, not on every rerun that shows it.
+    out.seek(0)
+    return out.file
+
+def page_batch():
+    import batch
+
+    render_hero()
+    st.markdown('<div style="height: 14px;"></div>', unsafe_allow_html=True)
+
+    st.markdown(
+        """
+        <div class="glass card" style="padding: 18px 18px;">
+            <div class="card-title" style="font-size: 15px;">Batch Scoring</div>
+            <div style="color: rgba(255,255,255,0.60); font-size: 13px; margin-top: -2px;">
+                Upload a fleet CSV with the first_project.csv schema • scored in chunks with the trained model
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
+
+    upload = st.file_uploader("Fleet CSV", type=["csv"])
+    if upload is None:
+        render_footer()
+        return
+
+    intervals = st.checkbox("Add 95% prediction intervals", value=False, key="batch_intervals")
+    if st.button("Score File", use_container_width=False):
+        status = st.empty()
+        out = tempfile.NamedTemporaryFile(mode="w+", suffix=".csv", newline="")
+        import registry
+
+        monitor = get_drift_monitor().empty_like()
+        try:
+            _, compiled = registry.get_predictor()
+            summary = batch.score_csv(
+                upload,
+                out,
+                compiled=compiled,
+                progress=lambda rows: status.caption(f"Scored {rows:,} rows…"),
+                monitor=monitor,
+                intervals=intervals,
+            )
+        except ValueError as exc:
+            out.close()
+            status.error(str(exc))
+            render_footer()
+            return
+        status.empty()
+        # The scored file stays on disk until this session scores another
+        # one (or ends), so the download below can read it on demand.
+        previous = st.session_state.get("batch_output")
+        if previous is not None:
+            previous.close()
+        st.session_state["batch_output"] = out
+        get_drift_monitor().merge(monitor)
+        report = monitor.report()
+
+        a, b, c = st.columns([1, 1, 1], gap="large")
+        with a:
+            st.markdown(
+                f"""
+                <div class="glass card">
+                    <div class="card-title">Rows Scored</div>
+                    <div class="card-value" style="font-size: 22px;">{summary["rows"]:,}</div>
+                    <div class="card-note">Streamed to disk chunk by chunk</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+        with b:
+            st.markdown(
+                f"""
+                <div class="glass card">
+                    <div class="card-title">Mean Intensity</div>
+                    <div class="card-value" style="font-size: 22px;">{summary["mean_pred"]:.1f} g/km</div>
+                    <div class="card-note">Average predicted CO₂ per km</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+        with c:
+            st.markdown(
+                f"""
+                <div class="glass card">
+                    <div class="card-title">Input Drift</div>
+                    <div class="card-value" style="font-size: 22px;">{len(report["drifted"])} / {len(report["features"])}</div>
+                    <div class="card-note">{render_drift_report(report)}</div>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
+        st.download_button(
+            "Download Predictions",
+            data=lambda: batch_download(out),
+            file_name=f"scored_{upload.name}",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
     render_footer()
 
+PAGE_SIZES = [25, 50, 100, 250]
+
+def render_filters(key):
+    from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+    f1, f2 = st.columns([1, 1], gap="large")
+    with f1:
+        vehicle = st.selectbox("Vehicle", ["All"] + VEHICLE_TYPES, key=f"{key}_vehicle")
+    with f2:
+        fuel = st.selectbox("Fuel", ["All"] + FUEL_TYPES, key=f"{key}_fuel")
+    return (None if vehicle == "All" else vehicle), (None if fuel == "All" else fuel)
+
+def render_pager(key, total):
+    # Returns (offset, limit) for the current page; only that slice is ever
+    # sent to st.dataframe.
+    p1, p2, p3 = st.columns([1, 1, 2], gap="large")
+    with p1:
+        limit = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, -(-total // limit))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with p2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    offset = (int(page) - 1) * limit
+    with p3:
+        st.markdown(
+            f"""
+            <div class="card-note" style="padding-top: 34px;">
+                Rows <b>{min(offset + 1, total):,}</b>–<b>{min(offset + limit, total):,}</b> of <b>{total:,}</b> • page {int(page)} / {pages}
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    return offset, limit
+
+def render_history_table(history):
+    from history import SORT_COLUMNS
+
+    vehicle, fuel = render_filters("hist")
+    s1, s2 = st.columns([1, 1], gap="large")
+    with s1:
+        sort_by = st.selectbox("Sort by", SORT_COLUMNS, key="hist_sort")
+    with s2:
+        st.markdown('<div style="height: 28px;"></div>', unsafe_allow_html=True)
+        descending = st.toggle("Descending", value=True, key="hist_desc")
+
+    with span("insights_query"):
+        idx = history.query(sort_by=sort_by, descending=descending, vehicle=vehicle, fuel=fuel)
+    offset, limit = render_pager("hist", len(idx))
+    with span("insights_page"):
+        page = history.columns(idx[offset:offset + limit])
+    st.dataframe(
+        page,
+        use_container_width=True,
+        hide_index=True,
+    )
+
+def log_page_cursors(log, page, limit, vehicle, fuel, total):
+    # Keyset cursors {page: cursor before its first row}, kept per filter and
+    # page size: next/previous pages reuse a known cursor, and a jump walks
+    # the index from the nearest known page. Reset when new rows arrive.
+    key = (vehicle, fuel, limit, total)
+    state = st.session_state.get("log_cursors")
+    if state is None or state[0] != key:
+        state = (key, {1: None})
+        st.session_state.log_cursors = state
+    cursors = state[1]
+    if page not in cursors:
+        known = max(p for p in cursors if p < page)
+        start = cursors[known]
+        cursors[page] = None if known > 1 and start is None else log.cursor((page - known) * limit, start, vehicle_type=vehicle, fuel_type=fuel)
+    return cursors
+
+def render_log_table(log):
+    vehicle, fuel = render_filters("log")
+    total = log.count(vehicle_type=vehicle, fuel_type=fuel)
+    offset, limit = render_pager("log", total)
+    page = offset // limit + 1
+    cursors = log_page_cursors(log, page, limit, vehicle, fuel, total)
+    rows = log.recent(limit, cursors[page], vehicle_type=vehicle, fuel_type=fuel) if page == 1 or cursors[page] else []
+    if rows:
+        cursors[page + 1] = (rows[-1]["ts"], rows[-1]["id"])
+    st.dataframe(
+        {
+            "timestamp": [datetime.fromtimestamp(r["ts"]).isoformat(timespec="seconds") for r in rows],
+            "distance_km": [r["distance_km"] for r in rows],
+            "vehicle": [r["vehicle_type"] for r in rows],
+            "fuel": [r["fuel_type"] for r in rows],
+            "passengers": [r["passengers"] for r in rows],
+            "payload_kg": [r["payload_kg"] for r in rows],
+            "avg_speed": [r["avg_speed_kmph"] for r in rows],
+            "pred_kg": [round(r["pred_kg"], 4) for r in rows],
+            "model": [r["model_version"] for r in rows],
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
+
+def render_fleet_insights():
+    log = get_prediction_log()
+    if log is None:
+        return
+    with span("insights_fleet_summary"):
+        fleet = log.summary()
+    if not fleet["count"]:
+        return
+
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    st.markdown(
+        """
+        <div class="glass card" style="padding: 18px 18px;">
+            <div class="card-title" style="font-size: 15px;">Fleet-wide Log</div>
+            <div style="color: rgba(255,255,255,0.60); font-size: 13px; margin-top: -2px;">
+                All sessions • persisted predictions • aggregated by day, vehicle and fuel
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
+
+    a, b, c = st.columns([1, 1, 1], gap="large")
+    with a:
+        st.markdown(
+            f"""
+            <div class="glass card">
+                <div class="card-title">Logged Predictions</div>
+                <div class="card-value" style="font-size: 22px;">{fleet["count"]:,}</div>
+                <div class="card-note">Across all users and sessions</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    with b:
+        st.markdown(
+            f"""
+            <div class="glass card">
+                <div class="card-title">Fleet Total</div>
+                <div class="card-value" style="font-size: 22px;">{format_emission(fleet["total"])}</div>
+                <div class="card-note">Sum of logged predictions</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    with c:
+        st.markdown(
+            f"""
+            <div class="glass card">
+                <div class="card-title">Fleet Average</div>
+                <div class="card-value" style="font-size: 22px;">{format_emission(fleet["mean"])}</div>
+                <div class="card-note">Mean emission per logged run</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
+    with span("insights_fleet_breakdown"):
+        by_vehicle = log.breakdown("vehicle_type")
+    st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
+    st.bar_chart(
+        {"vehicle": [r["vehicle_type"] for r in by_vehicle], "total_kg": [r["total"] for r in by_vehicle]},
+        x="vehicle",
+        y="total_kg",
+    )
+    render_log_table(log)
+
 def page_insights():
     render_hero()
     st.markdown('<div style="height: 14px;"></div>', unsafe_allow_html=True)
@@ -580,7 +982,8 @@ def page_insights():
     )
     st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True)
 
-    if not st.session_state.history:
+    history = get_history()
+    if not len(history):
         st.markdown(
             """
             <div class="glass card">
@@ -590,13 +993,14 @@ def page_insights():
             """,
             unsafe_allow_html=True,
         )
+        render_fleet_insights()
         render_footer()
         return
 
-    total = sum(item["pred_kg"] for item in st.session_state.history)
-    avg = total / len(st.session_state.history)
-    best = min(item["pred_kg"] for item in st.session_state.history)
-    worst = max(item["pred_kg"] for item in st.session_state.history)
+    total = history.total
+    avg = history.mean
+    best = history.min
+    worst = history.max
 
     a, b, c, d = st.columns([1, 1, 1, 1], gap="large")
     with a:
@@ -645,24 +1049,9 @@ def page_insights():
         )
 
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
-    st.dataframe(
-        [
-            {
-                "timestamp": item["ts"],
-                "distance_km": item["inputs"]["distance_km"],
-                "vehicle": item["inputs"]["vehicle_type"],
-                "fuel": item["inputs"]["fuel_type"],
-                "passengers": item["inputs"]["passengers"],
-                "payload_kg": item["inputs"]["payload_kg"],
-                "avg_speed": item["inputs"]["avg_speed_kmph"],
-                "pred_kg": round(item["pred_kg"], 4),
-            }
-            for item in reversed(st.session_state.history)
-        ],
-        use_container_width=True,
-        hide_index=True,
-    )
+    render_history_table(history)
 
+    render_fleet_insights()
     render_footer()
 
 def page_about():
@@ -690,18 +1079,28 @@ def page_about():
     render_footer()
 
 def main():
-    inject_css()
+    timer = startup.run_timer()
+    if os.environ.get("CO2_METRICS_PORT"):
+        metrics.start_http_server(int(os.environ["CO2_METRICS_PORT"]))
     init_state()
     sidebar_nav()
-
-    if st.session_state.page == "Dashboard":
-        page_dashboard()
-    elif st.session_state.page == "Predict":
-        page_predict()
-    elif st.session_state.page == "Insights":
-        page_insights()
-    else:
-        page_about()
+    inject_css()
+    timer.mark("first_paint")
+
+    with span(f"page_{st.session_state.page.lower()}"):
+        if st.session_state.page == "Dashboard":
+            page_dashboard()
+        elif st.session_state.page == "Predict":
+            page_predict()
+        elif st.session_state.page == "Batch":
+            page_batch()
+        elif st.session_state.page == "Insights":
+            page_insights()
+        else:
+            page_about()
+
+    timer.mark("render_complete")
+    st.session_state.last_run = dict(timer.marks, page=st.session_state.page)
 
 if __name__ == "__main__":
     main()
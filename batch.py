@@ -0,0 +1,93 @@
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+import fastpath
+
+PRED_COLUMN = "Predicted CO2 Emissions(g/km)"
+LOWER_COLUMN = "Prediction Lower(g/km)"
+UPPER_COLUMN = "Prediction Upper(g/km)"
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def iter_scored_chunks(src, chunksize=DEFAULT_CHUNKSIZE, compiled=None, monitor=None, intervals=False):
+    # monitor: optional drift.DriftMonitor that sees every chunk before it
+    # is scored. intervals: also write the explain.py prediction interval.
+    compiled = compiled or fastpath.get_compiled()
+    if intervals:
+        from explain import get_explainer
+
+        explainer = get_explainer(compiled)
+    dtypes = {c: "category" for c in compiled.cat_columns}
+    for chunk in pd.read_csv(src, chunksize=chunksize, dtype=dtypes):
+        missing = [c for c in compiled.feature_columns if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"input is missing required columns: {missing}")
+        if monitor is not None:
+            monitor.observe_frame(chunk)
+        if intervals:
+            explained = explainer.explain_frame(chunk)
+            chunk[PRED_COLUMN] = explained["pred"]
+            chunk[LOWER_COLUMN] = explained["lower"]
+            chunk[UPPER_COLUMN] = explained["upper"]
+        else:
+            chunk[PRED_COLUMN] = compiled.predict_frame(chunk)
+        yield chunk
+
+
+def score_csv(src, dst, chunksize=DEFAULT_CHUNKSIZE, compiled=None, progress=None, monitor=None, intervals=False):
+    # Only one chunk is held in memory at a time; each is appended to dst as
+    # soon as it is scored.
+    rows = 0
+    total = 0.0
+    header = True
+    for chunk in iter_scored_chunks(src, chunksize, compiled, monitor, intervals):
+        chunk.to_csv(dst, mode="w" if header else "a", header=header, index=False)
+        header = False
+        rows += len(chunk)
+        total += float(chunk[PRED_COLUMN].sum())
+        if progress is not None:
+            progress(rows)
+    if header:
+        raise ValueError("input contains no rows")
+    return {"rows": rows, "mean_pred": total / rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV with the first_project.csv schema in chunks.")
+    parser.add_argument("input", help="input CSV path ('-' for stdin)")
+    parser.add_argument("output", help="output CSV path")
+    parser.add_argument("--chunksize", type=int, help=f"rows per chunk with --workers 1 (default {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--workers", type=int, default=1, help="score with a process pool (see parallel.py)")
+    parser.add_argument("--chunk-bytes", type=int, help="bytes of input per task with --workers > 1 (default 16 MiB)")
+    parser.add_argument("--intervals", action="store_true", help="add 95%% prediction interval columns")
+    args = parser.parse_args(argv)
+    if args.workers > 1:
+        if args.intervals:
+            parser.error("--intervals is only supported with --workers 1")
+        if args.chunksize is not None:
+            parser.error("--chunksize applies to --workers 1; use --chunk-bytes with a process pool")
+    elif args.chunk_bytes is not None:
+        parser.error("--chunk-bytes needs --workers > 1; use --chunksize")
+
+    src = sys.stdin if args.input == "-" else args.input
+    t0 = time.perf_counter()
+    if args.workers > 1:
+        from parallel import DEFAULT_CHUNK_BYTES, score_csv_parallel
+
+        summary = score_csv_parallel(src, args.output, workers=args.workers, chunk_bytes=args.chunk_bytes or DEFAULT_CHUNK_BYTES)
+    else:
+        summary = score_csv(src, args.output, chunksize=args.chunksize or DEFAULT_CHUNKSIZE, intervals=args.intervals)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"scored {summary['rows']} rows in {elapsed:.2f}s "
+        f"({summary['rows'] / max(elapsed, 1e-9):,.0f} rows/s), "
+        f"mean {summary['mean_pred']:.2f} g/km -> {args.output}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from inference import BASE_DIR, DATA_PATH
+from train import CACHE_DIR
+
+# Offline micro-benchmarks for the prediction and rendering hot paths.
+#
+#   python bench.py                   run everything, compare with the baseline
+#   python bench.py --quick           skip the largest sizes
+#   python bench.py -k chain --save   run matching cases and store them as the baseline
+#
+# Baselines are per machine (hostname + arch + Python), so numbers from a
+# laptop are never compared with a CI box. A case is flagged when its median
+# is more than --threshold slower than the baseline; the exit status is 1 if
+# anything regressed.
+
+BENCH_DIR = os.path.join(CACHE_DIR, "bench")
+DEFAULT_THRESHOLD = 0.20
+MIN_TIME_S = 0.2
+REPEAT = 5
+# Budget for explain.batch over chain.compiled, checked at EXPLAIN_CHECK_ROWS.
+EXPLAIN_MAX_OVERHEAD = 0.10
+EXPLAIN_CHECK_ROWS = 100_000
+
+SUITES = []
+
+
+def suite(name, sizes, quick_sizes):
+    # Registers setup(size) -> (fn, rows). Setup cost is never timed.
+    def register(setup):
+        SUITES.append({"name": name, "sizes": sizes, "quick_sizes": quick_sizes, "setup": setup})
+        return setup
+    return register
+
+
+def measure(fn, min_time_s=MIN_TIME_S, repeat=REPEAT):
+    # timeit-style: pick a loop count that takes ~min_time_s / repeat, then
+    # report per-call times over `repeat` rounds.
+    fn()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time_s / repeat or number >= 1 << 20:
+            break
+        number *= 10 if elapsed < min_time_s / repeat / 10 else 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    return {"median_s": statistics.median(times), "min_s": min(times), "number": number, "repeat": repeat}
+
+
+def relative_cost(fn, base, rounds=100):
+    # Best-of-rounds time of fn over that of base, interleaved so both see
+    # the same machine load.
+    fn()
+    base()
+    best_fn = best_base = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        base()
+        t1 = time.perf_counter()
+        fn()
+        t2 = time.perf_counter()
+        best_base = min(best_base, t1 - t0)
+        best_fn = min(best_fn, t2 - t1)
+    return best_fn / best_base
+
+
+def _trip_arrays(n, seed=0):
+    from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+    rng = np.random.default_rng(seed)
+    return {
+        "distance_km": rng.uniform(1.0, 500.0, n),
+        "fuel_type": rng.integers(0, len(FUEL_TYPES), n),
+        "vehicle_type": rng.integers(0, len(VEHICLE_TYPES), n),
+        "passengers": rng.integers(1, 7, n),
+        "payload_kg": rng.uniform(0.0, 1500.0, n),
+        "avg_speed_kmph": rng.uniform(5.0, 150.0, n),
+    }
+
+
+@suite("predict.scalar", sizes=(1, 1_000, 100_000), quick_sizes=(1, 1_000))
+def bench_predict_scalar(n):
+    from predictor import FUEL_TYPES, VEHICLE_TYPES, dummy_predict
+
+    arrays = _trip_arrays(n)
+    rows = [
+        (d, FUEL_TYPES[f], VEHICLE_TYPES[v], p, w, s)
+        for d, f, v, p, w, s in zip(*(arrays[k].tolist() for k in arrays))
+    ]
+    return lambda: [dummy_predict(*row) for row in rows], n
+
+
+@suite("predict.batch", sizes=(1, 1_000, 100_000, 1_000_000), quick_sizes=(1, 1_000, 100_000))
+def bench_predict_batch(n):
+    from predictor import dummy_predict_records
+
+    arrays = _trip_arrays(n)
+    return lambda: dummy_predict_records(arrays), n
+
+
+def _vehicle_frame(n):
+    import pandas as pd
+
+    df = pd.read_csv(DATA_PATH)
+    return df.sample(n, replace=True, random_state=0).reset_index(drop=True)
+
+
+@suite("chain.sklearn", sizes=(1, 100, 10_000, 1_000_000), quick_sizes=(1, 100, 10_000))
+def bench_chain_sklearn(n):
+    from inference import get_engine
+
+    engine = get_engine()
+    frame = _vehicle_frame(n)
+    return lambda: engine.predict(frame), n
+
+
+@suite("chain.compiled", sizes=(1, 100, 10_000, 1_000_000), quick_sizes=(1, 100, 10_000))
+def bench_chain_compiled(n):
+    from fastpath import get_compiled
+
+    compiled = get_compiled()
+    frame = _vehicle_frame(n)
+    if n == 1:
+        row = frame.iloc[0].to_dict()
+        return lambda: compiled.predict_row(row), n
+    return lambda: compiled.predict_frame(frame), n
+
+
+@suite("explain.batch", sizes=(1, 100, 10_000, 100_000), quick_sizes=(1, 100, 10_000))
+def bench_explain_batch(n):
+    # Compare with chain.compiled at the same size for the cost of the
+    # contributions and prediction intervals; at EXPLAIN_CHECK_ROWS that
+    # cost must stay within EXPLAIN_MAX_OVERHEAD.
+    from explain import get_explainer
+    from fastpath import get_compiled
+
+    compiled = get_compiled()
+    explainer = get_explainer(compiled)
+    frame = _vehicle_frame(n)
+    if n == 1:
+        row = frame.iloc[0].to_dict()
+        return lambda: explainer.explain_row(row), n
+    if n >= EXPLAIN_CHECK_ROWS:
+        ratio = relative_cost(lambda: explainer.explain_frame(frame), lambda: compiled.predict_frame(frame))
+        assert ratio <= 1.0 + EXPLAIN_MAX_OVERHEAD, f"explain.batch[{n}] costs {ratio - 1.0:+.1%} over chain.compiled (budget {EXPLAIN_MAX_OVERHEAD:.0%})"
+    return lambda: explainer.explain_frame(frame), n
+
+
+@suite("insights.page", sizes=(10, 1_000, 100_000, 1_000_000), quick_sizes=(10, 1_000, 100_000))
+def bench_insights_page(n):
+    # What page_insights does per rerun: the summary cards plus one sorted,
+    # filtered page of the table. The query cache is dropped each call so
+    # this is the cost after a new prediction.
+    from history import HistoryStore
+    from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+    history = HistoryStore(n)
+    arrays = _trip_arrays(n)
+    ts = datetime(2026, 1, 1)
+    for i in range(n):
+        inputs = {
+            "distance_km": arrays["distance_km"][i],
+            "fuel_type": FUEL_TYPES[arrays["fuel_type"][i]],
+            "vehicle_type": VEHICLE_TYPES[arrays["vehicle_type"][i]],
+            "passengers": arrays["passengers"][i],
+            "payload_kg": arrays["payload_kg"][i],
+            "avg_speed_kmph": arrays["avg_speed_kmph"][i],
+        }
+        history.append(ts, inputs, arrays["distance_km"][i] * 0.2)
+
+    def render():
+        history._query_key = None
+        cards = (history.total, history.mean, history.min, history.max)
+        page, matched = history.page(0, 50, sort_by="pred_kg", vehicle=VEHICLE_TYPES[0])
+        return cards, page, matched
+
+    return render, n
+
+
+def scaled_csv(scale):
+    path = os.path.join(BENCH_DIR, f"first_project_x{scale}.csv")
+    if not os.path.exists(path):
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        with open(DATA_PATH, encoding="utf-8") as f:
+            header, *body = f.read().splitlines(keepends=True)
+        if body and not body[-1].endswith("\n"):
+            body[-1] += "\n"
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(header)
+            for _ in range(scale):
+                f.writelines(body)
+        os.replace(tmp, path)
+    return path
+
+
+def _csv_rows(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f) - 1
+
+
+@suite("csv.parse", sizes=(1, 10, 100), quick_sizes=(1, 10))
+def bench_csv_parse(scale):
+    import pandas as pd
+
+    from train import CSV_DTYPES
+
+    path = scaled_csv(scale)
+    dtype = {c: t for c, t in CSV_DTYPES.items() if t is not str}
+    return lambda: pd.read_csv(path, dtype=dtype), _csv_rows(path)
+
+
+@suite("csv.cached", sizes=(1, 10, 100), quick_sizes=(1, 10))
+def bench_csv_cached(scale):
+    from train import load_dataset
+
+    path = scaled_csv(scale)
+    load_dataset(path, BENCH_DIR, refresh=True)
+    return lambda: load_dataset(path, BENCH_DIR), _csv_rows(path)
+
+
+def machine_id():
+    return f"{platform.node()}-{platform.machine()}-py{platform.python_version()}"
+
+
+def baseline_path(bench_dir=BENCH_DIR):
+    return os.path.join(bench_dir, f"baseline-{machine_id()}.json")
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_baseline(results, path):
+    # Merged into the existing file, so saving a filtered run only updates
+    # the cases that ran.
+    merged = load_baseline(path)
+    merged.update(results)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "machine": machine_id(),
+        "saved": datetime.now().isoformat(timespec="seconds"),
+        "numpy": np.__version__,
+        "results": merged,
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def compare(median_s, baseline, threshold):
+    if baseline is None:
+        return None, "new"
+    ratio = median_s / baseline["median_s"]
+    if ratio > 1.0 + threshold:
+        return ratio, "REGRESSION"
+    if ratio < 1.0 - threshold:
+        return ratio, "faster"
+    return ratio, "ok"
+
+
+def run(pattern=None, quick=False, min_time_s=MIN_TIME_S):
+    # Yields (case name, stats) as each case finishes; main() collects them.
+    for entry in SUITES:
+        for size in entry["quick_sizes"] if quick else entry["sizes"]:
+            name = f"{entry['name']}[{size}]"
+            if pattern and pattern not in name:
+                continue
+            fn, rows = entry["setup"](size)
+            stats = measure(fn, min_time_s)
+            stats["rows"] = rows
+            yield name, stats
+
+
+def _fmt_time(seconds):
+    for unit, factor in (("s", 1.0), ("ms", 1e3), ("us", 1e6)):
+        if seconds * factor >= 1.0:
+            return f"{seconds * factor:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and rendering hot paths.")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--baseline", default=None, help=f"baseline file (default {os.path.relpath(baseline_path(), BASE_DIR)})")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_S, help="target seconds per case")
+    parser.add_argument("--json", dest="json_out", help="also write this run's results to a file")
+    args = parser.parse_args(argv)
+
+    path = args.baseline or baseline_path()
+    baseline = load_baseline(path)
+    print(f"machine {machine_id()}; baseline {path if baseline else '(none)'}")
+    print(f"{'case':<28} {'median':>10} {'min':>10} {'rows/s':>12} {'vs base':>9}  status")
+
+    results = {}
+    regressions = []
+    for name, stats in run(args.pattern, args.quick, args.min_time):
+        results[name] = stats
+        ratio, status = compare(stats["median_s"], baseline.get(name), args.threshold)
+        if status == "REGRESSION":
+            regressions.append(name)
+        throughput = stats["rows"] / stats["median_s"]
+        print(
+            f"{name:<28} {_fmt_time(stats['median_s']):>10} {_fmt_time(stats['min_s']):>10} "
+            f"{throughput:>12,.0f} {'' if ratio is None else f'{ratio:.2f}x':>9}  {status}",
+            flush=True,
+        )
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine_id(), "results": results}, f, indent=2, sort_keys=True)
+    if args.save:
+        save_baseline(results, path)
+        print(f"saved {len(results)} results -> {path}")
+    if regressions and not args.save:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import bisect
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+
+from inference import DATA_PATH, DROP_COLUMNS, TARGET_COLUMN, csv_signature, feature_columns_from_csv
+
+MAKE_COLUMN, MODEL_COLUMN, CLASS_COLUMN = DROP_COLUMNS
+DEFAULT_LIMIT = 20
+
+# Sorts after every character that appears in a name, so bisecting for
+# prefix + _HIGH finds the end of the prefix range.
+_HIGH = "\U0010ffff"
+
+
+def _norm(text):
+    return " ".join(str(text).split()).casefold()
+
+
+class VehicleCatalog:
+    # Array-backed copy of first_project.csv with two sorted key lists for
+    # prefix search:
+    #
+    #   make_keys   normalized make names (unique), with the row ranges of
+    #               each make in the record store
+    #   model_keys  "make\0model" per row, so a model prefix within one make
+    #               is one bisect range; all_model_keys drops the make for
+    #               searches across makes
+    #
+    # Rows are stored sorted by (make, model), numeric columns as NumPy arrays
+    # and string columns as small code arrays into per-column label tables.
+
+    def __init__(self, rows, feature_columns):
+        self.feature_columns = list(feature_columns)
+        rows = sorted(rows, key=lambda r: (_norm(r[MAKE_COLUMN]), _norm(r[MODEL_COLUMN])))
+        self.size = len(rows)
+        self.columns = list(rows[0]) if rows else []
+        self.numeric = {}
+        self.labels = {}
+        self.codes = {}
+        for col in self.columns:
+            values = [r[col] for r in rows]
+            for kind, dtype in ((int, np.int64), (float, np.float64)):
+                try:
+                    self.numeric[col] = np.array([kind(v) for v in values], dtype=dtype)
+                    break
+                except ValueError:
+                    continue
+            else:
+                labels = sorted(set(values))
+                lookup = {v: i for i, v in enumerate(labels)}
+                self.labels[col] = labels
+                self.codes[col] = np.array([lookup[v] for v in values], dtype=np.int32)
+
+        makes = [_norm(r[MAKE_COLUMN]) for r in rows]
+        models = [_norm(r[MODEL_COLUMN]) for r in rows]
+        self.model_keys = [f"{mk}\0{md}" for mk, md in zip(makes, models)]
+        self.make_keys = []
+        self.make_ranges = []
+        for i, mk in enumerate(makes):
+            if not self.make_keys or self.make_keys[-1] != mk:
+                self.make_keys.append(mk)
+                self.make_ranges.append([i, i + 1])
+            else:
+                self.make_ranges[-1][1] = i + 1
+        order = sorted(range(self.size), key=lambda i: (models[i], i))
+        self.all_model_keys = [models[i] for i in order]
+        self.all_model_rows = np.array(order, dtype=np.int32)
+
+    @classmethod
+    def from_csv(cls, data_path=DATA_PATH):
+        with open(data_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return cls(rows, feature_columns_from_csv(data_path))
+
+    def value(self, i, col):
+        if col in self.numeric:
+            return self.numeric[col][i].item()
+        return self.labels[col][self.codes[col][i]]
+
+    def record(self, i):
+        return {col: self.value(i, col) for col in self.columns}
+
+    def features(self, i):
+        # Model inputs for row i, in the order the trained model expects.
+        return {col: self.value(i, col) for col in self.feature_columns}
+
+    def listed_g_km(self, i):
+        return self.value(i, TARGET_COLUMN) if TARGET_COLUMN in self.columns else None
+
+    def label(self, i):
+        return (
+            f"{self.value(i, MAKE_COLUMN)} {self.value(i, MODEL_COLUMN)} — "
+            f"{self.value(i, 'Engine Size(L)'):.1f} L, {self.value(i, 'Cylinders')} cyl, "
+            f"{self.value(i, 'Transmission')}, fuel {self.value(i, 'Fuel Type')}"
+        )
+
+    def complete_make(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = _norm(prefix)
+        lo = bisect.bisect_left(self.make_keys, prefix)
+        hi = bisect.bisect_left(self.make_keys, prefix + _HIGH, lo)
+        return [self.value(self.make_ranges[k][0], MAKE_COLUMN) for k in range(lo, min(hi, lo + limit))]
+
+    def complete_model(self, prefix, make=None, limit=DEFAULT_LIMIT):
+        # Row indices whose model starts with prefix, optionally within one make.
+        prefix = _norm(prefix)
+        if make is not None:
+            key = f"{_norm(make)}\0{prefix}"
+            lo = bisect.bisect_left(self.model_keys, key)
+            hi = bisect.bisect_left(self.model_keys, key + _HIGH, lo)
+            return list(range(lo, min(hi, lo + limit)))
+        lo = bisect.bisect_left(self.all_model_keys, prefix)
+        hi = bisect.bisect_left(self.all_model_keys, prefix + _HIGH, lo)
+        return self.all_model_rows[lo:min(hi, lo + limit)].tolist()
+
+    def _leading_make(self, text):
+        # Longest make that the query starts with as a whole word.
+        best = None
+        k = bisect.bisect_right(self.make_keys, text)
+        while k > 0:
+            k -= 1
+            make = self.make_keys[k]
+            if not text.startswith(make[:1]):
+                break
+            if text.startswith(make) and (len(text) == len(make) or text[len(make)] == " "):
+                if best is None or len(make) > len(best):
+                    best = make
+        return best
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        # "toyota cam" -> Camry rows of Toyota; "cam" -> Camry (any make);
+        # "toy" -> the first rows of every make starting with "toy".
+        text = _norm(text)
+        if not text:
+            return []
+        make = self._leading_make(text)
+        if make is not None:
+            return self.complete_model(text[len(make):].strip(), make, limit)
+        found = []
+        for k in range(bisect.bisect_left(self.make_keys, text), len(self.make_keys)):
+            if not self.make_keys[k].startswith(text) or len(found) >= limit:
+                break
+            start, end = self.make_ranges[k]
+            found.extend(range(start, min(end, start + limit - len(found))))
+        seen = set(found)
+        for i in self.complete_model(text, limit=limit):
+            if len(found) >= limit:
+                break
+            if i not in seen:
+                found.append(i)
+        return found
+
+
+_lock = threading.Lock()
+_catalogs = {}
+
+
+def get_catalog(data_path=DATA_PATH):
+    # Built once per process and CSV; rebuilt when the file's mtime or size
+    # changes, the same way inference.get_engine tracks the pickles.
+    key = os.path.abspath(data_path)
+    sig = csv_signature(key)
+    cached = _catalogs.get(key)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    with _lock:
+        cached = _catalogs.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        catalog = VehicleCatalog.from_csv(key)
+        _catalogs[key] = (sig, catalog)
+        return catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the vehicle catalog and predict g/km with the trained model.")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    catalog = get_catalog(args.data)
+    built = time.perf_counter() - t0
+    query = " ".join(args.query)
+    t0 = time.perf_counter()
+    rows = catalog.search(query, args.limit)
+    elapsed = time.perf_counter() - t0
+
+    from fastpath import get_compiled
+
+    compiled = get_compiled()
+    for i in rows:
+        print(f"{compiled.predict_row(catalog.features(i)):>7.1f} g/km (listed {catalog.listed_g_km(i)})  {catalog.label(i)}")
+    print(f"{len(rows)} matches in {elapsed * 1e6:.0f} us; catalog of {catalog.size} rows built in {built * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
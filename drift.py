@@ -0,0 +1,365 @@
+import argparse
+import csv
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from inference import DATA_PATH, csv_signature, feature_columns_from_csv
+from metrics import REGISTRY
+from sketches import QuantileSketch
+
+# Streaming input validation and drift detection for the trained model's
+# features (the first_project.csv schema).
+#
+# The reference profile is built from the CSV: a QuantileSketch per numeric
+# feature, category counts per categorical one, and min/max bounds. A
+# DriftMonitor keeps the same structures for live traffic. Numeric values
+# are buffered and folded into the sketches in blocks, so observe() costs a
+# few comparisons and list appends per row. Missing or non-finite numerics
+# and missing categories are counted as invalid and kept out of the
+# sketches and counts. Memory is bounded by the sketch size plus
+# MAX_CATEGORIES labels per column, and monitors from different workers
+# combine with merge().
+#
+# The trip inputs scored by the scheduler and the HTTP service have no
+# training data; their profile (ReferenceProfile.for_trips) only carries
+# the form's limits and labels, so those monitors validate and record
+# live distributions but report no drift.
+
+FLUSH_EVERY = 1024
+MAX_CATEGORIES = 256
+OTHER_CATEGORY = "__other__"
+MIN_ROWS = 200
+KS_THRESHOLD = 0.10
+TVD_THRESHOLD = 0.10
+
+
+class ReferenceProfile:
+    def __init__(self, num_columns, cat_columns, sketches, counts, bounds=None):
+        self.num_columns = list(num_columns)
+        self.cat_columns = list(cat_columns)
+        self.sketches = sketches
+        self.counts = counts
+        self.bounds = bounds or {c: (sketches[c].min, sketches[c].max) for c in self.num_columns}
+
+    @classmethod
+    def from_csv(cls, data_path=DATA_PATH):
+        features = feature_columns_from_csv(data_path)
+        with open(data_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        num_columns, cat_columns, sketches, counts = [], [], {}, {}
+        for col in features:
+            values = [r[col] for r in rows]
+            try:
+                numbers = np.array([float(v) for v in values], dtype=np.float64)
+            except ValueError:
+                cat_columns.append(col)
+                counts[col] = Counter(values)
+            else:
+                num_columns.append(col)
+                sketches[col] = QuantileSketch()
+                sketches[col].add(numbers)
+        return cls(num_columns, cat_columns, sketches, counts)
+
+    @classmethod
+    def for_trips(cls):
+        # The trip form's inputs (predictor.INPUT_FIELDS), bounded by the
+        # form's limits (predictor.INPUT_BOUNDS); empty sketches and counts.
+        from predictor import INPUT_BOUNDS
+
+        bounds = {col: (float(lo), float(hi)) for col, (lo, hi) in INPUT_BOUNDS.items()}
+        cat_columns = ["fuel_type", "vehicle_type"]
+        return cls(list(bounds), cat_columns, {c: QuantileSketch() for c in bounds}, {c: Counter() for c in cat_columns}, bounds)
+
+
+def ks_statistic(a, b):
+    # Largest gap between the two empirical CDFs, evaluated at every
+    # centroid of either sketch.
+    if not a.count or not b.count:
+        return 0.0
+    points = np.union1d(a.values, b.values)
+    return float(np.max(np.abs(a.cdf(points) - b.cdf(points))))
+
+
+def total_variation(counts, reference):
+    n, m = sum(counts.values()), sum(reference.values())
+    if not n or not m:
+        return 0.0
+    keys = set(counts) | set(reference)
+    return 0.5 * sum(abs(counts.get(k, 0) / n - reference.get(k, 0) / m) for k in keys)
+
+
+class DriftMonitor:
+    def __init__(self, reference, known_categories=None, flush_every=FLUSH_EVERY):
+        # known_categories: {column: labels the encoder was fitted on}. Rows
+        # outside it are the ones OrdinalEncoder scores as -1. Defaults to
+        # the categories seen in the reference data.
+        self.reference = reference
+        self.num_columns = reference.num_columns
+        self.cat_columns = reference.cat_columns
+        self.known = {
+            c: frozenset(known_categories[c] if known_categories else reference.counts[c])
+            for c in self.cat_columns
+        }
+        self.flush_every = flush_every
+        self.rows = 0
+        self.sketches = {c: QuantileSketch() for c in self.num_columns}
+        self.counts = {c: Counter() for c in self.cat_columns}
+        self.out_of_range = Counter()
+        self.unknown = Counter()
+        self.invalid = Counter()
+        self._buffers = {c: [] for c in self.num_columns}
+        self._lock = threading.Lock()
+
+        self.rows_total = REGISTRY.counter("drift_rows_total", "Rows seen by the drift monitor")
+        self.flagged_total = REGISTRY.counter("drift_flagged_rows_total", "Rows with an unknown category, out-of-range or invalid value")
+
+    def empty_like(self):
+        # Same reference and encoder categories, no observations; for a
+        # per-job monitor that is merged into the process-wide one later.
+        return DriftMonitor(self.reference, {c: self.known[c] for c in self.cat_columns}, self.flush_every)
+
+    def _count(self, col, value, n=1):
+        counts = self.counts[col]
+        if value not in counts and len(counts) >= MAX_CATEGORIES:
+            value = OTHER_CATEGORY
+        counts[value] += n
+
+    def observe(self, features):
+        # Returns a list of issues for this row (empty when it looks normal).
+        issues = []
+        full = False
+        with self._lock:
+            self.rows += 1
+            bounds = self.reference.bounds
+            for col in self.num_columns:
+                try:
+                    value = float(features[col])
+                except (KeyError, TypeError, ValueError):
+                    value = math.nan
+                if not math.isfinite(value):
+                    self.invalid[col] += 1
+                    issues.append(f"{col} is missing or not a finite number")
+                    continue
+                lo, hi = bounds[col]
+                if value < lo or value > hi:
+                    self.out_of_range[col] += 1
+                    issues.append(f"{col} = {value:g} outside expected range [{lo:g}, {hi:g}]")
+                buf = self._buffers[col]
+                buf.append(value)
+                full = full or len(buf) >= self.flush_every
+            for col in self.cat_columns:
+                value = features.get(col)
+                if value is None or value != value:
+                    self.invalid[col] += 1
+                    issues.append(f"{col} is missing")
+                    continue
+                value = str(value)
+                self._count(col, value)
+                if value not in self.known[col]:
+                    self.unknown[col] += 1
+                    issues.append(f"{col} = {value!r} not seen in training (scored as unknown)")
+            if full:
+                self._flush()
+        self.rows_total.inc()
+        if issues:
+            self.flagged_total.inc()
+        return issues
+
+    def observe_frame(self, frame):
+        # Vectorized observe() for a batch; returns a boolean array marking
+        # the flagged rows.
+        import pandas as pd
+
+        flagged = np.zeros(len(frame), dtype=bool)
+        with self._lock:
+            self.rows += len(frame)
+            for col in self.num_columns:
+                if col in frame:
+                    values = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                else:
+                    values = np.full(len(frame), np.nan)
+                valid = np.isfinite(values)
+                self.invalid[col] += int(len(values) - valid.sum())
+                flagged |= ~valid
+                values = values[valid]
+                lo, hi = self.reference.bounds[col]
+                bad = (values < lo) | (values > hi)
+                self.out_of_range[col] += int(bad.sum())
+                flagged[valid] |= bad
+                self.sketches[col].add(values)
+            for col in self.cat_columns:
+                if col not in frame:
+                    self.invalid[col] += len(frame)
+                    flagged[:] = True
+                    continue
+                missing = frame[col].isna().to_numpy()
+                self.invalid[col] += int(missing.sum())
+                flagged |= missing
+                values = frame[col][~missing].astype(str)
+                for value, n in values.value_counts().items():
+                    self._count(col, value, int(n))
+                bad = ~values.isin(self.known[col]).to_numpy()
+                self.unknown[col] += int(bad.sum())
+                flagged[~missing] |= bad
+        self.rows_total.inc(len(frame))
+        self.flagged_total.inc(int(flagged.sum()))
+        return flagged
+
+    def _flush(self):
+        for col, buf in self._buffers.items():
+            if buf:
+                self.sketches[col].add(buf)
+                buf.clear()
+
+    def merge(self, other):
+        other.flush()
+        with self._lock:
+            self._flush()
+            self.rows += other.rows
+            for col in self.num_columns:
+                self.sketches[col].merge(other.sketches[col])
+            for col in self.cat_columns:
+                for value, n in other.counts[col].items():
+                    self._count(col, value, n)
+            self.out_of_range.update(other.out_of_range)
+            self.unknown.update(other.unknown)
+            self.invalid.update(other.invalid)
+        return self
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def report(self, min_rows=MIN_ROWS, ks_threshold=KS_THRESHOLD, tvd_threshold=TVD_THRESHOLD):
+        # Per-feature drift scores against the reference: KS statistic for
+        # numeric features, total variation distance for categorical ones.
+        # Drift is only flagged once min_rows rows have been seen.
+        self.flush()
+        with self._lock:
+            features = {}
+            for col in self.num_columns:
+                score = ks_statistic(self.sketches[col], self.reference.sketches[col])
+                live = self.sketches[col]
+                features[col] = {
+                    "kind": "numeric",
+                    "score": score,
+                    "drift": self.rows >= min_rows and score > ks_threshold,
+                    "out_of_range": self.out_of_range[col],
+                    "invalid": self.invalid[col],
+                    "median": float(live.quantile(0.5)) if live.count else None,
+                    "reference_median": float(self.reference.sketches[col].quantile(0.5)) if self.reference.sketches[col].count else None,
+                }
+            for col in self.cat_columns:
+                score = total_variation(self.counts[col], self.reference.counts[col])
+                features[col] = {
+                    "kind": "categorical",
+                    "score": score,
+                    "drift": self.rows >= min_rows and score > tvd_threshold,
+                    "unknown": self.unknown[col],
+                    "invalid": self.invalid[col],
+                    "top": self.counts[col].most_common(3),
+                }
+            return {
+                "rows": self.rows,
+                "out_of_range": sum(self.out_of_range.values()),
+                "unknown": sum(self.unknown.values()),
+                "invalid": sum(self.invalid.values()),
+                "drifted": [c for c, f in features.items() if f["drift"]],
+                "features": features,
+            }
+
+
+_lock = threading.Lock()
+_profiles = {}
+_monitor = None
+_trip_monitor = None
+
+
+def reference_profile(data_path=DATA_PATH):
+    # Built once per process; rebuilt when the CSV's mtime or size changes.
+    key = os.path.abspath(data_path)
+    sig = csv_signature(key)
+    cached = _profiles.get(key)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    with _lock:
+        cached = _profiles.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        profile = ReferenceProfile.from_csv(key)
+        _profiles[key] = (sig, profile)
+        return profile
+
+
+def encoder_categories(compiled):
+    return {col: [str(c) for c in cats.tolist()] for col, cats in zip(compiled.cat_columns, compiled.categories)}
+
+
+def get_monitor():
+    # Process-wide monitor for the serving path. Unknown categories are
+    # judged against the encoder of the predictor that was current when
+    # the monitor was created.
+    global _monitor
+    if _monitor is None:
+        from registry import get_predictor
+
+        _, compiled = get_predictor()
+        profile = reference_profile()
+        with _lock:
+            if _monitor is None:
+                _monitor = DriftMonitor(profile, encoder_categories(compiled))
+    return _monitor
+
+
+def get_trip_monitor():
+    # Process-wide monitor for trip inputs (the scheduler, the HTTP service
+    # and the Predict page's Run button).
+    global _trip_monitor
+    if _trip_monitor is None:
+        with _lock:
+            if _trip_monitor is None:
+                from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+                known = {"fuel_type": FUEL_TYPES, "vehicle_type": VEHICLE_TYPES}
+                _trip_monitor = DriftMonitor(ReferenceProfile.for_trips(), known)
+    return _trip_monitor
+
+
+def active_monitors():
+    # The process-wide monitors created so far, for diagnostics that should
+    # not build one (and its reference profile) just to show it.
+    return {name: m for name, m in (("catalog", _monitor), ("trips", _trip_monitor)) if m is not None}
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Check a CSV (first_project.csv schema) for drift against the training data.")
+    parser.add_argument("input")
+    parser.add_argument("--reference", default=DATA_PATH)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    from fastpath import get_compiled
+
+    monitor = DriftMonitor(reference_profile(args.reference), encoder_categories(get_compiled()))
+    t0 = time.perf_counter()
+    for chunk in pd.read_csv(args.input, chunksize=args.chunksize, dtype={c: str for c in monitor.cat_columns}):
+        monitor.observe_frame(chunk)
+    elapsed = time.perf_counter() - t0
+    report = monitor.report()
+    print(f"{report['rows']} rows in {elapsed:.2f}s; {report['out_of_range']} out-of-range values, {report['unknown']} unknown categories")
+    for col, f in report["features"].items():
+        extra = f"out of range {f['out_of_range']}" if f["kind"] == "numeric" else f"unknown {f['unknown']}"
+        print(f"  {'DRIFT' if f['drift'] else 'ok':<6} {col:<36} {'KS' if f['kind'] == 'numeric' else 'TVD'} {f['score']:.3f}  {extra}")
+    if report["drifted"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
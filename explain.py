@@ -0,0 +1,266 @@
+import argparse
+import math
+import threading
+import time
+
+import numpy as np
+
+import fastpath
+from inference import DATA_PATH
+
+# Per-row explanations and prediction intervals for the linear model.
+#
+# At train time fit_stats() records, in the model's own design space
+# z = [scaled numerics, ordinal codes]:
+#
+#   explain_xtx_inv   (Z^T Z)^-1 with an intercept column, (p+1) x (p+1)
+#   explain_mean      training mean of z (the contribution baseline)
+#   explain_residual  [residual variance, degrees of freedom, level, t]
+#
+# They are stored as extra sections of the flat export. Per row, with
+# q = L^T [1, z] for a factor L L^T = (Z^T Z)^-1:
+#
+#   contributions  coef * (z - mean), summing to prediction - baseline
+#   se             sqrt(sigma^2 * (1 + |q|^2)), the prediction standard error
+#   lower/upper    prediction -/+ t * se
+
+LEVEL = 0.95
+# Rows per block in Explainer.explain_columns: enough to amortize the
+# per-block NumPy calls, few enough that a block stays in cache.
+EXPLAIN_BLOCK = 1 << 13
+
+
+def fit_stats(x, y, pred, level=LEVEL):
+    # x: the matrix the LinearRegression was fitted on (feature order),
+    # y: targets, pred: the model's predictions for x.
+    x = np.asarray(x, dtype=np.float64)
+    z = np.hstack([np.ones((len(x), 1)), x])
+    resid = np.asarray(y, dtype=np.float64) - np.asarray(pred, dtype=np.float64)
+    return gram_stats(z.T @ z, float(resid @ resid), level)
+
+
+def gram_stats(gram, rss, level=LEVEL):
+    # The same statistics from accumulated sums, for models fitted without
+    # the rows at hand (online.OnlineRegression): gram = [1, Z]^T [1, Z]
+    # and rss the residual sum of squares.
+    from scipy.stats import t
+
+    gram = np.asarray(gram, dtype=np.float64)
+    n, p = int(round(gram[0, 0])), len(gram) - 1
+    dof = n - p - 1
+    if dof <= 0:
+        raise ValueError(f"{n} rows are too few for {p} features")
+    return {
+        "explain_xtx_inv": np.linalg.pinv(gram),
+        "explain_mean": gram[0, 1:] / gram[0, 0],
+        "explain_residual": np.array([rss / dof, dof, level, t.ppf(0.5 + level / 2.0, dof)]),
+    }
+
+
+def code_values(compiled, k):
+    # z value per ordinal code of categorical k, indexed like
+    # compiled.term_arrays[k]: the unknown category's value (NaN when the
+    # encoder rejects unknowns) sits in the last slot, for code -1.
+    unknown = np.nan if compiled.unknown_value is None else float(compiled.unknown_value)
+    return np.append(np.arange(len(compiled.categories[k]), dtype=np.float64), unknown)
+
+
+def model_design(compiled, columns):
+    # z for raw feature columns: (x - center) / scale for numerics, ordinal
+    # codes for categoricals.
+    n = len(columns[compiled.feature_columns[0]])
+    z = np.empty((n, len(compiled.feature_columns)), dtype=np.float64)
+    for j, (pos, col) in enumerate(zip(compiled.num_pos, compiled.num_columns)):
+        z[:, pos] = (np.asarray(columns[col], dtype=np.float64) - compiled.center[j]) / compiled.scale[j]
+    for k, (pos, col) in enumerate(zip(compiled.cat_pos, compiled.cat_columns)):
+        z[:, pos] = code_values(compiled, k)[compiled.cat_codes(k, columns[col])]
+    return z
+
+
+class Explainer:
+    # Works on the centered design D = z - mean (features x rows, one
+    # contiguous row per feature): numeric slots cost one multiply and
+    # subtract, categorical ones are a gather by the compiled predictor's
+    # codes. With S the centered scatter matrix of the training design,
+    # z~^T (Z^T Z)^-1 z~ = 1/n + d^T S^-1 d, so for a factor L L^T = S^-1
+    # the prediction (baseline + coef . d) and q = L^T d come out of one
+    # small matmul over D. Contributions are coef * D.
+
+    def __init__(self, compiled, stats):
+        self.compiled = compiled
+        self.feature_columns = compiled.feature_columns
+        coef = compiled.coef
+
+        xtx_inv = np.asarray(stats["explain_xtx_inv"], dtype=np.float64)
+        mean = np.asarray(stats["explain_mean"], dtype=np.float64)
+        self.sigma2, self.dof, self.level, self.t_crit = (float(v) for v in stats["explain_residual"])
+        self.baseline = compiled.intercept + float(coef @ mean)
+        self.coef = coef
+
+        # D_j = x_j / scale_j - (mean_j + center_j / scale_j) for numerics,
+        # code - mean_j for categoricals.
+        num = compiled.num_pos
+        self.num_inv_scale = 1.0 / compiled.scale
+        self.num_offset = mean[num] + compiled.center / compiled.scale
+        self.cat_deltas = [code_values(compiled, k) - mean[pos] for k, pos in enumerate(compiled.cat_pos)]
+
+        # Block inverse of Z~^T Z~ with Z~ = [1, Z]: the lower-right block is
+        # S^-1 and the corner is 1/n + mean^T S^-1 mean. Any factor with
+        # L L^T = S^-1 works; eigh also copes with a semi-definite
+        # pseudo-inverse.
+        s_inv = xtx_inv[1:, 1:]
+        self.leverage0 = float(xtx_inv[0, 0] - mean @ s_inv @ mean)
+        vals, vecs = np.linalg.eigh(s_inv)
+        factor = vecs * np.sqrt(np.clip(vals, 0.0, None))
+        p = len(self.feature_columns)
+        weights = np.empty((1 + p, p))
+        weights[0] = coef
+        weights[1:] = factor.T
+        self.weights = weights
+
+    def explain_columns(self, columns):
+        # Dict of per-row arrays: pred, lower/upper (prediction interval at
+        # self.level), se, and contributions (rows x features, summing to
+        # pred - baseline). All of them are views into one (4 + features,
+        # rows) array, filled block by block so each block's D, q and
+        # bounds are computed while they are still in cache; D is written
+        # straight into the contribution rows and scaled by coef in place.
+        compiled = self.compiled
+        n = len(columns[self.feature_columns[0]])
+        p = len(self.feature_columns)
+        out = np.empty((4 + p, n), dtype=np.float64)
+        num = [(pos, np.asarray(columns[col], dtype=np.float64), self.num_inv_scale[j], self.num_offset[j]) for j, (pos, col) in enumerate(zip(compiled.num_pos, compiled.num_columns))]
+        cat = [(pos, compiled.cat_codes(k, columns[col]), self.cat_deltas[k]) for k, (pos, col) in enumerate(zip(compiled.cat_pos, compiled.cat_columns))]
+        scratch = np.empty((1 + p, min(n, EXPLAIN_BLOCK)), dtype=np.float64)
+        coef = self.coef[:, None]
+        extra = 1.0 + self.leverage0
+        for start in range(0, n, EXPLAIN_BLOCK):
+            block = slice(start, start + EXPLAIN_BLOCK)
+            pred, lower, upper, se = out[:4, block]
+            d = out[4:, block]
+            for pos, values, inv_scale, offset in num:
+                row = d[pos]
+                np.multiply(values[block], inv_scale, out=row)
+                row -= offset
+            for pos, codes, deltas in cat:
+                np.take(deltas, codes[block], out=d[pos])
+            w = np.matmul(self.weights, d, out=scratch[:, :d.shape[1]])
+            np.add(w[0], self.baseline, out=pred)
+            q = w[1:]
+            np.einsum("ij,ij->j", q, q, out=se)
+            se += extra
+            se *= self.sigma2
+            np.sqrt(se, out=se)
+            np.multiply(se, self.t_crit, out=lower)
+            np.add(pred, lower, out=upper)
+            np.subtract(pred, lower, out=lower)
+            d *= coef
+        return {
+            "pred": out[0],
+            "lower": out[1],
+            "upper": out[2],
+            "se": out[3],
+            "contributions": out[4:].T,
+        }
+
+    def explain_frame(self, frame):
+        # Categorical columns stay Series so a category dtype reaches cat_codes.
+        columns = {c: frame[c].to_numpy() for c in self.compiled.num_columns}
+        columns.update((c, frame[c]) for c in self.compiled.cat_columns)
+        return self.explain_columns(columns)
+
+    def explain_row(self, row):
+        # Scalar path for one dict row; same dict keys as explain_columns
+        # but plain floats, contributions as {feature: g/km}, plus baseline.
+        compiled = self.compiled
+        d = np.empty(len(self.feature_columns), dtype=np.float64)
+        for j, (pos, col) in enumerate(zip(compiled.num_pos, compiled.num_columns)):
+            d[pos] = row[col] * self.num_inv_scale[j] - self.num_offset[j]
+        for k, (pos, col) in enumerate(zip(compiled.cat_pos, compiled.cat_columns)):
+            code = compiled.codes[k].get(row[col], -1)
+            if code < 0 and compiled.unknown_value is None:
+                raise ValueError(f"unknown category {row[col]!r} for {col}")
+            d[pos] = self.cat_deltas[k][code]
+        out = self.weights @ d
+        q = out[1:]
+        pred = float(out[0]) + self.baseline
+        se = math.sqrt(self.sigma2 * (1.0 + self.leverage0 + float(q @ q)))
+        half = self.t_crit * se
+        d *= self.coef
+        return {
+            "pred": pred,
+            "lower": pred - half,
+            "upper": pred + half,
+            "se": se,
+            "contributions": dict(zip(self.feature_columns, d.tolist())),
+            "baseline": self.baseline,
+        }
+
+
+def training_stats(compiled, data_path=DATA_PATH, level=LEVEL):
+    # Rebuilds the statistics from the notebook's training split, for flat
+    # exports made without them. Exact for artifacts fitted by train.py on
+    # data_path; an approximation for models updated online since.
+    from sklearn.model_selection import train_test_split
+
+    from train import RANDOM_STATE, TEST_SIZE, load_dataset, split_features
+
+    x, y, _, _ = split_features(load_dataset(data_path))
+    x_train, _, y_train, _ = train_test_split(x, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    columns = {c: x_train[c].to_numpy() for c in compiled.feature_columns}
+    return fit_stats(model_design(compiled, columns), y_train.to_numpy(), compiled.predict_columns(columns), level)
+
+
+_lock = threading.Lock()
+
+
+def get_explainer(compiled=None, data_path=DATA_PATH):
+    # Built once per compiled predictor (so a registry swap gets a fresh one).
+    compiled = compiled or fastpath.get_compiled()
+    if compiled.explainer is None:
+        with _lock:
+            if compiled.explainer is None:
+                stats = compiled.explain_stats
+                if stats is None:
+                    stats = training_stats(compiled, data_path)
+                compiled.explainer = Explainer(compiled, stats)
+    return compiled.explainer
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Compare plain and explained batch prediction on first_project.csv rows.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    compiled = fastpath.get_compiled()
+    explainer = get_explainer(compiled)
+    frame = pd.read_csv(DATA_PATH, dtype={c: "category" for c in compiled.cat_columns})
+    frame = frame.sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+    columns = {c: frame[c].to_numpy() for c in compiled.num_columns}
+    columns.update((c, frame[c]) for c in compiled.cat_columns)
+
+    # Interleaved so both see the same machine load; best of --repeat.
+    plain = explained = float("inf")
+    compiled.predict_columns(columns)
+    explainer.explain_columns(columns)
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        compiled.predict_columns(columns)
+        t1 = time.perf_counter()
+        explainer.explain_columns(columns)
+        t2 = time.perf_counter()
+        plain = min(plain, t1 - t0)
+        explained = min(explained, t2 - t1)
+    result = explainer.explain_columns(columns)
+    diff = float(np.max(np.abs(result["pred"] - compiled.predict_columns(columns))))
+    gap = float(np.max(np.abs(result["contributions"].sum(axis=1) + explainer.baseline - result["pred"])))
+    print(f"{args.rows} rows: predict {plain * 1000:.2f} ms, explain {explained * 1000:.2f} ms ({explained / plain - 1:+.1%})")
+    print(f"max |pred - compiled| {diff:.2e}; max |sum(contrib) + baseline - pred| {gap:.2e}")
+    print(f"{explainer.level:.0%} interval half-width: median {np.median(result['upper'] - result['pred']):.2f} g/km")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import numpy as np
+
+import inference
+
+
+class CompiledPredictor:
+    # encoder -> scaler -> LinearRegression folded into one weight vector:
+    #   numeric slot j:     coef_j / scale_j   (center folded into the bias)
+    #   categorical slot k: 1.0, the slot holds terms_k[category] = coef_k * code
+    # so a prediction is bias + buf @ weights. Batches map labels to codes
+    # once per distinct label and gather from term_arrays, whose last slot
+    # is the unknown-category term (code -1).
+
+    def __init__(self, feature_columns, cat_columns, categories, coef, intercept, center=None, scale=None, unknown_value=-1.0, explain_stats=None):
+        self.feature_columns = list(feature_columns)
+        self.cat_columns = list(cat_columns)
+        self.num_columns = [c for c in self.feature_columns if c not in self.cat_columns]
+        self.unknown_value = unknown_value
+
+        coef = np.asarray(coef, dtype=np.float64)
+        n_num = len(self.num_columns)
+        center = np.zeros(n_num) if center is None else np.asarray(center, dtype=np.float64)
+        scale = np.ones(n_num) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.center = center
+        self.scale = scale
+
+        self.num_pos = np.array([self.feature_columns.index(c) for c in self.num_columns], dtype=np.intp)
+        self.cat_pos = np.array([self.feature_columns.index(c) for c in self.cat_columns], dtype=np.intp)
+
+        weights = np.ones(len(self.feature_columns), dtype=np.float64)
+        weights[self.num_pos] = coef[self.num_pos] / scale
+        self.weights = weights
+        self.bias = float(intercept) - float(np.sum(coef[self.num_pos] * center / scale))
+
+        self.categories = [np.asarray(cats) for cats in categories]
+        self.terms = []
+        self.unknown_terms = []
+        self.codes = []
+        self.term_arrays = []
+        for pos, cats in zip(self.cat_pos, self.categories):
+            labels = cats.tolist()
+            self.terms.append({cat: coef[pos] * i for i, cat in enumerate(labels)})
+            self.unknown_terms.append(None if unknown_value is None else coef[pos] * float(unknown_value))
+            self.codes.append({cat: i for i, cat in enumerate(labels)})
+            unknown = np.nan if unknown_value is None else self.unknown_terms[-1]
+            self.term_arrays.append(np.append(coef[pos] * np.arange(len(labels), dtype=np.float64), unknown))
+
+        # Training-time statistics for explain.Explainer (None when the
+        # artifacts were exported without them); the explainer itself is
+        # built on first use and cached here.
+        self.explain_stats = explain_stats
+        self.explainer = None
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_engine(cls, engine):
+        enc, sc, model = engine.encoder, engine.scaler, engine.model
+        unknown = enc.unknown_value if enc.handle_unknown == "use_encoded_value" else None
+        return cls(
+            feature_columns=engine.feature_columns,
+            cat_columns=engine.cat_columns,
+            categories=enc.categories_,
+            coef=model.coef_,
+            intercept=model.intercept_,
+            center=getattr(sc, "center_", None),
+            scale=getattr(sc, "scale_", None),
+            unknown_value=unknown,
+        )
+
+    def _buffer(self):
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = np.empty(len(self.feature_columns), dtype=np.float64)
+            self._local.buf = buf
+        return buf
+
+    def _cat_term(self, k, value):
+        term = self.terms[k].get(value)
+        if term is not None:
+            return term
+        if self.unknown_terms[k] is None:
+            raise ValueError(f"unknown category {value!r} for {self.cat_columns[k]}")
+        return self.unknown_terms[k]
+
+    def predict_row(self, row):
+        buf = self._buffer()
+        for pos, col in zip(self.num_pos, self.num_columns):
+            buf[pos] = row[col]
+        for k, (pos, col) in enumerate(zip(self.cat_pos, self.cat_columns)):
+            buf[pos] = self._cat_term(k, row[col])
+        return self.bias + float(buf @ self.weights)
+
+    def cat_codes(self, k, values):
+        # Ordinal codes for a column of labels, -1 for labels the encoder has
+        # not seen (and for missing values). A category-dtype column already
+        # carries codes; anything else goes through pd.factorize. Either way
+        # only the distinct labels go through the dict.
+        import pandas as pd
+
+        values = getattr(values, "array", values)
+        if isinstance(values, pd.Categorical):
+            local, uniques = values.codes, values.categories
+        else:
+            local, uniques = pd.factorize(values)
+        index = self.codes[k]
+        lookup = np.empty(len(uniques) + 1, dtype=np.intp)
+        lookup[:-1] = [index.get(u, -1) for u in uniques]
+        lookup[-1] = -1
+        codes = lookup[local]
+        if self.unknown_terms[k] is None and len(codes) and codes.min() < 0:
+            bad = np.asarray(values, dtype=object)[int(np.argmin(codes))]
+            raise ValueError(f"unknown category {bad!r} for {self.cat_columns[k]}")
+        return codes
+
+    def cat_terms(self, k, values):
+        return self.term_arrays[k][self.cat_codes(k, values)]
+
+    def predict_columns(self, columns):
+        n = len(columns[self.feature_columns[0]])
+        x = np.empty((n, len(self.feature_columns)), dtype=np.float64)
+        for pos, col in zip(self.num_pos, self.num_columns):
+            x[:, pos] = columns[col]
+        for k, (pos, col) in enumerate(zip(self.cat_pos, self.cat_columns)):
+            x[:, pos] = self.cat_terms(k, columns[col])
+        return x @ self.weights + self.bias
+
+    def predict_frame(self, frame):
+        # Categorical columns stay Series so a category dtype reaches cat_codes.
+        columns = {c: frame[c].to_numpy() for c in self.num_columns}
+        columns.update((c, frame[c]) for c in self.cat_columns)
+        return self.predict_columns(columns)
+
+
+def get_compiled(artifact_dir=inference.BASE_DIR):
+    # Prefer the flat export (no sklearn/unpickling) when it was made from the
+    # current pickles; otherwise compile from the loaded sklearn objects.
+    import flatmodel
+
+    compiled = flatmodel.load_current(artifact_dir)
+    if compiled is not None:
+        return compiled
+    engine = inference.get_engine(artifact_dir)
+    compiled = engine.compiled
+    if compiled is None:
+        compiled = CompiledPredictor.from_engine(engine)
+        engine.compiled = compiled
+    return compiled
+
+
+def _timeit(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def benchmark(batch_sizes=(1, 100, 10_000), data_path=inference.DATA_PATH):
+    import pandas as pd
+
+    engine = inference.get_engine()
+    compiled = get_compiled()
+    # Categoricals parsed as batch.py does.
+    df = pd.read_csv(data_path, dtype={c: "category" for c in compiled.cat_columns})
+    results = []
+    for n in batch_sizes:
+        frame = df.sample(n, replace=True, random_state=0).reset_index(drop=True)
+        expected = engine.predict(frame)
+        if n == 1:
+            row = frame.iloc[0].to_dict()
+            got = np.array([compiled.predict_row(row)])
+            fast = lambda: compiled.predict_row(row)
+        else:
+            got = compiled.predict_frame(frame)
+            fast = lambda: compiled.predict_frame(frame)
+        max_err = float(np.max(np.abs(got - expected)))
+        if max_err > 1e-9:
+            raise AssertionError(f"compiled predictor differs from sklearn chain by {max_err:g} at n={n}")
+        repeat = max(3, 2000 // n)
+        t_sk = _timeit(lambda: engine.predict(frame), repeat)
+        t_fast = _timeit(fast, repeat * 10)
+        results.append({"n": n, "sklearn_s": t_sk, "compiled_s": t_fast, "speedup": t_sk / t_fast, "max_abs_err": max_err})
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} {'sklearn':>12} {'compiled':>12} {'speedup':>9} {'max err':>10}")
+    for r in benchmark():
+        print(f"{r['n']:>8} {r['sklearn_s'] * 1e6:>10.1f}us {r['compiled_s'] * 1e6:>10.1f}us {r['speedup']:>8.1f}x {r['max_abs_err']:>10.2e}")
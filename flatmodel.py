@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from fastpath import CompiledPredictor
+from inference import ARTIFACT_FILES, BASE_DIR, artifact_signature, file_digest, resolve_artifact_dir
+
+# Flat, sklearn-free copy of encoder.pkl / scaler.pkl / model.pkl:
+#
+#   model.flat/manifest.json  format version, column layout, categories,
+#                             offsets into params.npy, digests of the pickles
+#   model.flat/params.npy     one float64 vector: intercept | coef | center | scale,
+#                             then, when exported at train time, the
+#                             explanation statistics (see explain.py)
+#
+# params.npy is opened with np.load(mmap_mode="r"), so forked workers share the
+# same page-cache pages and cold start is a JSON parse plus an mmap.
+
+FORMAT = "co2-flat"
+FORMAT_VERSION = 1
+FLAT_DIR = os.path.join(BASE_DIR, "model.flat")
+MANIFEST_FILE = "manifest.json"
+PARAMS_FILE = "params.npy"
+
+
+def source_digests(artifact_dir=BASE_DIR):
+    return {name: file_digest(os.path.join(artifact_dir, name), 16) for name in ARTIFACT_FILES}
+
+
+EXPLAIN_SECTIONS = ("explain_xtx_inv", "explain_mean", "explain_residual")
+
+
+def flat_layout(encoder, scaler, model, artifact_dir=BASE_DIR, explain_stats=None):
+    # (manifest, params) for the fitted artifacts, without touching disk
+    # beyond hashing the source pickles. explain_stats is the dict from
+    # explain.fit_stats; older exports simply lack those sections.
+    feature_columns = [str(c) for c in model.feature_names_in_]
+    cat_columns = [str(c) for c in encoder.feature_names_in_]
+    num_columns = [str(c) for c in scaler.feature_names_in_]
+    unknown = encoder.unknown_value if encoder.handle_unknown == "use_encoded_value" else None
+
+    sections = [
+        ("intercept", np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64))),
+        ("coef", np.asarray(model.coef_, dtype=np.float64).ravel()),
+        ("center", np.asarray(getattr(scaler, "center_", None) if scaler.with_centering else np.zeros(len(num_columns)), dtype=np.float64)),
+        ("scale", np.asarray(getattr(scaler, "scale_", None) if scaler.with_scaling else np.ones(len(num_columns)), dtype=np.float64)),
+    ]
+    if explain_stats is not None:
+        sections += [(name, np.asarray(explain_stats[name], dtype=np.float64).ravel()) for name in EXPLAIN_SECTIONS]
+    layout = {}
+    offset = 0
+    for name, values in sections:
+        layout[name] = [offset, len(values)]
+        offset += len(values)
+    params = np.concatenate([values for _, values in sections])
+
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "feature_columns": feature_columns,
+        "cat_columns": cat_columns,
+        "num_columns": num_columns,
+        "categories": {col: [str(c) for c in cats] for col, cats in zip(cat_columns, encoder.categories_)},
+        "unknown_value": None if unknown is None else float(unknown),
+        "layout": layout,
+        "source": source_digests(artifact_dir),
+    }
+    return manifest, params
+
+
+def export_flat(encoder, scaler, model, out_dir=FLAT_DIR, artifact_dir=BASE_DIR, explain_stats=None):
+    manifest, params = flat_layout(encoder, scaler, model, artifact_dir, explain_stats)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_params = os.path.join(out_dir, f"{PARAMS_FILE}.{os.getpid()}.tmp")
+    tmp_manifest = os.path.join(out_dir, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_params, "wb") as f:
+        np.save(f, params)
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_params, os.path.join(out_dir, PARAMS_FILE))
+    os.replace(tmp_manifest, os.path.join(out_dir, MANIFEST_FILE))
+    return manifest
+
+
+class FlatModel:
+    def __init__(self, path=FLAT_DIR, manifest=None, params=None):
+        # Either reads path/, or wraps an in-memory (manifest, params) pair
+        # such as a view onto shared memory.
+        if manifest is None:
+            with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a {FORMAT} export")
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported {FORMAT} version {manifest.get('format_version')} (expected {FORMAT_VERSION})")
+        self.path = path
+        self.manifest = manifest
+        self.params = np.load(os.path.join(path, PARAMS_FILE), mmap_mode="r") if params is None else params
+        self.feature_columns = manifest["feature_columns"]
+        self.cat_columns = manifest["cat_columns"]
+        self.num_columns = manifest["num_columns"]
+        self.categories = [manifest["categories"][c] for c in self.cat_columns]
+        self.unknown_value = manifest["unknown_value"]
+
+    def section(self, name):
+        offset, length = self.manifest["layout"][name]
+        return self.params[offset:offset + length]
+
+    @property
+    def intercept(self):
+        return float(self.section("intercept")[0])
+
+    def explain_stats(self):
+        if "explain_residual" not in self.manifest["layout"]:
+            return None
+        n = len(self.feature_columns) + 1
+        return {
+            "explain_xtx_inv": np.asarray(self.section("explain_xtx_inv")).reshape(n, n),
+            "explain_mean": np.asarray(self.section("explain_mean")),
+            "explain_residual": np.asarray(self.section("explain_residual")),
+        }
+
+    def compiled(self):
+        return CompiledPredictor(
+            feature_columns=self.feature_columns,
+            cat_columns=self.cat_columns,
+            categories=[np.array(c, dtype=object) for c in self.categories],
+            coef=self.section("coef"),
+            intercept=self.intercept,
+            center=self.section("center"),
+            scale=self.section("scale"),
+            unknown_value=self.unknown_value,
+            explain_stats=self.explain_stats(),
+        )
+
+    def matches(self, artifact_dir=BASE_DIR):
+        try:
+            return self.manifest.get("source") == source_digests(artifact_dir)
+        except FileNotFoundError:
+            return False
+
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def load_current(artifact_dir=BASE_DIR, path=None):
+    # Compiled predictor from the flat export, or None if there is no export
+    # or it was made from different pickles than the ones in artifact_dir.
+    # Cached per (pickle mtimes, manifest mtime), so repeated calls only stat.
+    artifact_dir = resolve_artifact_dir(artifact_dir)
+    path = path or os.path.join(artifact_dir, os.path.basename(FLAT_DIR))
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    try:
+        key = (artifact_signature(artifact_dir), os.stat(manifest_path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _lock:
+        flat = FlatModel(path)
+        compiled = flat.compiled() if flat.matches(artifact_dir) else None
+        _loaded[path] = (key, compiled)
+        return compiled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect the flat (sklearn-free) model artifacts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="convert the .pkl artifacts into the flat layout")
+    p_export.add_argument("--artifacts", default=BASE_DIR)
+    p_export.add_argument("--out", default=FLAT_DIR)
+    p_info = sub.add_parser("info", help="load the flat layout without sklearn and print it")
+    p_info.add_argument("--path", default=FLAT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from inference import load_engine
+
+        from explain import training_stats
+
+        engine = load_engine(args.artifacts)
+        stats = training_stats(CompiledPredictor.from_engine(engine))
+        manifest = export_flat(engine.encoder, engine.scaler, engine.model, args.out, args.artifacts, stats)
+        print(f"exported {len(manifest['feature_columns'])} features -> {args.out}")
+    else:
+        flat = FlatModel(args.path)
+        print(json.dumps({k: v for k, v in flat.manifest.items() if k != "categories"}, indent=2))
+        print(f"sklearn imported: {'sklearn' in sys.modules}")
+
+
+if __name__ == "__main__":
+    main()
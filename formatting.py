@@ -0,0 +1,12 @@
+def risk_band(value_kg):
+    if value_kg < 2.5:
+        return "Low", "rgba(124,255,178,0.18)"
+    if value_kg < 12.0:
+        return "Moderate", "rgba(255,211,110,0.18)"
+    return "High", "rgba(255,107,138,0.18)"
+
+
+def format_emission(value_kg, units="kg CO₂", precision=2):
+    if units == "t CO₂":
+        return f"{value_kg/1000:.{precision}f} t CO₂"
+    return f"{value_kg:.{precision}f} kg CO₂"
@@ -0,0 +1,152 @@
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+DEFAULT_CAPACITY = 10_000
+SORT_COLUMNS = ("timestamp", "distance_km", "passengers", "payload_kg", "avg_speed", "pred_kg")
+
+FUEL_LABELS = np.array(FUEL_TYPES + ["Other"], dtype=object)
+VEHICLE_LABELS = np.array(VEHICLE_TYPES + ["Other"], dtype=object)
+
+
+def _code(value, names):
+    return names.index(value) if value in names else -1
+
+
+class HistoryStore:
+    # Fixed-capacity ring buffer of predictions held as typed NumPy columns.
+    # count/total/min/max are maintained on append (min/max through monotonic
+    # deques), so reading them never rescans the buffer.
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.ts = np.empty(self.capacity, dtype="datetime64[s]")
+        self.distance_km = np.empty(self.capacity, dtype=np.float64)
+        self.passengers = np.empty(self.capacity, dtype=np.int32)
+        self.payload_kg = np.empty(self.capacity, dtype=np.float64)
+        self.avg_speed_kmph = np.empty(self.capacity, dtype=np.float64)
+        self.pred_kg = np.empty(self.capacity, dtype=np.float64)
+        self.fuel_code = np.empty(self.capacity, dtype=np.int8)
+        self.vehicle_code = np.empty(self.capacity, dtype=np.int8)
+
+        self.appended = 0
+        self.evicted = 0
+        self.total = 0.0
+        self._mins = deque()
+        self._maxs = deque()
+        self._query_key = None
+        self._query_idx = None
+
+    def __len__(self):
+        return self.appended - self.evicted
+
+    @property
+    def count(self):
+        return len(self)
+
+    @property
+    def mean(self):
+        return self.total / len(self) if len(self) else 0.0
+
+    @property
+    def min(self):
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self):
+        return self._maxs[0][1] if self._maxs else None
+
+    def append(self, ts, inputs, pred_kg):
+        seq = self.appended
+        slot = seq % self.capacity
+        if len(self) == self.capacity:
+            self.total -= float(self.pred_kg[slot])
+            self.evicted += 1
+            if self._mins[0][0] < self.evicted:
+                self._mins.popleft()
+            if self._maxs[0][0] < self.evicted:
+                self._maxs.popleft()
+
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        self.ts[slot] = np.datetime64(ts, "s")
+        self.distance_km[slot] = inputs["distance_km"]
+        self.passengers[slot] = inputs["passengers"]
+        self.payload_kg[slot] = inputs["payload_kg"]
+        self.avg_speed_kmph[slot] = inputs["avg_speed_kmph"]
+        self.pred_kg[slot] = pred_kg
+        self.fuel_code[slot] = _code(inputs["fuel_type"], FUEL_TYPES)
+        self.vehicle_code[slot] = _code(inputs["vehicle_type"], VEHICLE_TYPES)
+
+        pred_kg = float(pred_kg)
+        self.total += pred_kg
+        while self._mins and self._mins[-1][1] >= pred_kg:
+            self._mins.pop()
+        self._mins.append((seq, pred_kg))
+        while self._maxs and self._maxs[-1][1] <= pred_kg:
+            self._maxs.pop()
+        self._maxs.append((seq, pred_kg))
+        self.appended += 1
+
+    def order(self, newest_first=False):
+        idx = np.arange(self.evicted, self.appended) % self.capacity
+        return idx[::-1] if newest_first else idx
+
+    def columns(self, idx=None, newest_first=True):
+        if idx is None:
+            idx = self.order(newest_first)
+        return {
+            "timestamp": np.datetime_as_string(self.ts[idx]),
+            "distance_km": self.distance_km[idx],
+            "vehicle": VEHICLE_LABELS[self.vehicle_code[idx]],
+            "fuel": FUEL_LABELS[self.fuel_code[idx]],
+            "passengers": self.passengers[idx],
+            "payload_kg": self.payload_kg[idx],
+            "avg_speed": self.avg_speed_kmph[idx],
+            "pred_kg": np.round(self.pred_kg[idx], 4),
+        }
+
+    def _sort_values(self, sort_by):
+        return {
+            "timestamp": None,
+            "distance_km": self.distance_km,
+            "passengers": self.passengers,
+            "payload_kg": self.payload_kg,
+            "avg_speed": self.avg_speed_kmph,
+            "pred_kg": self.pred_kg,
+        }[sort_by]
+
+    def query(self, sort_by="timestamp", descending=True, vehicle=None, fuel=None):
+        # Buffer slots matching the filters, in display order. Only the slot
+        # array is built here; callers slice out a page and pass it to
+        # columns(), so no row is materialized unless it is displayed. The
+        # last result is kept until the next append or a different query.
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"cannot sort by {sort_by!r}; choose from {SORT_COLUMNS}")
+        key = (self.appended, sort_by, descending, vehicle, fuel)
+        if key == self._query_key:
+            return self._query_idx
+
+        idx = self.order()
+        if vehicle is not None:
+            idx = idx[self.vehicle_code[idx] == _code(vehicle, VEHICLE_TYPES)]
+        if fuel is not None:
+            idx = idx[self.fuel_code[idx] == _code(fuel, FUEL_TYPES)]
+        values = self._sort_values(sort_by)
+        if values is not None:
+            # Stable sort over insertion order, so ties stay chronological.
+            idx = idx[np.argsort(values[idx], kind="stable")]
+        if descending:
+            idx = idx[::-1]
+
+        self._query_key, self._query_idx = key, idx
+        return idx
+
+    def page(self, offset=0, limit=50, **query):
+        idx = self.query(**query)
+        return self.columns(idx[offset:offset + limit]), len(idx)
@@ -0,0 +1,149 @@
+import csv
+import hashlib
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "first_project.csv")
+
+ENCODER_FILE = "encoder.pkl"
+SCALER_FILE = "scaler.pkl"
+MODEL_FILE = "model.pkl"
+ARTIFACT_FILES = (ENCODER_FILE, SCALER_FILE, MODEL_FILE)
+ARTIFACT_POINTER = "artifacts.current"
+GENERATIONS_DIR = "artifacts"
+
+DROP_COLUMNS = ["Make", "Model", "Vehicle Class"]
+TARGET_COLUMN = "CO2 Emissions(g/km)"
+
+_lock = threading.Lock()
+_engines = {}
+_pointers = {}
+
+
+class InferenceEngine:
+    def __init__(self, encoder, scaler, model, version):
+        self.encoder = encoder
+        self.scaler = scaler
+        self.model = model
+        self.version = version
+        self.compiled = None
+        self.feature_columns = list(model.feature_names_in_)
+        self.cat_columns = list(encoder.feature_names_in_)
+        self.num_columns = list(scaler.feature_names_in_)
+
+    def transform(self, frame):
+        x = frame[self.feature_columns].copy()
+        x[self.cat_columns] = self.encoder.transform(x[self.cat_columns])
+        x[self.num_columns] = self.scaler.transform(x[self.num_columns])
+        return x
+
+    def predict(self, frame):
+        return self.model.predict(self.transform(frame))
+
+
+def read_csv_columns(data_path=DATA_PATH):
+    with open(data_path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def feature_columns_from_csv(data_path=DATA_PATH):
+    return [c for c in read_csv_columns(data_path) if c not in DROP_COLUMNS and c != TARGET_COLUMN]
+
+
+def csv_signature(data_path=DATA_PATH):
+    # (mtime, size): what the CSV-derived caches (catalog, drift profile,
+    # dataset cache) are keyed on.
+    st = os.stat(data_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def check_feature_names(encoder, scaler, model, data_path=DATA_PATH):
+    expected = feature_columns_from_csv(data_path)
+    model_cols = list(model.feature_names_in_)
+    if model_cols != expected:
+        raise ValueError(f"model features {model_cols} do not match {os.path.basename(data_path)} columns {expected}")
+
+    cat_cols = list(encoder.feature_names_in_)
+    num_cols = list(scaler.feature_names_in_)
+    if set(cat_cols) & set(num_cols):
+        raise ValueError(f"encoder and scaler share columns: {sorted(set(cat_cols) & set(num_cols))}")
+    if sorted(cat_cols + num_cols) != sorted(expected):
+        raise ValueError(f"encoder {cat_cols} + scaler {num_cols} do not cover model features {expected}")
+
+
+def resolve_artifact_dir(artifact_dir=BASE_DIR):
+    # Directory holding artifact_dir's current artifact set: artifact_dir
+    # itself (the committed pickles) until train.save_artifacts publishes
+    # into it, then the immutable generation under artifacts/ named by the
+    # ARTIFACT_POINTER file. A publish writes the whole generation before
+    # replacing the pointer, so everything read from one resolved directory
+    # belongs to the same set. Cached by the pointer's stat.
+    pointer = os.path.join(artifact_dir, ARTIFACT_POINTER)
+    try:
+        st = os.stat(pointer)
+    except FileNotFoundError:
+        return artifact_dir
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _pointers.get(pointer)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(pointer, encoding="utf-8") as f:
+        target = os.path.normpath(os.path.join(artifact_dir, f.read().strip()))
+    _pointers[pointer] = (key, target)
+    return target
+
+
+def artifact_signature(artifact_dir=BASE_DIR):
+    artifact_dir = resolve_artifact_dir(artifact_dir)
+    sig = [artifact_dir]
+    for name in ARTIFACT_FILES:
+        st = os.stat(os.path.join(artifact_dir, name))
+        sig.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def file_digest(path, length=12):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()[:length]
+
+
+def load_engine(artifact_dir=BASE_DIR, data_path=DATA_PATH):
+    import joblib
+
+    artifact_dir = resolve_artifact_dir(artifact_dir)
+    encoder = joblib.load(os.path.join(artifact_dir, ENCODER_FILE))
+    scaler = joblib.load(os.path.join(artifact_dir, SCALER_FILE))
+    model = joblib.load(os.path.join(artifact_dir, MODEL_FILE))
+    check_feature_names(encoder, scaler, model, data_path)
+    return InferenceEngine(encoder, scaler, model, file_digest(os.path.join(artifact_dir, MODEL_FILE)))
+
+
+def get_engine(artifact_dir=BASE_DIR, data_path=DATA_PATH):
+    # One engine per artifact directory per process. Streamlit keeps imported
+    # modules alive across reruns and sessions, so this is shared by all of them;
+    # a changed file on disk (mtime/size) triggers a reload on the next call.
+    key = os.path.abspath(artifact_dir)
+    sig = artifact_signature(key)
+    cached = _engines.get(key)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    with _lock:
+        cached = _engines.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        engine = load_engine(key, data_path)
+        after = artifact_signature(key)
+        if after != sig:
+            # A new set was published while loading; load that instead.
+            sig, engine = after, load_engine(key, data_path)
+        _engines[key] = (sig, engine)
+        return engine
+
+
+def clear_engines():
+    with _lock:
+        _engines.clear()
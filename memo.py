@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from inference import BASE_DIR, artifact_signature
+from predictor import INPUT_FIELDS
+
+DEFAULT_MAXSIZE = int(os.environ.get("CO2_CACHE_SIZE", "4096"))
+DEFAULT_TTL_S = float(os.environ.get("CO2_CACHE_TTL_S", "3600"))
+DEFAULT_PRECISION = int(os.environ.get("CO2_CACHE_PRECISION", "3"))
+
+FLOAT_FIELDS = ("distance_km", "payload_kg", "avg_speed_kmph")
+
+
+def _signature(artifact_dir):
+    try:
+        return artifact_signature(artifact_dir)
+    except FileNotFoundError:
+        return None
+
+
+class PredictionCache:
+    # LRU + TTL memo in front of a predictor. Lookups are keyed on the
+    # inputs with the float fields rounded to `precision` decimals, but
+    # predict() always sees the exact inputs of the miss, so a hit returns
+    # the value computed for the first input in the same rounding bucket.
+    # The whole cache is dropped when any model artifact changes.
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl_s=DEFAULT_TTL_S, precision=DEFAULT_PRECISION, artifact_dir=BASE_DIR):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.precision = precision
+        self.artifact_dir = artifact_dir
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._source = _signature(artifact_dir)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, inputs):
+        return tuple(
+            round(float(inputs[f]), self.precision) if f in FLOAT_FIELDS
+            else int(inputs[f]) if f == "passengers"
+            else inputs[f]
+            for f in INPUT_FIELDS
+        )
+
+    def _check_source(self):
+        source = _signature(self.artifact_dir)
+        if source != self._source:
+            self._source = source
+            self._data.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def get_or_compute(self, inputs, predict):
+        key = self.key(inputs)
+        now = time.monotonic()
+        with self._lock:
+            self._check_source()
+            entry = self._data.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_s:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        value = predict(**{f: inputs[f] for f in INPUT_FIELDS})
+
+        with self._lock:
+            # Computed against artifacts (or a cache) that have since been
+            # replaced: return it to this caller but do not keep it.
+            self._check_source()
+            if self._generation != generation:
+                return value
+            self._data[key] = (now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
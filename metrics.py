@@ -0,0 +1,246 @@
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+SPANS_ENABLED = os.environ.get("CO2_SPANS", "0").lower() in ("1", "true", "yes")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    # Fixed-bucket histogram; observe() is a bisect plus three adds.
+
+    def __init__(self, name, help="", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, s = list(self.counts), self.count, self.sum
+        cumulative = []
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            seen += n
+            cumulative.append((bound, seen))
+        return {"count": total, "sum": s, "mean": s / total if total else 0.0, "buckets": cumulative}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = cls(name, *args, **kwargs)
+                    self._metrics[name] = metric
+        if not isinstance(metric, cls):
+            raise ValueError(f"metric {name!r} is already registered as {type(metric).__name__}")
+        return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self):
+        return {
+            m.name: m.snapshot() if isinstance(m, Histogram) else m.value
+            for m in self.metrics()
+        }
+
+
+REGISTRY = Registry()
+
+
+def _metric_name(name):
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+    return name if not name[:1].isdigit() else f"_{name}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(registry=REGISTRY):
+    # Prometheus text exposition format, version 0.0.4.
+    lines = []
+    for metric in sorted(registry.metrics(), key=lambda m: m.name):
+        name = _metric_name(metric.name)
+        if metric.help:
+            lines.append(f"# HELP {name} {metric.help}")
+        if isinstance(metric, Histogram):
+            snap = metric.snapshot()
+            lines.append(f"# TYPE {name} histogram")
+            for bound, seen in snap["buckets"]:
+                lines.append(f'{name}_bucket{{le="{_format_value(bound)}"}} {seen}')
+            lines.append(f"{name}_sum {_format_value(snap['sum'])}")
+            lines.append(f"{name}_count {snap['count']}")
+        else:
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {_format_value(metric.value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_span_histograms = {}
+
+
+def span(name, registry=REGISTRY):
+    # Times a `with` block into the histogram span_<name>_seconds. When spans
+    # are disabled this returns a shared no-op object, so instrumented code
+    # pays one global lookup and an empty __enter__/__exit__.
+    if not SPANS_ENABLED:
+        return _NOOP_SPAN
+    histogram = _span_histograms.get(name)
+    if histogram is None:
+        histogram = registry.histogram(f"span_{name}_seconds", f"Duration of the {name} span")
+        _span_histograms[name] = histogram
+    return _Span(histogram)
+
+
+def set_spans_enabled(enabled):
+    global SPANS_ENABLED
+    SPANS_ENABLED = bool(enabled)
+
+
+def spans_enabled():
+    return SPANS_ENABLED
+
+
+def span_stats():
+    stats = {}
+    for name, histogram in sorted(_span_histograms.items()):
+        snap = histogram.snapshot()
+        stats[name] = {
+            "count": snap["count"],
+            "mean_s": snap["mean"],
+            "p50_s": histogram.quantile(0.5),
+            "p99_s": histogram.quantile(0.99),
+        }
+    return stats
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    # Serves GET /metrics from a daemon thread; for processes (like the
+    # Streamlit app) that have no HTTP server of their own. Only the first
+    # call per process does anything, so callers can invoke it on every
+    # rerun. A port that cannot be bound is reported on stderr and yields
+    # None instead of raising.
+    global _server, _server_started
+    if _server_started:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0].rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            data = render_prometheus(registry).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if not _server_started:
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            except OSError as exc:
+                print(f"metrics: cannot serve /metrics on {host}:{port}: {exc}", file=sys.stderr)
+            else:
+                threading.Thread(target=_server.serve_forever, name="co2-metrics-http", daemon=True).start()
+    return _server
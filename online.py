@@ -0,0 +1,307 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference import BASE_DIR, DATA_PATH, DROP_COLUMNS, TARGET_COLUMN
+from sketches import QuantileSketch
+from train import CACHE_DIR, CSV_DTYPES, load_dataset, save_artifacts, split_features
+
+STATE_PATH = os.path.join(CACHE_DIR, "online_state.npz")
+
+
+class OnlineRegression:
+    # Sufficient statistics for the encoder -> scaler -> LinearRegression
+    # chain, kept in a basis that does not depend on the fitted transforms:
+    #
+    #   z = [1, numeric features..., one indicator per category seen]
+    #
+    # G = Z^T Z and b = Z^T y are updated in O(new rows). Ordinal codes and
+    # RobustScaler outputs are both linear in z, so the model-space normal
+    # equations are T G T^T beta = T b for a small matrix T built at solve
+    # time. New categories just add indicator rows/columns, which is what
+    # keeps the result equal to a full refit even when the sorted ordinal
+    # codes shift.
+
+    def __init__(self, feature_columns, cat_columns):
+        self.feature_columns = list(feature_columns)
+        self.cat_columns = list(cat_columns)
+        self.num_columns = [c for c in self.feature_columns if c not in self.cat_columns]
+        self.categories = {c: [] for c in self.cat_columns}
+        self.slots = {}
+        self.sketches = {c: QuantileSketch() for c in self.num_columns}
+        dim = 1 + len(self.num_columns)
+        self.gram = np.zeros((dim, dim))
+        self.moment = np.zeros(dim)
+        self.y_sq = 0.0
+        self.n = 0
+
+    @classmethod
+    def from_frame(cls, x, y):
+        cat_cols = list(x.select_dtypes(include=["object", "string"]).columns)
+        model = cls(x.columns, cat_cols)
+        model.update(x, y)
+        return model
+
+    def _grow(self, x):
+        # Indicator slots are assigned in arrival order so existing rows and
+        # columns of the Gram matrix never move.
+        for col in self.cat_columns:
+            known = set(self.categories[col])
+            for cat in sorted(set(x[col].tolist()) - known):
+                self.categories[col].append(cat)
+                self.slots[(col, cat)] = 1 + len(self.num_columns) + len(self.slots)
+        dim = 1 + len(self.num_columns) + len(self.slots)
+        if dim > self.gram.shape[0]:
+            old = self.gram.shape[0]
+            gram = np.zeros((dim, dim))
+            gram[:old, :old] = self.gram
+            moment = np.zeros(dim)
+            moment[:old] = self.moment
+            self.gram, self.moment = gram, moment
+
+    def basis(self, x):
+        slots, dim = self.slots, self.gram.shape[0]
+        z = np.zeros((len(x), dim))
+        z[:, 0] = 1.0
+        z[:, 1:1 + len(self.num_columns)] = x[self.num_columns].to_numpy(dtype=np.float64)
+        rows = np.arange(len(x))
+        for col in self.cat_columns:
+            idx = np.array([slots[(col, v)] for v in x[col].tolist()], dtype=np.intp)
+            z[rows, idx] = 1.0
+        return z
+
+    def update(self, x, y):
+        if not len(x):
+            return self
+        self._grow(x)
+        z = self.basis(x)
+        y = np.asarray(y, dtype=np.float64)
+        self.gram += z.T @ z
+        self.moment += z.T @ y
+        self.y_sq += float(y @ y)
+        self.n += len(x)
+        for col in self.num_columns:
+            self.sketches[col].add(x[col].to_numpy(dtype=np.float64))
+        return self
+
+    def scaler_params(self):
+        center = np.array([self.sketches[c].quantile(0.5) for c in self.num_columns])
+        q25 = np.array([self.sketches[c].quantile(0.25) for c in self.num_columns])
+        q75 = np.array([self.sketches[c].quantile(0.75) for c in self.num_columns])
+        scale = q75 - q25
+        scale[scale == 0.0] = 1.0
+        return center, scale
+
+    def solve(self):
+        # Returns (categories, center, scale, coef, intercept) in the layout
+        # the sklearn artifacts use.
+        categories, center, scale, _, beta = self._solve()
+        return categories, center, scale, beta[1:], float(beta[0])
+
+    def _solve(self):
+        # Also returns T, the map from the basis to the model's design
+        # [1, scaled numerics, ordinal codes], and beta = [intercept, coef].
+        center, scale = self.scaler_params()
+        categories = {c: sorted(self.categories[c]) for c in self.cat_columns}
+        slots = self.slots
+
+        t = np.zeros((1 + len(self.feature_columns), self.gram.shape[0]))
+        t[0, 0] = 1.0
+        for j, col in enumerate(self.num_columns):
+            row = 1 + self.feature_columns.index(col)
+            t[row, 1 + j] = 1.0 / scale[j]
+            t[row, 0] = -center[j] / scale[j]
+        for col in self.cat_columns:
+            row = 1 + self.feature_columns.index(col)
+            for code, cat in enumerate(categories[col]):
+                t[row, slots[(col, cat)]] = float(code)
+
+        lhs = t @ self.gram @ t.T
+        rhs = t @ self.moment
+        beta = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+        return categories, center, scale, t, beta
+
+    def explain_stats(self):
+        # explain.fit_stats for the solved model without the training rows:
+        # the design's Gram matrix is T G T^T, and the residual sum of
+        # squares is y.y - 2 beta.(T b) + beta.(T G T^T) beta.
+        from explain import gram_stats
+
+        if not np.isfinite(self.y_sq):
+            raise ValueError("state has no sum of squared targets (saved by an older version); rebuild it with `online.py init`")
+        _, _, _, t, beta = self._solve()
+        gram = t @ self.gram @ t.T
+        rss = self.y_sq - 2.0 * float(beta @ (t @ self.moment)) + float(beta @ gram @ beta)
+        return gram_stats(gram, max(rss, 0.0))
+
+    def to_sklearn(self):
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import OrdinalEncoder, RobustScaler
+
+        categories, center, scale, coef, intercept = self.solve()
+
+        longest = max(len(v) for v in categories.values())
+        frame = pd.DataFrame({c: (v * longest)[:longest] for c, v in categories.items()})
+        encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+        encoder.fit(frame)
+
+        scaler = RobustScaler()
+        scaler.fit(pd.DataFrame(np.zeros((2, len(self.num_columns))), columns=self.num_columns))
+        scaler.center_ = center
+        scaler.scale_ = scale
+
+        model = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = intercept
+        model.n_features_in_ = len(self.feature_columns)
+        model.feature_names_in_ = np.array(self.feature_columns, dtype=object)
+        return encoder, scaler, model
+
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "feature_columns": self.feature_columns,
+            "cat_columns": self.cat_columns,
+            "categories": self.categories,
+            "slots": sorted(self.slots, key=self.slots.get),
+            "n": self.n,
+            "y_sq": self.y_sq,
+        }
+        arrays = {"gram": self.gram, "moment": self.moment}
+        for j, col in enumerate(self.num_columns):
+            for key, value in self.sketches[col].to_arrays().items():
+                arrays[f"sketch{j}_{key}"] = value
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            model = cls(meta["feature_columns"], meta["cat_columns"])
+            model.n = meta["n"]
+            model.y_sq = meta.get("y_sq", math.nan)
+            for col in model.cat_columns:
+                for cat in meta["categories"][col]:
+                    model.categories[col].append(cat)
+            for i, (col, cat) in enumerate(meta["slots"]):
+                model.slots[(col, cat)] = 1 + len(model.num_columns) + i
+            model.gram = npz["gram"].copy()
+            model.moment = npz["moment"].copy()
+            for j, col in enumerate(model.num_columns):
+                model.sketches[col] = QuantileSketch.from_arrays(
+                    npz[f"sketch{j}_values"], npz[f"sketch{j}_weights"], npz[f"sketch{j}_bounds"]
+                )
+        return model
+
+
+def initial_state(data_path=DATA_PATH):
+    # Starts from the same training split model.ipynb fits on.
+    from sklearn.model_selection import train_test_split
+    from train import RANDOM_STATE, TEST_SIZE
+
+    x, y, _, _ = split_features(load_dataset(data_path))
+    x_train, _, y_train, _ = train_test_split(x, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    return OnlineRegression.from_frame(x_train, y_train)
+
+
+def read_rows(path):
+    df = pd.read_csv(path, dtype={c: t for c, t in CSV_DTYPES.items() if t is not str})
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    return df.drop(columns=[TARGET_COLUMN]), df[TARGET_COLUMN]
+
+
+def publish(state, out_dir=BASE_DIR):
+    # A new artifact generation behind one pointer swap (see
+    # train.save_artifacts); inference.get_engine and the prediction cache
+    # switch to it on their next call.
+    return save_artifacts(*state.to_sklearn(), out_dir=out_dir, explain_stats=state.explain_stats())
+
+
+def full_refit(x, y):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import OrdinalEncoder, RobustScaler
+
+    x = x.copy()
+    cat_cols = x.select_dtypes(include=["object", "string"]).columns
+    num_cols = x.select_dtypes(include=["int64", "float64"]).columns
+    encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+    x[cat_cols] = encoder.fit_transform(x[cat_cols])
+    scaler = RobustScaler()
+    x[num_cols] = scaler.fit_transform(x[num_cols])
+    model = LinearRegression().fit(x, y)
+    return encoder, scaler, model
+
+
+def check_equivalence(data_path=DATA_PATH, chunks=5, seed=0):
+    # Feeds the dataset in shuffled chunks and compares the incremental model
+    # with a full refit on the same rows after each chunk.
+    from inference import InferenceEngine
+
+    x, y, _, _ = split_features(load_dataset(data_path))
+    order = np.random.default_rng(seed).permutation(len(x))
+    x, y = x.iloc[order].reset_index(drop=True), y.iloc[order].reset_index(drop=True)
+    bounds = np.linspace(0, len(x), chunks + 1).astype(int)
+
+    state = None
+    worst = 0.0
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if state is None:
+            state = OnlineRegression.from_frame(x.iloc[lo:hi], y.iloc[lo:hi])
+        else:
+            state.update(x.iloc[lo:hi], y.iloc[lo:hi])
+        seen_x, seen_y = x.iloc[:hi], y.iloc[:hi]
+        online = InferenceEngine(*state.to_sklearn(), version="online").predict(x)
+        refit = InferenceEngine(*full_refit(seen_x, seen_y), version="refit").predict(x)
+        diff = float(np.max(np.abs(online - refit)))
+        worst = max(worst, diff)
+        print(f"rows={hi:>6} max |online - refit| = {diff:.3e}")
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental updates for the CO₂ regression model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_init = sub.add_parser("init", help="build state from the notebook's training split")
+    p_init.add_argument("--data", default=DATA_PATH)
+    p_update = sub.add_parser("update", help="fold new rows (first_project.csv schema) into the state")
+    p_update.add_argument("rows")
+    p_update.add_argument("--publish", action="store_true", help="write the updated artifacts")
+    p_update.add_argument("--out", default=BASE_DIR)
+    p_check = sub.add_parser("check", help="compare incremental updates against a full refit")
+    p_check.add_argument("--data", default=DATA_PATH)
+    p_check.add_argument("--chunks", type=int, default=5)
+    for p in (p_init, p_update):
+        p.add_argument("--state", default=STATE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        state = initial_state(args.data)
+        state.save(args.state)
+        print(f"state initialised from {state.n} rows -> {args.state}")
+    elif args.command == "update":
+        state = OnlineRegression.load(args.state)
+        x, y = read_rows(args.rows)
+        t0 = time.perf_counter()
+        state.update(x, y)
+        elapsed = time.perf_counter() - t0
+        state.save(args.state)
+        print(f"folded {len(x)} rows in {elapsed * 1000:.1f} ms (total {state.n})")
+        if args.publish:
+            publish(state, args.out)
+            print(f"published artifacts -> {args.out}")
+    else:
+        worst = check_equivalence(args.data, args.chunks)
+        if worst > 1e-6:
+            raise SystemExit(f"incremental model differs from full refit by {worst:.3e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import flatmodel
+from batch import PRED_COLUMN
+from inference import BASE_DIR, resolve_artifact_dir
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Multi-process version of batch.score_csv for inputs too large for one core.
+#
+# The parent splits the file into line-aligned byte ranges; each worker
+# parses, scores and writes its range to a part file, and the parent
+# appends the parts to the output in input order. Model parameters are put
+# in one shared-memory block when the pool starts and every worker maps it,
+# so tasks carry only (index, start, end). Ranges are split on newlines,
+# so quoted fields must not contain line breaks (first_project.csv has none).
+
+
+def current_layout(artifact_dir=BASE_DIR):
+    # Flat export if it matches the pickles, else built from the sklearn
+    # objects; either way the same (manifest, params) pair.
+    artifact_dir = resolve_artifact_dir(artifact_dir)
+    path = os.path.join(artifact_dir, os.path.basename(flatmodel.FLAT_DIR))
+    if flatmodel.load_current(artifact_dir, path) is not None:
+        flat = flatmodel.FlatModel(path)
+        return flat.manifest, np.array(flat.params)
+    from inference import get_engine
+
+    engine = get_engine(artifact_dir)
+    return flatmodel.flat_layout(engine.encoder, engine.scaler, engine.model, artifact_dir)
+
+
+class SharedParams:
+    # Owns the shared-memory copy of the parameter vector; unlinked on close.
+
+    def __init__(self, params):
+        params = np.ascontiguousarray(params, dtype=np.float64)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(params.nbytes, 1))
+        self.shape = params.shape
+        np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)[:] = params
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_worker = {}
+
+
+def _init_worker(manifest, shm_name, shape, src, part_dir):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    params = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    flat = flatmodel.FlatModel(manifest=manifest, params=params)
+    compiled = flat.compiled()
+    with open(src, "rb") as f:
+        header = f.readline()
+    _worker.update(shm=shm, compiled=compiled, src=src, part_dir=part_dir, header=header)
+
+
+def _score_range(task):
+    index, start, end = task
+    compiled = _worker["compiled"]
+    with open(_worker["src"], "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    chunk = pd.read_csv(io.BytesIO(_worker["header"] + data), dtype={c: "category" for c in compiled.cat_columns})
+    missing = [c for c in compiled.feature_columns if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"input is missing required columns: {missing}")
+    chunk[PRED_COLUMN] = compiled.predict_frame(chunk)
+    part = os.path.join(_worker["part_dir"], f"part-{index:06d}.csv")
+    chunk.to_csv(part, header=index == 0, index=False)
+    return part, len(chunk), float(chunk[PRED_COLUMN].sum())
+
+
+def split_ranges(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    # [(index, start, end)] covering every data line once; each range ends
+    # just after a newline (or at EOF).
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            ranges.append((len(ranges), start, end))
+            start = end
+    return ranges
+
+
+def score_csv_parallel(src, dst, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, progress=None, artifact_dir=BASE_DIR):
+    if not isinstance(src, (str, os.PathLike)):
+        raise ValueError("parallel scoring needs a seekable file path, not a stream")
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(src, chunk_bytes)
+    if not ranges:
+        raise ValueError("input contains no rows")
+
+    manifest, params = current_layout(artifact_dir)
+    rows = 0
+    total = 0.0
+    part_dir = tempfile.mkdtemp(prefix=".co2-parts-", dir=os.path.dirname(os.path.abspath(dst)))
+    try:
+        with SharedParams(params) as shared, open(dst, "wb") as out:
+            initargs = (manifest, shared.name, shared.shape, os.fspath(src), part_dir)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                # map() yields in submission order, so parts are appended in
+                # input order while later ranges are still being scored.
+                for part, n, s in pool.map(_score_range, ranges):
+                    with open(part, "rb") as f:
+                        shutil.copyfileobj(f, out, 1 << 20)
+                    os.remove(part)
+                    rows += n
+                    total += s
+                    if progress is not None:
+                        progress(rows)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    return {"rows": rows, "mean_pred": total / rows if rows else 0.0, "chunks": len(ranges), "workers": workers}
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def scaling(src, max_workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    # Scores src once per worker count (1, 2, 4, ... max_workers) and reports
+    # throughput relative to one worker.
+    max_workers = max_workers or os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        dst = os.path.join(tmp, "scored.csv")
+        for n in worker_counts(max_workers):
+            t0 = time.perf_counter()
+            summary = score_csv_parallel(src, dst, n, chunk_bytes)
+            elapsed = time.perf_counter() - t0
+            results.append({"workers": n, "rows": summary["rows"], "seconds": elapsed, "rows_per_s": summary["rows"] / elapsed})
+    base = results[0]["seconds"]
+    for r in results:
+        r["speedup"] = base / r["seconds"]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-process batch scoring for the first_project.csv schema.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_score = sub.add_parser("score", help="score a CSV with a pool of worker processes")
+    p_score.add_argument("input")
+    p_score.add_argument("output")
+    p_score.add_argument("--workers", type=int, default=None, help="default: number of CPUs")
+    p_score.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024))
+    p_scale = sub.add_parser("scale", help="report speedup from 1 to N workers")
+    p_scale.add_argument("--input", default=None, help="CSV to score (default: first_project.csv repeated --scale times)")
+    p_scale.add_argument("--scale", type=int, default=100)
+    p_scale.add_argument("--max-workers", type=int, default=None)
+    p_scale.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024))
+    args = parser.parse_args(argv)
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+
+    if args.command == "score":
+        t0 = time.perf_counter()
+        summary = score_csv_parallel(args.input, args.output, args.workers, chunk_bytes)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"scored {summary['rows']} rows in {elapsed:.2f}s with {summary['workers']} workers "
+            f"({summary['rows'] / max(elapsed, 1e-9):,.0f} rows/s, {summary['chunks']} chunks), "
+            f"mean {summary['mean_pred']:.2f} g/km -> {args.output}",
+            file=sys.stderr,
+        )
+    else:
+        from bench import scaled_csv
+
+        src = args.input or scaled_csv(args.scale)
+        print(f"input {src} ({os.path.getsize(src) / 1e6:.0f} MB), {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+        for r in scaling(src, args.max_workers, chunk_bytes):
+            print(f"{r['workers']:>8} {r['seconds']:>9.2f} {r['rows_per_s']:>12,.0f} {r['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+
+FUEL_TYPES = ["Petrol", "Diesel", "CNG", "Electric"]
+VEHICLE_TYPES = ["Car", "Bike", "Bus", "Truck", "Train", "Flight"]
+
+FUEL_FACTORS = {"Petrol": 0.192, "Diesel": 0.171, "CNG": 0.120, "Electric": 0.050}
+VEHICLE_FACTORS = {"Car": 1.00, "Bike": 0.35, "Bus": 0.22, "Truck": 1.75, "Train": 0.12, "Flight": 2.90}
+DEFAULT_FUEL_FACTOR = 0.180
+DEFAULT_VEHICLE_FACTOR = 1.00
+
+MODEL_VERSION = "baseline-1"
+
+INPUT_FIELDS = ["distance_km", "fuel_type", "vehicle_type", "passengers", "payload_kg", "avg_speed_kmph"]
+
+# Valid range of each numeric trip input: the Predict form's limits. There
+# are no upper limits; dummy_predict clamps passengers, payload and the speed
+# penalty itself, so large values are unusual but still scored.
+INPUT_BOUNDS = {"distance_km": (0.0, math.inf), "passengers": (1, math.inf), "payload_kg": (0.0, math.inf), "avg_speed_kmph": (1.0, math.inf)}
+
+# Indexed by category code; code -1 (unknown) picks the trailing default.
+FUEL_TABLE = np.array([FUEL_FACTORS[f] for f in FUEL_TYPES] + [DEFAULT_FUEL_FACTOR])
+VEHICLE_TABLE = np.array([VEHICLE_FACTORS[v] for v in VEHICLE_TYPES] + [DEFAULT_VEHICLE_FACTOR])
+
+
+def clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+
+def dummy_predict(distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph):
+    fuel_factor = FUEL_FACTORS.get(fuel_type, DEFAULT_FUEL_FACTOR)
+    vehicle_factor = VEHICLE_FACTORS.get(vehicle_type, DEFAULT_VEHICLE_FACTOR)
+
+    speed_penalty = 1.0 + clamp((avg_speed_kmph - 60.0) / 180.0, -0.15, 0.35)
+    passenger_factor = 1.0 / clamp(passengers, 1, 6)
+    payload_factor = 1.0 + clamp(payload_kg / 1200.0, 0.0, 0.8)
+
+    base = distance_km * 1000.0 * fuel_factor * vehicle_factor * speed_penalty * payload_factor * passenger_factor
+    noise = (math.sin(distance_km * 0.12) + math.cos(avg_speed_kmph * 0.05)) * 0.02
+    base = base * (1.0 + noise)
+
+    return clamp(base, 0.0, 1e9)
+
+
+def prepare_features(inputs):
+    missing = [f for f in INPUT_FIELDS if f not in inputs]
+    if missing:
+        raise ValueError(f"missing inputs: {missing}")
+    return {
+        "distance_km": float(inputs["distance_km"]),
+        "fuel_type": str(inputs["fuel_type"]),
+        "vehicle_type": str(inputs["vehicle_type"]),
+        "passengers": int(inputs["passengers"]),
+        "payload_kg": float(inputs["payload_kg"]),
+        "avg_speed_kmph": float(inputs["avg_speed_kmph"]),
+    }
+
+
+def category_codes(values, names):
+    # Codes into names for an array of labels (-1 = not one of names), or
+    # integer codes passed through after a bounds check. Fixed-width string
+    # arrays are matched with a binary search over the sorted names; other
+    # labels (object arrays, lists) are factorized so only the distinct
+    # values are looked up.
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        if values.size and (values.min() < -1 or values.max() >= len(names)):
+            raise ValueError(f"category codes must be in [-1, {len(names) - 1}] for {names}")
+        return values
+    if values.dtype.kind == "U":
+        order = np.argsort(names)
+        ordered = np.asarray(names)[order]
+        pos = np.searchsorted(ordered, values).clip(max=len(names) - 1)
+        return np.where(ordered[pos] == values, order[pos], -1)
+    import pandas as pd
+
+    local, uniques = pd.factorize(values.ravel())
+    lookup = np.array([names.index(u) if u in names else -1 for u in uniques] + [-1], dtype=np.intp)
+    return lookup[local].reshape(values.shape)
+
+
+BLOCK_ROWS = 1 << 14
+
+
+def dummy_predict_batch(distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph):
+    # Array form of dummy_predict. fuel_type / vehicle_type may be labels or
+    # integer codes into FUEL_TYPES / VEHICLE_TYPES (-1 = unknown; anything
+    # else out of range is a ValueError). The arithmetic follows the scalar
+    # function operation for operation so the results are bit-identical.
+    shape = np.broadcast_shapes(*(np.shape(a) for a in (distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph)))
+    shape = shape or (1,)
+    inputs = (
+        np.asarray(distance_km, dtype=np.float64),
+        FUEL_TABLE.take(category_codes(fuel_type, FUEL_TYPES)),
+        VEHICLE_TABLE.take(category_codes(vehicle_type, VEHICLE_TYPES)),
+        np.asarray(passengers),
+        np.asarray(payload_kg, dtype=np.float64),
+        np.asarray(avg_speed_kmph, dtype=np.float64),
+    )
+    inputs = [np.broadcast_to(a, shape) for a in inputs]
+    out = np.empty(shape, dtype=np.float64)
+
+    # Evaluated in blocks along the first axis so the temporaries stay in
+    # cache instead of streaming ten full-size arrays through memory.
+    step = max(1, BLOCK_ROWS // max(1, int(np.prod(shape[1:]))))
+    for start in range(0, shape[0], step):
+        block = slice(start, start + step)
+        _predict_block(*(a[block] for a in inputs), out=out[block])
+    return out
+
+
+def _predict_block(distance_km, fuel_factor, vehicle_factor, passengers, payload_kg, avg_speed_kmph, out):
+    speed_penalty = avg_speed_kmph - 60.0
+    speed_penalty /= 180.0
+    np.clip(speed_penalty, -0.15, 0.35, out=speed_penalty)
+    speed_penalty += 1.0
+    passenger_factor = 1.0 / np.clip(passengers, 1, 6)
+    payload_factor = payload_kg / 1200.0
+    np.clip(payload_factor, 0.0, 0.8, out=payload_factor)
+    payload_factor += 1.0
+
+    base = np.multiply(distance_km, 1000.0, out=out)
+    base *= fuel_factor
+    base *= vehicle_factor
+    base *= speed_penalty
+    base *= payload_factor
+    base *= passenger_factor
+
+    noise = distance_km * 0.12
+    np.sin(noise, out=noise)
+    wave = np.multiply(avg_speed_kmph, 0.05, out=speed_penalty)
+    noise += np.cos(wave, out=wave)
+    noise *= 0.02
+    noise += 1.0
+    base *= noise
+
+    np.clip(base, 0.0, 1e9, out=base)
+
+
+def dummy_predict_records(records):
+    return dummy_predict_batch(**{name: records[name] for name in INPUT_FIELDS})
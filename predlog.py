@@ -0,0 +1,271 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from inference import BASE_DIR
+
+DEFAULT_PATH = os.environ.get("CO2_LOG_PATH", os.path.join(BASE_DIR, "predictions.db"))
+FLUSH_INTERVAL_S = 0.5
+MAX_BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    distance_km REAL NOT NULL,
+    fuel_type TEXT NOT NULL,
+    vehicle_type TEXT NOT NULL,
+    passengers INTEGER NOT NULL,
+    payload_kg REAL NOT NULL,
+    avg_speed_kmph REAL NOT NULL,
+    pred_kg REAL NOT NULL,
+    model_version TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_vehicle ON predictions (vehicle_type, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_fuel ON predictions (fuel_type, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_vehicle_fuel ON predictions (vehicle_type, fuel_type, ts);
+
+-- Per-day rollup maintained in the same transaction as the inserts, so
+-- fleet-wide aggregates read a few hundred rows instead of the whole log.
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    vehicle_type TEXT NOT NULL,
+    fuel_type TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (day, vehicle_type, fuel_type)
+) WITHOUT ROWID;
+"""
+
+INSERT_SQL = """
+INSERT INTO predictions (ts, distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph, pred_kg, model_version)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+ROLLUP_SQL = """
+INSERT INTO daily_rollup (day, vehicle_type, fuel_type, n, total, min, max)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, vehicle_type, fuel_type) DO UPDATE SET
+    n = n + excluded.n,
+    total = total + excluded.total,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max)
+"""
+
+GROUP_COLUMNS = ("vehicle_type", "fuel_type", "day")
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class PredictionLog:
+    # Append-only prediction log in SQLite (WAL mode). log() only enqueues;
+    # a background thread writes queued records in batches, one transaction
+    # per batch, so the caller never waits on disk.
+
+    def __init__(self, path=DEFAULT_PATH, flush_interval_s=FLUSH_INTERVAL_S, max_batch=MAX_BATCH):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.last_error = None
+        self._queue = queue.SimpleQueue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._local = threading.local()
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        # Running row counts per (vehicle_type, fuel_type), so count()
+        # without a time range never scans the table. Seeded here and
+        # bumped by the writer after each commit; rows other processes
+        # write to the same file are not included.
+        self._counts = defaultdict(int)
+        for vehicle, fuel, n in conn.execute("SELECT vehicle_type, fuel_type, COUNT(*) FROM predictions GROUP BY vehicle_type, fuel_type"):
+            self._counts[(vehicle, fuel)] = n
+        self._counts_lock = threading.Lock()
+        conn.close()
+
+        self._writer = threading.Thread(target=self._run, name="co2-prediction-log", daemon=True)
+        self._writer.start()
+
+    def log(self, features, pred_kg, model_version, ts=None):
+        record = (
+            time.time() if ts is None else float(ts),
+            float(features["distance_km"]),
+            str(features["fuel_type"]),
+            str(features["vehicle_type"]),
+            int(features["passengers"]),
+            float(features["payload_kg"]),
+            float(features["avg_speed_kmph"]),
+            float(pred_kg),
+            str(model_version),
+        )
+        with self._idle:
+            self._pending += 1
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        # Blocks until everything logged so far has been committed.
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _drain(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = _connect(self.path)
+        while True:
+            batch = self._drain()
+            # Any failure (a bad timestamp, a locked or full database) drops
+            # this batch only; the writer keeps running so flush() returns.
+            try:
+                rollup = defaultdict(lambda: [0, 0.0, float("inf"), float("-inf")])
+                for rec in batch:
+                    agg = rollup[(_day(rec[0]), rec[3], rec[2])]
+                    agg[0] += 1
+                    agg[1] += rec[7]
+                    agg[2] = min(agg[2], rec[7])
+                    agg[3] = max(agg[3], rec[7])
+                with conn:
+                    conn.executemany(INSERT_SQL, batch)
+                    conn.executemany(ROLLUP_SQL, [key + tuple(agg) for key, agg in rollup.items()])
+                self.written += len(batch)
+                with self._counts_lock:
+                    for (_, vehicle, fuel), agg in rollup.items():
+                        self._counts[(vehicle, fuel)] += agg[0]
+            except Exception as exc:
+                self.dropped += len(batch)
+                self.failed_batches += 1
+                self.last_error = repr(exc)
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _where(self, since=None, until=None, vehicle_type=None, fuel_type=None, day_column=False, before=None):
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("(ts, id) < (?, ?)")
+            params.extend((float(before[0]), int(before[1])))
+        if since is not None:
+            clauses.append("day >= ?" if day_column else "ts >= ?")
+            params.append(_day(since) if day_column else float(since))
+        if until is not None:
+            clauses.append("day <= ?" if day_column else "ts < ?")
+            params.append(_day(until) if day_column else float(until))
+        if vehicle_type is not None:
+            clauses.append("vehicle_type = ?")
+            params.append(vehicle_type)
+        if fuel_type is not None:
+            clauses.append("fuel_type = ?")
+            params.append(fuel_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def summary(self, since=None, until=None, vehicle_type=None, fuel_type=None):
+        # Fleet-wide aggregates from the daily rollup; since/until are epoch
+        # seconds rounded to whole UTC days.
+        where, params = self._where(since, until, vehicle_type, fuel_type, day_column=True)
+        row = self._reader().execute(
+            f"SELECT COALESCE(SUM(n), 0), COALESCE(SUM(total), 0.0), MIN(min), MAX(max) FROM daily_rollup{where}",
+            params,
+        ).fetchone()
+        n, total, lo, hi = row
+        return {"count": n, "total": total, "mean": total / n if n else 0.0, "min": lo, "max": hi}
+
+    def breakdown(self, by="vehicle_type", since=None, until=None, vehicle_type=None, fuel_type=None):
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"cannot group by {by!r}; choose from {GROUP_COLUMNS}")
+        where, params = self._where(since, until, vehicle_type, fuel_type, day_column=True)
+        rows = self._reader().execute(
+            f"SELECT {by}, SUM(n), SUM(total), MIN(min), MAX(max) FROM daily_rollup{where} GROUP BY {by} ORDER BY {by}",
+            params,
+        ).fetchall()
+        return [
+            {by: key, "count": n, "total": total, "mean": total / n, "min": lo, "max": hi}
+            for key, n, total, lo, hi in rows
+        ]
+
+    def recent(self, limit=100, before=None, since=None, until=None, vehicle_type=None, fuel_type=None):
+        # Newest first. Paged by keyset: pass the previous page's last
+        # (ts, id) as before= (see cursor()), so a deep page is one index
+        # range scan instead of skipping every row above it.
+        where, params = self._where(since, until, vehicle_type, fuel_type, before=before)
+        cur = self._reader().execute(
+            f"SELECT id, ts, distance_km, fuel_type, vehicle_type, passengers, payload_kg, avg_speed_kmph, pred_kg, model_version "
+            f"FROM predictions{where} ORDER BY ts DESC, id DESC LIMIT ?",
+            params + [int(limit)],
+        )
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def cursor(self, skip, before=None, since=None, until=None, vehicle_type=None, fuel_type=None):
+        # Keyset cursor (ts, id) of the skip-th row after before, for
+        # jumping several pages at once; None past the end. Reads only the
+        # index, not the rows.
+        if skip < 1:
+            return before
+        where, params = self._where(since, until, vehicle_type, fuel_type, before=before)
+        row = self._reader().execute(
+            f"SELECT ts, id FROM predictions{where} ORDER BY ts DESC, id DESC LIMIT 1 OFFSET ?",
+            params + [int(skip) - 1],
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def count(self, since=None, until=None, vehicle_type=None, fuel_type=None):
+        if since is None and until is None:
+            with self._counts_lock:
+                return sum(
+                    n for (vehicle, fuel), n in self._counts.items()
+                    if vehicle_type in (None, vehicle) and fuel_type in (None, fuel)
+                )
+        where, params = self._where(since, until, vehicle_type, fuel_type)
+        return self._reader().execute(f"SELECT COUNT(*) FROM predictions{where}", params).fetchone()[0]
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log(path=DEFAULT_PATH):
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = PredictionLog(path)
+                atexit.register(_log.flush, 5.0)
+    return _log
@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import fastpath
+import flatmodel
+from inference import ARTIFACT_FILES, BASE_DIR, resolve_artifact_dir
+from metrics import REGISTRY
+
+# Versioned artifact sets:
+#
+#   registry/manifest.json        current version, optional shadow candidate,
+#                                 per-version metadata
+#   registry/versions/<version>/  encoder.pkl, scaler.pkl, model.pkl, model.flat/
+#
+# Version directories are written under a temporary name and renamed into
+# place, and never modified afterwards. Switching versions is an os.replace
+# of manifest.json; writers hold registry/manifest.lock (created with
+# O_EXCL) around each read-modify-write, so concurrent publishes cannot
+# lose each other's entries. Readers re-stat the manifest at most every
+# CO2_REGISTRY_CHECK_S seconds, so a running app picks up the new version
+# within that interval; predictions already in flight finish on the
+# predictor object they started with.
+
+REGISTRY_DIR = os.environ.get("CO2_REGISTRY_DIR", os.path.join(BASE_DIR, "registry"))
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+LOCK_TIMEOUT_S = 30.0
+CHECK_INTERVAL_S = float(os.environ.get("CO2_REGISTRY_CHECK_S", "1.0"))
+VERSIONS_DIR = "versions"
+FORMAT = "co2-registry"
+LOCAL_VERSION = "local"
+
+SHADOW_RATE = float(os.environ.get("CO2_SHADOW_RATE", "0"))
+SHADOW_QUEUE = 1024
+DELTA_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+
+def manifest_path(root=REGISTRY_DIR):
+    return os.path.join(root, MANIFEST_FILE)
+
+
+def version_dir(version, root=REGISTRY_DIR):
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def empty_manifest():
+    return {"format": FORMAT, "current": None, "candidate": None, "versions": {}}
+
+
+def read_manifest(root=REGISTRY_DIR):
+    try:
+        with open(manifest_path(root), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"{manifest_path(root)} is not a {FORMAT} manifest")
+    return manifest
+
+
+def write_manifest(manifest, root=REGISTRY_DIR):
+    os.makedirs(root, exist_ok=True)
+    path = manifest_path(root)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    _manifests.pop(root, None)
+
+
+@contextmanager
+def manifest_lock(root=REGISTRY_DIR, timeout=LOCK_TIMEOUT_S):
+    # Cross-process lock for manifest updates: a lock file created with
+    # O_EXCL, holding the owner's pid. A writer that dies inside leaves the
+    # file behind; it has to be removed by hand (the error names it).
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, LOCK_FILE)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"registry is locked by {path}; remove it if no publish is running") from None
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.unlink(path)
+
+
+def next_version(manifest):
+    numbers = [int(v[1:]) for v in manifest["versions"] if v[:1] == "v" and v[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1}"
+
+
+def publish(src_dir=BASE_DIR, version=None, note="", activate=False, root=REGISTRY_DIR):
+    # Copies an artifact set (the three pickles, plus a flat export that is
+    # regenerated if missing, stale or without explanation statistics) into
+    # a new immutable version.
+    # The copy and flat export happen unlocked in a private staging
+    # directory; only naming the version and updating the manifest hold
+    # the lock.
+    src_dir = resolve_artifact_dir(src_dir)
+    if version is not None and (version in read_manifest(root)["versions"] or os.path.exists(version_dir(version, root))):
+        raise ValueError(f"version {version!r} already exists")
+
+    staging = os.path.join(root, VERSIONS_DIR, f".staging.{os.getpid()}.{threading.get_ident()}.tmp")
+    os.makedirs(staging)
+    try:
+        for name in ARTIFACT_FILES:
+            shutil.copy2(os.path.join(src_dir, name), os.path.join(staging, name))
+        flat_src = os.path.join(src_dir, os.path.basename(flatmodel.FLAT_DIR))
+        flat_dst = os.path.join(staging, os.path.basename(flatmodel.FLAT_DIR))
+        if os.path.isdir(flat_src):
+            shutil.copytree(flat_src, flat_dst)
+        compiled = flatmodel.load_current(staging, flat_dst)
+        if compiled is None or compiled.explain_stats is None:
+            # Same as `flatmodel.py export`: the explanation statistics are
+            # rebuilt from the training split, so every version can explain
+            # without touching sklearn or the CSV while serving.
+            from explain import training_stats
+            from inference import load_engine
+
+            engine = load_engine(staging)
+            stats = training_stats(fastpath.CompiledPredictor.from_engine(engine))
+            flatmodel.export_flat(engine.encoder, engine.scaler, engine.model, flat_dst, staging, stats)
+        with manifest_lock(root):
+            manifest = read_manifest(root)
+            version = version or next_version(manifest)
+            if version in manifest["versions"] or os.path.exists(version_dir(version, root)):
+                raise ValueError(f"version {version!r} already exists")
+            os.rename(staging, version_dir(version, root))
+            manifest["versions"][version] = {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "source": os.path.abspath(src_dir),
+                "digests": flatmodel.source_digests(version_dir(version, root)),
+                "note": note,
+            }
+            if activate or manifest["current"] is None:
+                manifest["current"] = version
+            write_manifest(manifest, root)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def _set(field, version, root=REGISTRY_DIR):
+    with manifest_lock(root):
+        manifest = read_manifest(root)
+        if version is not None and version not in manifest["versions"]:
+            raise ValueError(f"unknown version {version!r}; have {sorted(manifest['versions'])}")
+        manifest[field] = version
+        write_manifest(manifest, root)
+
+
+def activate(version, root=REGISTRY_DIR):
+    _set("current", version, root)
+
+
+def set_candidate(version, root=REGISTRY_DIR):
+    _set("candidate", version, root)
+
+
+_lock = threading.Lock()
+_manifests = {}
+
+
+def current_manifest(root=REGISTRY_DIR):
+    # Parsed manifest (None without a registry), cached by mtime. The stat
+    # itself is skipped for CHECK_INTERVAL_S after the last one, so the
+    # per-prediction cost is a dict lookup and a clock read.
+    now = time.monotonic()
+    cached = _manifests.get(root)
+    if cached is not None and now - cached[2] < CHECK_INTERVAL_S:
+        return cached[1]
+    try:
+        mtime = os.stat(manifest_path(root)).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if cached is not None and cached[0] == mtime:
+        _manifests[root] = (mtime, cached[1], now)
+        return cached[1]
+    with _lock:
+        manifest = None if mtime is None else read_manifest(root)
+        _manifests[root] = (mtime, manifest, now)
+        return manifest
+
+
+def get_predictor(version=None, root=REGISTRY_DIR):
+    # (version, compiled predictor) for `version`, or the current version.
+    # Without a registry this is the artifacts next to the app ("local").
+    manifest = current_manifest(root)
+    if manifest is None or manifest["current"] is None:
+        if version not in (None, LOCAL_VERSION):
+            raise ValueError(f"no registry at {root}")
+        return LOCAL_VERSION, fastpath.get_compiled()
+    version = version or manifest["current"]
+    if version not in manifest["versions"]:
+        raise ValueError(f"unknown version {version!r}")
+    return version, fastpath.get_compiled(version_dir(version, root))
+
+
+def current_version(root=REGISTRY_DIR):
+    # Name of the version get_predictor() serves, without loading it.
+    manifest = current_manifest(root)
+    if manifest is None or manifest["current"] is None:
+        return LOCAL_VERSION
+    return manifest["current"]
+
+
+def candidate_version(root=REGISTRY_DIR):
+    manifest = current_manifest(root)
+    if manifest is None:
+        return None
+    candidate = manifest.get("candidate")
+    return candidate if candidate != manifest["current"] else None
+
+
+class ShadowScorer:
+    # Re-scores a sampled fraction of live predictions with the candidate
+    # version on a background thread. offer() never blocks: when the queue
+    # is full the sample is counted as dropped. Latency and |candidate -
+    # primary| go into the metrics registry.
+
+    def __init__(self, rate=SHADOW_RATE, root=REGISTRY_DIR, queue_size=SHADOW_QUEUE):
+        self.rate = rate
+        self.root = root
+        self._queue = queue.Queue(queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.delta_sum = 0.0
+        self.abs_delta_max = 0.0
+        self.last_candidate = None
+
+        self.scored = REGISTRY.counter("shadow_scored_total", "Predictions re-scored by the shadow candidate")
+        self.dropped = REGISTRY.counter("shadow_dropped_total", "Shadow samples dropped because the queue was full")
+        self.errors = REGISTRY.counter("shadow_errors_total", "Shadow predictions that raised")
+        self.primary_time = REGISTRY.histogram("shadow_primary_seconds", "Primary predict latency for sampled requests")
+        self.candidate_time = REGISTRY.histogram("shadow_candidate_seconds", "Candidate predict latency")
+        self.abs_delta = REGISTRY.histogram("shadow_abs_delta_g_km", "|candidate - primary| prediction", DELTA_BUCKETS)
+
+    def offer(self, features, primary_pred, primary_s, explained=False):
+        # explained: the primary call was explain_row (prediction plus
+        # contributions and interval); the candidate then runs the same
+        # call, so the two latencies compare like for like.
+        if self.rate <= 0.0 or random.random() >= self.rate:
+            return False
+        candidate = candidate_version(self.root)
+        if candidate is None:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((candidate, dict(features), float(primary_pred), primary_s, explained))
+        except queue.Full:
+            self.dropped.inc()
+            return False
+        return True
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="co2-shadow", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            candidate, features, primary_pred, primary_s, explained = self._queue.get()
+            try:
+                _, compiled = get_predictor(candidate, self.root)
+                if explained:
+                    from explain import get_explainer
+
+                    explainer = get_explainer(compiled)
+                    t0 = time.perf_counter()
+                    pred = explainer.explain_row(features)["pred"]
+                else:
+                    t0 = time.perf_counter()
+                    pred = compiled.predict_row(features)
+                elapsed = time.perf_counter() - t0
+            except Exception:
+                self.errors.inc()
+                continue
+            delta = pred - primary_pred
+            self.primary_time.observe(primary_s)
+            self.candidate_time.observe(elapsed)
+            self.abs_delta.observe(abs(delta))
+            with self._stats_lock:
+                self.delta_sum += delta
+                self.abs_delta_max = max(self.abs_delta_max, abs(delta))
+                self.last_candidate = candidate
+            self.scored.inc()
+
+    def stats(self):
+        n = self.scored.value
+        with self._stats_lock:
+            return {
+                "rate": self.rate,
+                "candidate": self.last_candidate or candidate_version(self.root),
+                "scored": n,
+                "dropped": self.dropped.value,
+                "errors": self.errors.value,
+                "mean_delta": self.delta_sum / n if n else 0.0,
+                "max_abs_delta": self.abs_delta_max,
+                "mean_abs_delta": self.abs_delta.snapshot()["mean"],
+                "primary_p99_s": self.primary_time.quantile(0.99),
+                "candidate_p99_s": self.candidate_time.quantile(0.99),
+            }
+
+
+_shadow = None
+_shadow_lock = threading.Lock()
+
+
+def get_shadow():
+    global _shadow
+    if _shadow is None:
+        with _shadow_lock:
+            if _shadow is None:
+                _shadow = ShadowScorer()
+    return _shadow
+
+
+def predict_row(features):
+    # Scores with the current version and offers the request to the shadow
+    # scorer. Returns (prediction, version).
+    version, compiled = get_predictor()
+    t0 = time.perf_counter()
+    pred = compiled.predict_row(features)
+    get_shadow().offer(features, pred, time.perf_counter() - t0)
+    return pred, version
+
+
+def explain_row(features):
+    # predict_row plus explain.Explainer output (contributions and a
+    # prediction interval) from the same call. Returns (explained, version).
+    from explain import get_explainer
+
+    version, compiled = get_predictor()
+    t0 = time.perf_counter()
+    explained = get_explainer(compiled).explain_row(features)
+    get_shadow().offer(features, explained["pred"], time.perf_counter() - t0, explained=True)
+    return explained, version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--root", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_publish = sub.add_parser("publish", help="copy an artifact directory in as a new version")
+    p_publish.add_argument("--from", dest="src", default=BASE_DIR)
+    p_publish.add_argument("--version")
+    p_publish.add_argument("--note", default="")
+    p_publish.add_argument("--activate", action="store_true")
+    sub.add_parser("list", help="show versions")
+    p_activate = sub.add_parser("activate", help="make a version current (running apps swap on their next call)")
+    p_activate.add_argument("version")
+    p_shadow = sub.add_parser("shadow", help="set the shadow candidate ('none' to clear)")
+    p_shadow.add_argument("version")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        version = publish(args.src, args.version, args.note, args.activate, args.root)
+        print(f"published {version} from {args.src}")
+    elif args.command == "activate":
+        activate(args.version, args.root)
+        print(f"current -> {args.version}")
+    elif args.command == "shadow":
+        set_candidate(None if args.version == "none" else args.version, args.root)
+        print(f"candidate -> {args.version}")
+    else:
+        manifest = read_manifest(args.root)
+        for version, meta in sorted(manifest["versions"].items()):
+            tags = [t for t, v in (("current", manifest["current"]), ("candidate", manifest["candidate"])) if v == version]
+            print(f"{version:<10} {meta['created']}  {','.join(tags):<17} {meta['note']}")
+
+
+if __name__ == "__main__":
+    main()
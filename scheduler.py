@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from metrics import REGISTRY, SIZE_BUCKETS
+from predictor import INPUT_FIELDS, dummy_predict_batch
+
+DEFAULT_MAX_BATCH = int(os.environ.get("CO2_BATCH_MAX", "256"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("CO2_BATCH_WAIT_MS", "2"))
+DEFAULT_MAX_PENDING = int(os.environ.get("CO2_BATCH_MAX_PENDING", "4096"))
+
+
+class SchedulerFull(RuntimeError):
+    pass
+
+
+def predict_rows(rows):
+    return dummy_predict_batch(**{f: [row[f] for row in rows] for f in INPUT_FIELDS})
+
+
+class BatchScheduler:
+    # Gathers single-row predictions submitted from many threads (one per
+    # Streamlit session, or the service's event loop) and scores each group
+    # with one vectorized call. A batch is flushed when it reaches max_batch
+    # rows or when its first row has waited max_wait_ms. At most
+    # max_pending rows are queued or being scored at once. With a monitor
+    # (a drift.DriftMonitor), every scored row is observed on the worker
+    # thread after its result is delivered.
+
+    def __init__(self, predict_batch=predict_rows, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, max_pending=DEFAULT_MAX_PENDING, name="scheduler", monitor=None):
+        self.predict_batch = predict_batch
+        self.monitor = monitor
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.max_pending = max_pending
+        self.name = name
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.rows = REGISTRY.counter(f"{name}_rows_total", "Rows scored by the micro-batch scheduler")
+        self.batches = REGISTRY.counter(f"{name}_batches_total", "Vectorized predict calls made by the scheduler")
+        self.batch_size = REGISTRY.histogram(f"{name}_batch_size", "Rows per vectorized predict call", SIZE_BUCKETS)
+        self.queue_wait = REGISTRY.histogram(f"{name}_queue_wait_seconds", "Time from submit to batch dispatch")
+        self.predict_time = REGISTRY.histogram(f"{name}_predict_seconds", "Duration of each vectorized predict call")
+        self.latency = REGISTRY.histogram(f"{name}_latency_seconds", "Time from submit to result")
+        self.rejected = REGISTRY.counter(f"{name}_rejected_total", "Rows refused because max_pending rows were in flight")
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"co2-batch-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def submit(self, features, block=True, timeout=None):
+        # Waits for a free slot while max_pending rows are in flight; with
+        # block=False, or once timeout passes, raises SchedulerFull instead.
+        if not (self._slots.acquire(timeout=timeout) if block else self._slots.acquire(False)):
+            self.rejected.inc()
+            raise SchedulerFull(f"{self.max_pending} predictions already pending")
+        self._ensure_worker()
+        fut = Future()
+        self._queue.put((time.perf_counter(), features, fut))
+        return fut
+
+    @contextmanager
+    def reserve(self, n):
+        # Holds n of the max_pending slots for rows scored outside the queue
+        # (a whole batch request in one vectorized call), so they count
+        # against the same limit. Raises SchedulerFull unless all n are free.
+        taken = 0
+        try:
+            while taken < n and self._slots.acquire(False):
+                taken += 1
+            if taken < n:
+                self.rejected.inc(n)
+                raise SchedulerFull(f"no room for {n} rows; at most {self.max_pending} predictions may be pending")
+            yield
+        finally:
+            self._release(taken)
+
+    def predict(self, features, timeout=None):
+        return self.submit(features).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[0] + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+            for submitted, _, _ in batch:
+                self.queue_wait.observe(dispatched - submitted)
+            try:
+                preds = self.predict_batch([features for _, features, _ in batch])
+            except Exception as exc:
+                self._release(len(batch))
+                for _, _, fut in batch:
+                    fut.set_exception(exc)
+                continue
+            done = time.perf_counter()
+            self.predict_time.observe(done - dispatched)
+            self.batch_size.observe(len(batch))
+            self.batches.inc()
+            self.rows.inc(len(batch))
+            self._release(len(batch))
+            for (submitted, _, fut), pred in zip(batch, preds.tolist()):
+                self.latency.observe(done - submitted)
+                fut.set_result(pred)
+            if self.monitor is not None:
+                for _, features, _ in batch:
+                    self.monitor.observe(features)
+
+    def _release(self, n):
+        for _ in range(n):
+            self._slots.release()
+
+    def stats(self):
+        batches = self.batches.value
+        return {
+            "rows": self.rows.value,
+            "batches": batches,
+            "mean_batch": self.rows.value / batches if batches else 0.0,
+            "p50_latency_s": self.latency.quantile(0.5),
+            "p99_latency_s": self.latency.quantile(0.99),
+            "p99_predict_s": self.predict_time.quantile(0.99),
+            "rejected": self.rejected.value,
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BatchScheduler()
+    return _scheduler
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, RobustScaler
+
+from inference import DATA_PATH
+from train import CACHE_DIR, RANDOM_STATE, TEST_SIZE, load_dataset, source_digest, split_features
+
+# k-fold model selection over model x encoder x scaler candidates.
+#
+# CV runs on the notebook's training split (train_test_split, random_state=42)
+# and every candidate is then refit on that split and scored on the held-out
+# 20%, so "linear/ordinal/robust" reproduces model.ipynb. Work is grouped
+# by (fold, encoder, scaler): the preprocessed matrices for a group are built
+# once, cached on disk with joblib.Memory, and shared by every model fitted
+# in that group. Groups run in parallel.
+
+SELECTION_CACHE = os.path.join(CACHE_DIR, "selection")
+DEFAULT_FOLDS = 5
+DEFAULT_BUDGET_US = 10_000.0
+HOLDOUT = -1
+
+MODELS = {
+    "linear": lambda: LinearRegression(),
+    "ridge": lambda: Ridge(alpha=1.0),
+    "gbr": lambda: HistGradientBoostingRegressor(random_state=RANDOM_STATE),
+}
+ENCODERS = {
+    "ordinal": lambda: OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1),
+    "onehot": lambda: OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+}
+SCALERS = {
+    "robust": lambda: RobustScaler(),
+    "none": lambda: None,
+}
+
+memory = Memory(SELECTION_CACHE, verbose=0)
+
+
+class CandidateChain:
+    # encoder -> scaler -> model for one candidate, applied to raw frames.
+
+    def __init__(self, encoder, scaler, model, cat_columns, num_columns):
+        self.encoder = encoder
+        self.scaler = scaler
+        self.model = model
+        self.cat_columns = list(cat_columns)
+        self.num_columns = list(num_columns)
+
+    def transform(self, frame):
+        num = frame[self.num_columns].to_numpy(dtype=np.float64)
+        if self.scaler is not None:
+            num = self.scaler.transform(num)
+        cat = self.encoder.transform(frame[self.cat_columns].to_numpy())
+        return np.hstack([num, cat])
+
+    def predict(self, frame):
+        return self.model.predict(self.transform(frame))
+
+
+def training_split(data_path=DATA_PATH):
+    x, y, cat_cols, num_cols = split_features(load_dataset(data_path))
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    return x_train, x_test, y_train, y_test, list(cat_cols), list(num_cols)
+
+
+def _fold_matrices(data_path, data_digest, fold, folds, seed, encoder, scaler):
+    # data_digest only keys the cache; the matrices depend on file content.
+    x_train, x_test, y_train, y_test, cat_cols, num_cols = training_split(data_path)
+    if fold == HOLDOUT:
+        x_fit, x_eval, y_fit, y_eval = x_train, x_test, y_train, y_test
+    else:
+        fit_idx, eval_idx = list(KFold(folds, shuffle=True, random_state=seed).split(x_train))[fold]
+        x_fit, x_eval = x_train.iloc[fit_idx], x_train.iloc[eval_idx]
+        y_fit, y_eval = y_train.iloc[fit_idx], y_train.iloc[eval_idx]
+
+    enc = ENCODERS[encoder]()
+    enc.fit(x_fit[cat_cols].to_numpy())
+    sc = SCALERS[scaler]()
+    if sc is not None:
+        sc.fit(x_fit[num_cols].to_numpy(dtype=np.float64))
+    chain = CandidateChain(enc, sc, None, cat_cols, num_cols)
+    # Plain sklearn objects only, so the cached result unpickles anywhere.
+    return chain.transform(x_fit), chain.transform(x_eval), y_fit.to_numpy(), y_eval.to_numpy(), (enc, sc, cat_cols, num_cols), x_eval.head(10_000)
+
+
+fold_matrices = memory.cache(_fold_matrices)
+
+
+def run_group(data_path, data_digest, fold, folds, seed, encoder, scaler, models, use_cache=True):
+    # Fits every model on one (fold, encoder, scaler) group of matrices.
+    build = fold_matrices if use_cache else _fold_matrices
+    x_fit, x_eval, y_fit, y_eval, prep, sample = build(data_path, data_digest, fold, folds, seed, encoder, scaler)
+    results = []
+    for name in models:
+        model = MODELS[name]()
+        t0 = time.perf_counter()
+        model.fit(x_fit, y_fit)
+        fit_s = time.perf_counter() - t0
+        pred = model.predict(x_eval)
+        result = {
+            "model": name,
+            "encoder": encoder,
+            "scaler": scaler,
+            "fold": fold,
+            "r2": r2_score(y_eval, pred),
+            "mae": mean_absolute_error(y_eval, pred),
+            "rmse": float(np.sqrt(mean_squared_error(y_eval, pred))),
+            "fit_s": fit_s,
+        }
+        if fold == HOLDOUT:
+            # Holdout refits come back whole so the parent can time them.
+            enc, sc, cat_cols, num_cols = prep
+            result["chain"] = CandidateChain(enc, sc, model, cat_cols, num_cols)
+            result["sample"] = sample
+        results.append(result)
+    return results
+
+
+def measure_latency(chain, sample, rounds=200):
+    # Single-row latency (p50/p99 of one predict on a 1-row frame) and
+    # throughput on the whole sample, timed in the parent one candidate at a
+    # time so parallel workers don't skew the numbers.
+    row = sample.iloc[[0]]
+    chain.predict(row)
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        chain.predict(row)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    t0 = time.perf_counter()
+    chain.predict(sample)
+    batch_s = time.perf_counter() - t0
+    return {
+        "row_p50_us": times[len(times) // 2] * 1e6,
+        "row_p99_us": times[min(len(times) - 1, int(len(times) * 0.99))] * 1e6,
+        "batch_rows_per_s": len(sample) / batch_s,
+    }
+
+
+def select(data_path=DATA_PATH, folds=DEFAULT_FOLDS, seed=RANDOM_STATE, models=None, encoders=None, scalers=None, n_jobs=-1, use_cache=True):
+    models = list(models or MODELS)
+    encoders = list(encoders or ENCODERS)
+    scalers = list(scalers or SCALERS)
+    unknown = [m for m in models if m not in MODELS] + [e for e in encoders if e not in ENCODERS] + [s for s in scalers if s not in SCALERS]
+    if unknown:
+        raise ValueError(f"unknown candidates: {unknown}")
+
+    digest = source_digest(data_path)
+    groups = [(fold, enc, sc) for fold in list(range(folds)) + [HOLDOUT] for enc in encoders for sc in scalers]
+    batches = Parallel(n_jobs=n_jobs)(
+        delayed(run_group)(data_path, digest, fold, folds, seed, enc, sc, models, use_cache)
+        for fold, enc, sc in groups
+    )
+
+    by_candidate = {}
+    for result in (r for batch in batches for r in batch):
+        by_candidate.setdefault((result["model"], result["encoder"], result["scaler"]), []).append(result)
+
+    report = []
+    for (model, enc, sc), results in by_candidate.items():
+        cv = [r for r in results if r["fold"] != HOLDOUT]
+        holdout = next(r for r in results if r["fold"] == HOLDOUT)
+        entry = {
+            "candidate": f"{model}/{enc}/{sc}",
+            "cv_r2": statistics.mean(r["r2"] for r in cv),
+            "cv_r2_std": statistics.pstdev(r["r2"] for r in cv),
+            "cv_mae": statistics.mean(r["mae"] for r in cv),
+            "cv_rmse": statistics.mean(r["rmse"] for r in cv),
+            "fit_s": statistics.mean(r["fit_s"] for r in cv),
+            "holdout_r2": holdout["r2"],
+        }
+        entry.update(measure_latency(holdout["chain"], holdout["sample"]))
+        report.append(entry)
+    report.sort(key=lambda e: e["cv_r2"], reverse=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated model selection with accuracy and latency.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--models", nargs="+", choices=list(MODELS))
+    parser.add_argument("--encoders", nargs="+", choices=list(ENCODERS))
+    parser.add_argument("--scalers", nargs="+", choices=list(SCALERS))
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel workers (-1 = all cores)")
+    parser.add_argument("--budget-us", type=float, default=DEFAULT_BUDGET_US, help="single-row p99 latency budget")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild fold preprocessing instead of reading .cache/selection")
+    parser.add_argument("--json", dest="json_out", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    report = select(args.data, args.folds, models=args.models, encoders=args.encoders, scalers=args.scalers, n_jobs=args.jobs, use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{'candidate':<22} {'cv r2':>15} {'cv mae':>8} {'holdout r2':>10} {'fit':>8} {'row p50':>9} {'row p99':>9} {'rows/s':>11}  budget")
+    for e in report:
+        ok = "ok" if e["row_p99_us"] <= args.budget_us else "over"
+        print(
+            f"{e['candidate']:<22} {e['cv_r2']:>8.4f} ±{e['cv_r2_std']:.4f} {e['cv_mae']:>8.2f} {e['holdout_r2']:>10.4f} "
+            f"{e['fit_s'] * 1000:>6.0f}ms {e['row_p50_us']:>7.0f}us {e['row_p99_us']:>7.0f}us {e['batch_rows_per_s']:>11,.0f}  {ok}"
+        )
+    within = [e for e in report if e["row_p99_us"] <= args.budget_us]
+    best = within[0]["candidate"] if within else "none"
+    print(f"{args.folds}-fold CV of {len(report)} candidates in {elapsed:.1f}s; best within {args.budget_us:.0f}us p99: {best}")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+from drift import get_trip_monitor
+from formatting import format_emission, risk_band
+from metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, span
+from predictor import prepare_features
+from scheduler import BatchScheduler, SchedulerFull, predict_rows
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_MAX_PENDING = 4096
+KEEPALIVE_TIMEOUT_S = 15.0
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def format_result(pred_kg, features, units, precision):
+    band, _ = risk_band(pred_kg)
+    per_km = pred_kg / max(features["distance_km"], 0.001)
+    return {
+        "pred_kg": pred_kg,
+        "formatted": format_emission(pred_kg, units, precision),
+        "band": band,
+        "intensity_per_km": per_km,
+        "intensity_formatted": format_emission(per_km, units, precision),
+    }
+
+
+class PredictionService:
+    # Single-row requests are micro-batched by a scheduler.BatchScheduler
+    # (the same core the Streamlit app uses, in its own instance); the event
+    # loop only awaits its futures. max_pending bounds the rows in flight,
+    # and requests beyond it get 503 instead of queueing without limit.
+    # /predict/batch rows count against the same max_pending budget. Every
+    # scored row is observed by the trip drift monitor; /health carries its
+    # totals.
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, max_pending=DEFAULT_MAX_PENDING, monitor=None):
+        self.monitor = monitor or get_trip_monitor()
+        self.scheduler = BatchScheduler(max_batch=max_batch, max_wait_ms=max_wait_ms, max_pending=max_pending, name="service", monitor=self.monitor)
+        self.requests = 0
+        self.started = time.time()
+
+    async def handle(self, method, path, body):
+        # Transport-independent request handling: returns (status, payload).
+        self.requests += 1
+        try:
+            with span("service_request"):
+                return HTTPStatus.OK, await self._dispatch(method, path, body)
+        except HTTPError as exc:
+            return exc.status, {"error": str(exc)}
+        except SchedulerFull as exc:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)}
+        except (ValueError, TypeError, KeyError) as exc:
+            return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+
+    async def _dispatch(self, method, path, body):
+        route = path.split("?", 1)[0].rstrip("/") or "/"
+        if route == "/health":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            return self.stats()
+        if route == "/metrics":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            return render_prometheus()
+        if route not in ("/predict", "/predict/batch"):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {route}")
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {exc}")
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        units = payload.get("units", "kg CO₂")
+        precision = int(payload.get("precision", 2))
+
+        if route == "/predict":
+            with span("service_prepare"):
+                features = prepare_features(payload.get("inputs", payload))
+            pred_kg = await asyncio.wrap_future(self.scheduler.submit(features, block=False))
+            return format_result(pred_kg, features, units, precision)
+
+        rows = payload.get("rows")
+        if not isinstance(rows, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "batch body needs a 'rows' list")
+        if len(rows) > self.scheduler.max_pending:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"at most {self.scheduler.max_pending} rows per batch")
+        # The rows take slots from the scheduler's max_pending budget (503
+        # when it is used up) and are scored on a worker thread, so a large
+        # batch neither stalls the event loop nor escapes the limit.
+        with self.scheduler.reserve(len(rows)):
+            return await asyncio.to_thread(self._score_batch, rows, units, precision)
+
+    def _score_batch(self, rows, units, precision):
+        with span("service_prepare"):
+            features = [prepare_features(row) for row in rows]
+        with span("service_batch_predict"):
+            preds = predict_rows(features).tolist() if features else []
+        for row in features:
+            self.monitor.observe(row)
+        return {
+            "count": len(preds),
+            "predictions": [format_result(p, f, units, precision) for p, f in zip(preds, features)],
+        }
+
+    def stats(self):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started, 3),
+            "requests": self.requests,
+            "batches": self.scheduler.batches.value,
+            "batched_rows": self.scheduler.rows.value,
+            "mean_batch": self.scheduler.stats()["mean_batch"],
+            "rejected": self.scheduler.rejected.value,
+            "inputs": {k: v for k, v in self.monitor.report().items() if k != "features"},
+        }
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT_S)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, payload = await self.handle(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        # Routes return dicts (sent as JSON) or preformatted text (/metrics).
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+        else:
+            data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8600, **options):
+    service = PredictionService(**options)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON CO₂ prediction service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING)
+    args = parser.parse_args(argv)
+    print(f"serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_pending=args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
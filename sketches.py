@@ -0,0 +1,107 @@
+import numpy as np
+
+DEFAULT_MAX_CENTROIDS = 1024
+
+
+class QuantileSketch:
+    # Weighted centroids kept in sorted order. While the number of distinct
+    # values stays under max_centroids the sketch is exact and quantile()
+    # matches np.percentile(..., method="linear"); past that, the closest
+    # neighbouring centroids are merged, so memory stays bounded. Sketches
+    # built on different workers can be combined with merge().
+
+    def __init__(self, max_centroids=DEFAULT_MAX_CENTROIDS):
+        self.max_centroids = max_centroids
+        self.values = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        uniq, counts = np.unique(values, return_counts=True)
+        self._absorb(uniq, counts.astype(np.float64))
+
+    def merge(self, other):
+        if other.weights.size:
+            self._absorb(other.values, other.weights)
+        return self
+
+    def _absorb(self, values, weights):
+        self.min = min(self.min, float(values[0]))
+        self.max = max(self.max, float(values[-1]))
+        allv = np.concatenate([self.values, values])
+        allw = np.concatenate([self.weights, weights])
+        uniq, inv = np.unique(allv, return_inverse=True)
+        self.values = uniq
+        self.weights = np.bincount(inv.reshape(-1), weights=allw, minlength=uniq.size)
+        if self.values.size > self.max_centroids:
+            self._compress()
+
+    def _compress(self):
+        values, weights = self.values, self.weights
+        while values.size > self.max_centroids:
+            gaps = np.diff(values)
+            # Merge every pair whose gap is among the smallest, skipping
+            # overlaps, until the budget is met.
+            excess = values.size - self.max_centroids
+            order = np.argsort(gaps, kind="stable")
+            taken = np.zeros(values.size, dtype=bool)
+            pairs = []
+            for i in order:
+                if taken[i] or taken[i + 1]:
+                    continue
+                taken[i] = taken[i + 1] = True
+                pairs.append(i)
+                if len(pairs) >= excess:
+                    break
+            keep = np.ones(values.size, dtype=bool)
+            for i in pairs:
+                w = weights[i] + weights[i + 1]
+                values[i] = (values[i] * weights[i] + values[i + 1] * weights[i + 1]) / w
+                weights[i] = w
+                keep[i + 1] = False
+            values, weights = values[keep], weights[keep]
+        self.values, self.weights = values, weights
+
+    def quantile(self, q):
+        n = self.count
+        if not n:
+            return np.nan
+        q = np.asarray(q, dtype=np.float64)
+        pos = (n - 1) * q
+        upper_rank = np.cumsum(self.weights) - 1
+        lo = np.floor(pos)
+        i = np.searchsorted(upper_rank, lo, side="left")
+        j = np.searchsorted(upper_rank, np.minimum(lo + 1, n - 1), side="left")
+        frac = pos - lo
+        return self.values[i] + (self.values[j] - self.values[i]) * frac
+
+    def cdf(self, x):
+        # Fraction of observations <= x.
+        n = self.count
+        if not n:
+            return np.zeros_like(np.asarray(x, dtype=np.float64))
+        cum = np.concatenate([[0.0], np.cumsum(self.weights)])
+        return cum[np.searchsorted(self.values, x, side="right")] / n
+
+    def to_arrays(self):
+        return {"values": self.values, "weights": self.weights, "bounds": np.array([self.min, self.max])}
+
+    @classmethod
+    def from_arrays(cls, values, weights, bounds=None, max_centroids=DEFAULT_MAX_CENTROIDS):
+        sketch = cls(max_centroids)
+        sketch.values = np.asarray(values, dtype=np.float64).copy()
+        sketch.weights = np.asarray(weights, dtype=np.float64).copy()
+        if bounds is not None:
+            sketch.min, sketch.max = float(bounds[0]), float(bounds[1])
+        elif sketch.values.size:
+            sketch.min, sketch.max = float(sketch.values[0]), float(sketch.values[-1])
+        return sketch
@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+
+# In-process equivalent of `python -X importtime`: while installed, a
+# sys.meta_path finder wraps the loader of every module that is actually
+# loaded (not already in sys.modules) and times its execution, with self
+# time split from the time spent in its own nested imports. The module
+# gets its real loader back before its code runs.
+
+ENABLED = os.environ.get("CO2_PROFILE_STARTUP", "0").lower() in ("1", "true", "yes")
+
+# app.py imports this module first, so the first script run of a process
+# is timed from here and includes the cold imports.
+IMPORTED_AT = time.perf_counter()
+
+_local = threading.local()
+_records = []
+_records_lock = threading.Lock()
+_installed = False
+_first_run = True
+
+
+class _TimedLoader:
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = module.__spec__.loader = self.loader
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with _records_lock:
+                _records.append({"module": module.__name__, "self_s": elapsed - children, "cumulative_s": elapsed, "depth": len(stack)})
+
+
+class _TimingFinder:
+    # Asks the finders after it for the spec and swaps in a _TimedLoader.
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(_local, "finding", False):
+            return None
+        _local.finding = True
+        try:
+            for finder in sys.meta_path:
+                find_spec = getattr(finder, "find_spec", None)
+                if finder is self or find_spec is None:
+                    continue
+                spec = find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            _local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader)
+        return spec
+
+
+_finder = _TimingFinder()
+
+
+def install():
+    global _installed
+    if not _installed:
+        sys.meta_path.insert(0, _finder)
+        _installed = True
+
+
+def uninstall():
+    global _installed
+    if _installed:
+        sys.meta_path.remove(_finder)
+        _installed = False
+
+
+def is_installed():
+    return _installed
+
+
+def import_records():
+    with _records_lock:
+        return list(_records)
+
+
+def top_imports(n=10, top_level_only=True):
+    records = [r for r in import_records() if not top_level_only or r["depth"] == 0]
+    return sorted(records, key=lambda r: r["cumulative_s"], reverse=True)[:n]
+
+
+def loaded(*modules):
+    return [m for m in modules if m in sys.modules]
+
+
+class RunTimer:
+    # Wall-clock marks relative to the start of one script run.
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter() - self.started
+        return self.marks[name]
+
+
+def run_timer():
+    # Timer for the current script run: the process's first run starts at
+    # IMPORTED_AT, later runs (whose imports are sys.modules hits) now.
+    global _first_run
+    with _records_lock:
+        started = IMPORTED_AT if _first_run else None
+        _first_run = False
+    return RunTimer(started)
+
+
+if ENABLED:
+    install()
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Profile module import cost (like python -X importtime).")
+    parser.add_argument("modules", nargs="*", default=["app"])
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    install()
+    t0 = time.perf_counter()
+    for name in args.modules:
+        importlib.import_module(name)
+    total = time.perf_counter() - t0
+    uninstall()
+
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for r in sorted(import_records(), key=lambda r: r["cumulative_s"], reverse=True)[:args.top]:
+        print(f"{r['cumulative_s'] * 1000:>10.1f}ms {r['self_s'] * 1000:>8.1f}ms  {'  ' * r['depth']}{r['module']}")
+    print(f"total {total * 1000:.1f} ms; heavy modules loaded: {', '.join(loaded('numpy', 'pandas', 'joblib', 'sklearn')) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from predictor import FUEL_TYPES, INPUT_FIELDS, VEHICLE_TYPES, dummy_predict_batch, prepare_features
+
+DEFAULT_POINTS = 1000
+CACHE_SIZE = 64
+
+# Field -> (label, default low, default high). Passengers is swept over
+# whole numbers, so its grid has at most hi - lo + 1 points.
+SWEEP_FIELDS = {
+    "avg_speed_kmph": ("Average Speed (km/h)", 5.0, 200.0),
+    "payload_kg": ("Payload (kg)", 0.0, 2000.0),
+    "passengers": ("Passengers", 1, 6),
+    "distance_km": ("Distance (km)", 1.0, 1000.0),
+}
+
+
+def grid_values(field, lo, hi, points):
+    if field not in SWEEP_FIELDS:
+        raise ValueError(f"cannot sweep {field!r}; choose from {list(SWEEP_FIELDS)}")
+    if hi < lo:
+        raise ValueError("sweep range is empty")
+    if field == "passengers":
+        return np.arange(int(lo), int(hi) + 1)
+    return np.linspace(float(lo), float(hi), max(2, int(points)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _sweep(base, field, lo, hi, points, vehicles, fuels):
+    values = grid_values(field, lo, hi, points)
+    inputs = dict(base)
+    # vehicles x fuels x points, evaluated in one broadcast call.
+    inputs["vehicle_type"] = np.array([VEHICLE_TYPES.index(v) for v in vehicles], dtype=np.intp)[:, None, None]
+    inputs["fuel_type"] = np.array([FUEL_TYPES.index(f) for f in fuels], dtype=np.intp)[None, :, None]
+    inputs[field] = values[None, None, :]
+    pred = dummy_predict_batch(**{name: inputs[name] for name in INPUT_FIELDS})
+    pred = np.broadcast_to(pred, (len(vehicles), len(fuels), len(values))).copy()
+    values.flags.writeable = False
+    pred.flags.writeable = False
+    return values, pred
+
+
+def sweep(base, field, lo=None, hi=None, points=DEFAULT_POINTS, vehicles=None, fuels=None):
+    # Response of the predictor to one input over [lo, hi] for every
+    # vehicle/fuel pair, holding the other inputs at `base`. Results are
+    # cached by grid definition and returned read-only.
+    base = prepare_features(base)
+    _, default_lo, default_hi = SWEEP_FIELDS.get(field, (None, None, None))
+    lo = default_lo if lo is None else lo
+    hi = default_hi if hi is None else hi
+    vehicles = tuple(VEHICLE_TYPES if vehicles is None else vehicles)
+    fuels = tuple(FUEL_TYPES if fuels is None else fuels)
+    unknown = [v for v in vehicles if v not in VEHICLE_TYPES] + [f for f in fuels if f not in FUEL_TYPES]
+    if unknown:
+        raise ValueError(f"unknown categories: {unknown}")
+    if not vehicles or not fuels:
+        raise ValueError("select at least one vehicle type and one fuel type")
+    key_base = tuple(sorted((k, v) for k, v in base.items() if k not in ("vehicle_type", "fuel_type", field)))
+    values, pred = _sweep(key_base, field, float(lo), float(hi), int(points), vehicles, fuels)
+    return {"field": field, "values": values, "vehicles": list(vehicles), "fuels": list(fuels), "pred": pred}
+
+
+def cache_info():
+    return _sweep.cache_info()
+
+
+def clear_cache():
+    _sweep.cache_clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time a what-if sweep against per-point predictor calls.")
+    parser.add_argument("--field", default="avg_speed_kmph", choices=list(SWEEP_FIELDS))
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    args = parser.parse_args(argv)
+
+    from predictor import dummy_predict
+
+    base = {"distance_km": 12.0, "fuel_type": "Petrol", "vehicle_type": "Car", "passengers": 1, "payload_kg": 0.0, "avg_speed_kmph": 55.0}
+    t0 = time.perf_counter()
+    result = sweep(base, args.field, points=args.points)
+    grid_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    sweep(base, args.field, points=args.points)
+    cached_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    worst = 0.0
+    for i, vehicle in enumerate(result["vehicles"]):
+        for j, fuel in enumerate(result["fuels"]):
+            for k, value in enumerate(result["values"].tolist()):
+                row = dict(base, vehicle_type=vehicle, fuel_type=fuel, **{args.field: value})
+                worst = max(worst, abs(dummy_predict(**row) - result["pred"][i, j, k]))
+    loop_s = time.perf_counter() - t0
+
+    print(f"grid {result['pred'].shape} ({result['pred'].size:,} points)")
+    print(f"vectorized {grid_s * 1000:.2f} ms, cached {cached_s * 1000:.3f} ms, scalar loop {loop_s * 1000:.1f} ms")
+    print(f"max |grid - scalar| = {worst:.3e}")
+
+
+if __name__ == "__main__":
+    main()
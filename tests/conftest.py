@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root and resolve their artifacts
+# relative to it.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def pytest_configure(config):
+    # The pickles were written by an older scikit-learn than some
+    # environments have installed.
+    config.addinivalue_line("filterwarnings", "ignore:Trying to unpickle estimator")
+
+
+@pytest.fixture(scope="session")
+def data():
+    import pandas as pd
+
+    from inference import DATA_PATH
+
+    return pd.read_csv(DATA_PATH)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    import inference
+
+    return inference.get_engine()
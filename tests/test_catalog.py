@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import pytest
+
+import catalog
+from inference import DATA_PATH
+
+
+@pytest.fixture(scope="module")
+def vehicles():
+    return catalog.VehicleCatalog.from_csv(DATA_PATH)
+
+
+def makes(vehicles, rows):
+    return {vehicles.value(i, catalog.MAKE_COLUMN) for i in rows}
+
+
+def models(vehicles, rows):
+    return [vehicles.value(i, catalog.MODEL_COLUMN) for i in rows]
+
+
+def test_prefix_of_a_make_lists_its_rows_first(vehicles):
+    rows = vehicles.search("toyo", limit=500)
+    assert rows and makes(vehicles, rows) == {"TOYOTA"}
+    assert vehicles.complete_make("a") == ["ACURA", "ALFA ROMEO", "ASTON MARTIN", "AUDI"]
+
+
+def test_make_then_model_prefix(vehicles):
+    rows = vehicles.search("Toyota  cam", limit=500)
+    assert rows and makes(vehicles, rows) == {"TOYOTA"}
+    assert all(m.casefold().startswith("cam") for m in models(vehicles, rows))
+
+
+def test_model_prefix_across_makes(vehicles):
+    rows = vehicles.search("camr", limit=500)
+    assert rows and all(m.casefold().startswith("camr") for m in models(vehicles, rows))
+
+
+def test_multi_word_makes(vehicles):
+    rows = vehicles.search("aston martin v8", limit=500)
+    assert rows and makes(vehicles, rows) == {"ASTON MARTIN"}
+    assert set(models(vehicles, rows)) == {"V8 VANTAGE", "V8 VANTAGE S"}
+    # The first word alone still reaches the whole make.
+    assert makes(vehicles, vehicles.search("aston", limit=500)) == {"ASTON MARTIN"}
+    assert makes(vehicles, vehicles.search("land rover", limit=500)) == {"LAND ROVER"}
+
+
+def test_empty_query(vehicles):
+    assert vehicles.search("") == []
+    assert vehicles.search("   ") == []
+    assert vehicles.search("zzzz") == []
+
+
+def test_catalog_is_rebuilt_when_the_csv_changes(tmp_path):
+    path = tmp_path / "fleet.csv"
+    shutil.copy(DATA_PATH, path)
+    first = catalog.get_catalog(str(path))
+    assert catalog.get_catalog(str(path)) is first
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        lines = f.readlines()
+    path.write_text("".join(lines[:11]), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = catalog.get_catalog(str(path))
+    assert second is not first
+    assert second.size == 10
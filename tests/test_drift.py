@@ -0,0 +1,93 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import drift
+
+TRIP = {
+    "distance_km": 12.0,
+    "fuel_type": "Diesel",
+    "vehicle_type": "Car",
+    "passengers": 2,
+    "payload_kg": 0.0,
+    "avg_speed_kmph": 60.0,
+}
+
+
+def trip_monitor():
+    from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+    return drift.DriftMonitor(drift.ReferenceProfile.for_trips(), {"fuel_type": FUEL_TYPES, "vehicle_type": VEHICLE_TYPES})
+
+
+def test_non_finite_and_missing_values_are_invalid_and_not_sketched():
+    monitor = trip_monitor()
+    assert monitor.observe(TRIP) == []
+    issues = monitor.observe(dict(TRIP, distance_km=math.nan, payload_kg=math.inf, fuel_type=None))
+    assert len(issues) == 3
+    missing = dict(TRIP)
+    del missing["passengers"]
+    assert monitor.observe(missing) == ["passengers is missing or not a finite number"]
+
+    report = monitor.report()
+    assert report["rows"] == 3
+    assert report["invalid"] == 4
+    assert monitor.sketches["distance_km"].count == 2
+    assert monitor.sketches["passengers"].count == 2
+    assert sum(monitor.counts["fuel_type"].values()) == 2
+    assert np.isfinite(monitor.sketches["payload_kg"].max)
+
+
+def test_form_inputs_at_their_limits_are_not_flagged():
+    monitor = trip_monitor()
+    rows = [
+        dict(TRIP, distance_km=0.0),
+        dict(TRIP, avg_speed_kmph=1.0),
+        dict(TRIP, avg_speed_kmph=4.0),
+        dict(TRIP, distance_km=1500.0),
+        dict(TRIP, passengers=40, payload_kg=5000.0),
+    ]
+    assert [monitor.observe(r) for r in rows] == [[]] * len(rows)
+    assert monitor.observe(dict(TRIP, passengers=0)) == ["passengers = 0 outside expected range [1, inf]"]
+    assert monitor.report()["out_of_range"] == 1
+
+
+def test_frame_path_matches_row_path():
+    rows = [
+        TRIP,
+        dict(TRIP, distance_km=math.nan),
+        dict(TRIP, avg_speed_kmph=0.5),
+        dict(TRIP, vehicle_type="Hovercraft", fuel_type=None),
+    ]
+    by_row, by_frame = trip_monitor(), trip_monitor()
+    flagged = [bool(by_row.observe(r)) for r in rows]
+    assert by_frame.observe_frame(pd.DataFrame(rows)).tolist() == flagged == [False, True, True, True]
+    a, b = by_row.report(), by_frame.report()
+    for key in ("rows", "invalid", "out_of_range", "unknown"):
+        assert a[key] == b[key]
+    assert by_frame.sketches["distance_km"].count == 3
+
+
+def test_service_observes_every_scored_row():
+    import asyncio
+    import json
+
+    from service import PredictionService
+
+    service = PredictionService(monitor=trip_monitor())
+
+    async def run():
+        await service.handle("POST", "/predict", json.dumps({"inputs": TRIP}).encode())
+        await service.handle("POST", "/predict/batch", json.dumps({"rows": [TRIP, dict(TRIP, avg_speed_kmph=0.5)]}).encode())
+        # The scheduler observes its rows after delivering the results.
+        for _ in range(100):
+            _, health = await service.handle("GET", "/health", b"")
+            if health["inputs"]["rows"] == 3:
+                return health
+            await asyncio.sleep(0.01)
+        return health
+
+    health = asyncio.run(run())
+    assert health["inputs"]["rows"] == 3
+    assert health["inputs"]["out_of_range"] == 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import explain
+import fastpath
+
+
+def direct(compiled, stats, columns):
+    # Textbook OLS prediction interval from the stored statistics.
+    z = explain.model_design(compiled, columns)
+    zt = np.hstack([np.ones((len(z), 1)), z])
+    sigma2, _, _, t_crit = stats["explain_residual"]
+    se = np.sqrt(sigma2 * (1.0 + np.einsum("ij,jk,ik->i", zt, stats["explain_xtx_inv"], zt)))
+    contributions = compiled.coef * (z - stats["explain_mean"])
+    return se, t_crit, contributions
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    compiled = fastpath.get_compiled()
+    assert compiled.explain_stats is not None, "model.flat has no explain statistics; re-run train.py"
+    return compiled
+
+
+def test_explain_matches_sklearn_and_the_direct_interval(engine, compiled, data, monkeypatch):
+    monkeypatch.setattr(explain, "EXPLAIN_BLOCK", 512)  # several blocks, the last one partial
+    frame = data.sample(2000, replace=True, random_state=0).reset_index(drop=True)
+    frame = frame.astype({c: "category" for c in compiled.cat_columns})
+    explainer = explain.Explainer(compiled, compiled.explain_stats)
+    result = explainer.explain_frame(frame)
+
+    np.testing.assert_allclose(result["pred"], engine.predict(frame), rtol=0, atol=1e-9)
+    columns = {c: frame[c] for c in compiled.feature_columns}
+    se, t_crit, contributions = direct(compiled, compiled.explain_stats, columns)
+    np.testing.assert_allclose(result["se"], se, rtol=1e-9)
+    np.testing.assert_allclose(result["upper"] - result["pred"], t_crit * se, rtol=1e-9)
+    np.testing.assert_allclose(result["contributions"], contributions, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(result["contributions"].sum(axis=1) + explainer.baseline, result["pred"], rtol=0, atol=1e-9)
+
+    row = explainer.explain_row(data.iloc[0].to_dict())
+    one = explainer.explain_frame(data.head(1))
+    assert row["pred"] == pytest.approx(one["pred"][0], abs=1e-9)
+    assert row["se"] == pytest.approx(one["se"][0], rel=1e-12)
+
+
+def test_zero_coefficient_and_unknown_category():
+    rng = np.random.default_rng(0)
+    n = 500
+    frame = pd.DataFrame({
+        "a": rng.normal(10.0, 2.0, n),
+        "b": rng.normal(0.0, 1.0, n),
+        "c": rng.choice(["x", "y", "z"], n),
+    })
+    compiled = fastpath.CompiledPredictor(
+        ["a", "b", "c"], ["c"], [np.array(["x", "y", "z"])],
+        coef=[1.5, 0.0, -2.0], intercept=3.0, center=[10.0, 0.0], scale=[2.0, 1.0],
+    )
+    columns = {c: frame[c] for c in compiled.feature_columns}
+    pred = compiled.predict_columns(columns)
+    stats = explain.fit_stats(explain.model_design(compiled, columns), pred + rng.normal(0.0, 1.0, n), pred)
+    explainer = explain.Explainer(compiled, stats)
+
+    probe = pd.DataFrame({"a": [9.0, 30.0], "b": [5.0, -1.0], "c": ["y", "never-seen"]})
+    result = explainer.explain_frame(probe)
+    se, _, contributions = direct(compiled, stats, {c: probe[c] for c in compiled.feature_columns})
+    np.testing.assert_allclose(result["pred"], compiled.predict_frame(probe), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(result["se"], se, rtol=1e-9)
+    np.testing.assert_allclose(result["contributions"], contributions, rtol=0, atol=1e-12)
+    assert (result["contributions"][:, 1] == 0.0).all()
+    # b has no weight in the prediction but still widens the interval.
+    assert result["se"][0] > explainer.explain_row({"a": 9.0, "b": 0.0, "c": "y"})["se"]
+    assert explainer.explain_row(probe.iloc[1].to_dict())["se"] == pytest.approx(se[1], rel=1e-9)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import fastpath
+
+
+@pytest.fixture(scope="module")
+def compiled(engine):
+    return fastpath.CompiledPredictor.from_engine(engine)
+
+
+@pytest.mark.parametrize("dtype", [None, object, "category"])
+def test_predict_frame_matches_sklearn(engine, compiled, data, dtype):
+    frame = data.sample(2000, replace=True, random_state=0).reset_index(drop=True)
+    if dtype is not None:
+        frame = frame.astype({c: dtype for c in compiled.cat_columns})
+    np.testing.assert_allclose(compiled.predict_frame(frame), engine.predict(frame), rtol=0, atol=1e-9)
+
+
+def test_predict_row_matches_predict_frame(compiled, data):
+    frame = data.head(50)
+    rows = [compiled.predict_row(r) for r in frame.to_dict("records")]
+    np.testing.assert_allclose(rows, compiled.predict_frame(frame), rtol=0, atol=1e-9)
+
+
+def test_unknown_and_missing_categories_use_the_unknown_term(engine, compiled, data):
+    frame = data.head(3).copy()
+    col = compiled.cat_columns[0]
+    frame[col] = frame[col].astype(object)
+    frame.loc[0, col] = "never-seen"
+    frame.loc[1, col] = None
+    k = 0
+    terms = compiled.cat_terms(k, frame[col])
+    assert terms[0] == terms[1] == compiled.unknown_terms[k]
+    assert terms[2] == compiled.terms[k][frame.loc[2, col]]
+    np.testing.assert_allclose(compiled.predict_frame(frame), engine.predict(frame), rtol=0, atol=1e-9)
+
+
+def test_unknown_category_raises_without_unknown_value(compiled, data):
+    strict = fastpath.CompiledPredictor(
+        compiled.feature_columns, compiled.cat_columns, compiled.categories,
+        compiled.coef, compiled.intercept, compiled.center, compiled.scale, unknown_value=None,
+    )
+    frame = data.head(3).copy()
+    col = compiled.cat_columns[0]
+    frame[col] = frame[col].astype(object)
+    frame.loc[2, col] = "never-seen"
+    with pytest.raises(ValueError, match="never-seen"):
+        strict.predict_frame(frame)
+    with pytest.raises(ValueError, match="never-seen"):
+        strict.predict_row(frame.iloc[2].to_dict())
+
+
+def test_flat_export_matches_sklearn(engine, data):
+    import flatmodel
+
+    flat = flatmodel.load_current()
+    assert flat is not None, "model.flat is stale; re-run flatmodel.py export"
+    frame = data.sample(1000, random_state=1)
+    np.testing.assert_allclose(flat.predict_frame(frame), engine.predict(frame), rtol=0, atol=1e-9)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from history import HistoryStore
+from predictor import FUEL_TYPES, VEHICLE_TYPES
+
+START = datetime(2024, 1, 1)
+
+
+def trips(n, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        inputs = {
+            "distance_km": float(rng.integers(1, 50)),
+            "fuel_type": str(rng.choice(FUEL_TYPES)),
+            "vehicle_type": str(rng.choice(VEHICLE_TYPES)),
+            "passengers": int(rng.integers(1, 5)),
+            "payload_kg": float(rng.integers(0, 4)) * 100.0,
+            "avg_speed_kmph": float(rng.integers(20, 120)),
+        }
+        # Few distinct predictions, so sorting has ties to keep in order.
+        yield START + timedelta(seconds=i), inputs, float(rng.integers(0, 20))
+
+
+def filled(capacity, n):
+    store, kept = HistoryStore(capacity), []
+    for ts, inputs, pred in trips(n):
+        store.append(ts, inputs, pred)
+        kept = (kept + [(ts, inputs, pred)])[-capacity:]
+    return store, kept
+
+
+def test_eviction_at_capacity():
+    store, kept = filled(5, 5)
+    assert (len(store), store.evicted) == (5, 0)
+    store.append(START + timedelta(days=1), kept[0][1], 99.0)
+    assert (len(store), store.evicted) == (5, 1)
+    stamps = store.columns(newest_first=False)["timestamp"].tolist()
+    assert stamps == [np.datetime_as_string(np.datetime64(ts, "s")) for ts, _, _ in kept[1:]] + ["2024-01-02T00:00:00"]
+
+
+@pytest.mark.parametrize("n", [1, 7, 64, 1000])
+def test_running_stats_after_wraparound(n):
+    store, kept = filled(64, n)
+    preds = [p for _, _, p in kept]
+    assert store.count == len(preds)
+    assert store.total == pytest.approx(sum(preds))
+    assert (store.min, store.max) == (min(preds), max(preds))
+
+
+@pytest.mark.parametrize("sort_by", ["timestamp", "pred_kg", "passengers"])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("vehicle,fuel", [(None, None), ("Car", None), (None, "Diesel"), ("Car", "Diesel")])
+def test_pages_match_a_plain_list(sort_by, descending, vehicle, fuel):
+    store, kept = filled(100, 250)
+    rows = [
+        (ts, i, p)
+        for ts, i, p in kept
+        if vehicle in (None, i["vehicle_type"]) and fuel in (None, i["fuel_type"])
+    ]
+    key = {"timestamp": lambda r: 0, "pred_kg": lambda r: r[2], "passengers": lambda r: r[1]["passengers"]}[sort_by]
+    rows = sorted(rows, key=key)  # stable: ties stay chronological
+    if descending:
+        rows = rows[::-1]
+    expected = [np.datetime_as_string(np.datetime64(ts, "s")) for ts, _, _ in rows]
+
+    pages = []
+    for offset in range(0, len(expected) + 20, 20):
+        page, total = store.page(offset, 20, sort_by=sort_by, descending=descending, vehicle=vehicle, fuel=fuel)
+        assert total == len(expected)
+        pages.extend(page["timestamp"].tolist())
+    assert pages == expected
+
+
+def test_unknown_sort_column_raises():
+    with pytest.raises(ValueError, match="cannot sort"):
+        HistoryStore(4).query(sort_by="colour")
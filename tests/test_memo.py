@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from inference import ARTIFACT_FILES
+from memo import PredictionCache
+
+INPUTS = {
+    "distance_km": 12.34567,
+    "fuel_type": "Diesel",
+    "vehicle_type": "Car",
+    "passengers": 2,
+    "payload_kg": 0.0,
+    "avg_speed_kmph": 60.0,
+}
+
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    for name in ARTIFACT_FILES:
+        (tmp_path / name).write_bytes(b"v1")
+    return tmp_path
+
+
+def test_predict_sees_exact_inputs_and_hits_share_the_bucket(artifact_dir):
+    cache = PredictionCache(precision=2, artifact_dir=artifact_dir)
+    seen = []
+    predict = lambda **f: seen.append(f) or f["distance_km"]
+    assert cache.get_or_compute(INPUTS, predict) == 12.34567
+    assert seen == [INPUTS]
+    assert cache.get_or_compute(dict(INPUTS, distance_km=12.3461), predict) == 12.34567
+    assert cache.stats()["hits"] == 1
+
+
+def test_any_artifact_change_invalidates(artifact_dir):
+    cache = PredictionCache(artifact_dir=artifact_dir)
+    cache.get_or_compute(INPUTS, lambda **f: 1.0)
+    (artifact_dir / ARTIFACT_FILES[0]).write_bytes(b"version 2")
+    assert cache.get_or_compute(INPUTS, lambda **f: 2.0) == 2.0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_value_computed_across_an_invalidation_is_not_kept(artifact_dir):
+    cache = PredictionCache(artifact_dir=artifact_dir)
+
+    def stale(**f):
+        path = artifact_dir / ARTIFACT_FILES[-1]
+        path.write_bytes(b"version 2")
+        os.utime(path, ns=(1, 1))
+        return 1.0
+
+    assert cache.get_or_compute(INPUTS, stale) == 1.0
+    assert cache.stats()["size"] == 0
+    assert cache.get_or_compute(INPUTS, lambda **f: 2.0) == 2.0
+    assert cache.get_or_compute(INPUTS, lambda **f: 3.0) == 2.0
@@ -0,0 +1,15 @@
+import socket
+
+import metrics
+
+
+def test_start_http_server_runs_once_and_reports_bind_failure(monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "_server", None)
+    monkeypatch.setattr(metrics, "_server_started", False)
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        assert metrics.start_http_server(port) is None
+        assert metrics.start_http_server(port) is None
+    assert capsys.readouterr().err.count("cannot serve /metrics") == 1
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+import inference
+import online
+import train
+
+
+def test_incremental_updates_match_a_full_refit(data):
+    x, y, _, _ = train.split_features(data)
+    order = np.random.default_rng(0).permutation(len(x))
+    x, y = x.iloc[order].reset_index(drop=True), y.iloc[order].reset_index(drop=True)
+    state = None
+    for lo, hi in ((0, 1000), (1000, 4000), (4000, len(x))):
+        if state is None:
+            state = online.OnlineRegression.from_frame(x.iloc[lo:hi], y.iloc[lo:hi])
+        else:
+            state.update(x.iloc[lo:hi], y.iloc[lo:hi])
+        incremental = inference.InferenceEngine(*state.to_sklearn(), version="online").predict(x)
+        refit = inference.InferenceEngine(*online.full_refit(x.iloc[:hi], y.iloc[:hi]), version="refit").predict(x)
+        np.testing.assert_allclose(incremental, refit, rtol=0, atol=1e-6)
+
+
+def test_explain_stats_match_the_rows_they_were_fitted_on(tmp_path, data):
+    import explain
+    import flatmodel
+
+    x, y, _, _ = train.split_features(data)
+    state = online.OnlineRegression.from_frame(x.iloc[:1000], y.iloc[:1000]).update(x.iloc[1000:4000], y.iloc[1000:4000])
+    online.publish(state, str(tmp_path))
+    compiled = flatmodel.load_current(str(tmp_path))
+    columns = {c: x[c].to_numpy()[:4000] for c in compiled.feature_columns}
+    expected = explain.fit_stats(explain.model_design(compiled, columns), y.to_numpy()[:4000], compiled.predict_columns(columns))
+    for name, value in expected.items():
+        np.testing.assert_allclose(compiled.explain_stats[name], value, rtol=1e-6, atol=1e-12)
+
+
+@pytest.fixture
+def published(tmp_path, engine):
+    # Two generations published into an empty directory.
+    parts = (engine.encoder, engine.scaler, engine.model)
+    first = train.save_artifacts(*parts, out_dir=str(tmp_path))
+    second = train.save_artifacts(*parts, out_dir=str(tmp_path))
+    return tmp_path, first, second
+
+
+def test_publish_swaps_one_pointer_to_a_complete_generation(published):
+    out_dir, first, second = published
+    assert inference.resolve_artifact_dir(str(out_dir)) == second
+    assert sorted(os.listdir(second)) == sorted(inference.ARTIFACT_FILES + ("model.flat",))
+    assert not [n for n in os.listdir(out_dir / inference.GENERATIONS_DIR) if n.startswith(".")]
+    # A reader that resolved the old pointer still loads a consistent set.
+    assert inference.load_engine(first).version == inference.load_engine(second).version
+
+
+def test_engine_and_flat_export_follow_the_pointer(published, engine, data):
+    import flatmodel
+
+    out_dir, _, second = published
+    loaded = inference.get_engine(str(out_dir))
+    assert inference.artifact_signature(str(out_dir))[0] == second
+    compiled = flatmodel.load_current(str(out_dir))
+    assert compiled is not None
+    np.testing.assert_allclose(compiled.predict_frame(data), loaded.predict(data), rtol=0, atol=1e-9)
+
+
+def test_old_generations_are_pruned(tmp_path, engine):
+    for _ in range(train.KEEP_GENERATIONS + 2):
+        newest = train.save_artifacts(engine.encoder, engine.scaler, engine.model, out_dir=str(tmp_path))
+    kept = sorted(os.listdir(tmp_path / inference.GENERATIONS_DIR))
+    assert len(kept) == train.KEEP_GENERATIONS
+    assert os.path.basename(newest) == kept[-1]
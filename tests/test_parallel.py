@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+import batch
+import parallel
+from inference import DATA_PATH
+
+
+def test_parallel_output_matches_the_serial_scorer(tmp_path):
+    serial, pooled = tmp_path / "serial.csv", tmp_path / "pooled.csv"
+    batch.score_csv(DATA_PATH, str(serial))
+    # Small ranges, so rows are split across many parts and both workers.
+    summary = parallel.score_csv_parallel(DATA_PATH, str(pooled), workers=2, chunk_bytes=64 * 1024)
+    assert summary["chunks"] > 2
+
+    a, b = pd.read_csv(serial), pd.read_csv(pooled)
+    assert len(b) == summary["rows"] == len(pd.read_csv(DATA_PATH))
+    pd.testing.assert_frame_equal(a.drop(columns=batch.PRED_COLUMN), b.drop(columns=batch.PRED_COLUMN))
+    np.testing.assert_allclose(b[batch.PRED_COLUMN], a[batch.PRED_COLUMN], rtol=0, atol=1e-9)
+
+
+def test_split_ranges_cover_every_line_once(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("h\n" + "".join(f"{i}\n" for i in range(1000)))
+    ranges = parallel.split_ranges(str(path), chunk_bytes=97)
+    data = path.read_bytes()
+    assert ranges[0][1] == 2 and ranges[-1][2] == len(data)
+    assert all(prev[2] == cur[1] for prev, cur in zip(ranges, ranges[1:]))
+    assert b"".join(data[s:e] for _, s, e in ranges).decode().split() == [str(i) for i in range(1000)]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import predictor
+from predictor import FUEL_TYPES, VEHICLE_TYPES, dummy_predict, dummy_predict_batch
+
+
+def random_trips(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "distance_km": rng.uniform(0.0, 2000.0, n),
+        "fuel_type": rng.choice(FUEL_TYPES + ["Hydrogen"], n),
+        "vehicle_type": rng.choice(VEHICLE_TYPES + ["Boat"], n),
+        "passengers": rng.integers(0, 9, n),
+        "payload_kg": rng.uniform(0.0, 3000.0, n),
+        "avg_speed_kmph": rng.uniform(5.0, 300.0, n),
+    }
+
+
+def scalar(trips):
+    rows = zip(*(trips[f] for f in predictor.INPUT_FIELDS))
+    return np.array([dummy_predict(d, f, v, int(p), w, s) for d, f, v, p, w, s in rows])
+
+
+def test_batch_is_bit_identical_to_scalar():
+    # More rows than one block, so block boundaries are covered too.
+    trips = random_trips(predictor.BLOCK_ROWS + 123)
+    assert np.array_equal(dummy_predict_batch(**trips), scalar(trips))
+
+
+@pytest.mark.parametrize("kind", ["unicode", "object", "list", "codes"])
+def test_label_encodings_agree(kind):
+    trips = random_trips(500, seed=1)
+    expected = scalar(trips)
+    if kind == "object":
+        trips = dict(trips, fuel_type=trips["fuel_type"].astype(object), vehicle_type=trips["vehicle_type"].astype(object))
+    elif kind == "list":
+        trips = dict(trips, fuel_type=trips["fuel_type"].tolist(), vehicle_type=trips["vehicle_type"].tolist())
+    elif kind == "codes":
+        trips = dict(
+            trips,
+            fuel_type=predictor.category_codes(trips["fuel_type"].astype(object), FUEL_TYPES),
+            vehicle_type=predictor.category_codes(trips["vehicle_type"].astype(object), VEHICLE_TYPES),
+        )
+    assert np.array_equal(dummy_predict_batch(**trips), expected)
+
+
+def test_broadcasts_scalars_and_grids():
+    distances = np.linspace(1.0, 500.0, 7)[:, None]
+    speeds = np.linspace(10.0, 130.0, 5)[None, :]
+    got = dummy_predict_batch(distances, "Diesel", "Bus", 3, 250.0, speeds)
+    assert got.shape == (7, 5)
+    expected = [[dummy_predict(d, "Diesel", "Bus", 3, 250.0, s) for s in speeds[0]] for d in distances[:, 0]]
+    assert np.array_equal(got, expected)
+
+
+def test_missing_labels_use_the_defaults():
+    got = dummy_predict_batch([10.0, 10.0], np.array(["Petrol", None], dtype=object), "Car", 1, 0.0, 60.0)
+    assert got[0] == dummy_predict(10.0, "Petrol", "Car", 1, 0.0, 60.0)
+    assert got[1] == dummy_predict(10.0, None, "Car", 1, 0.0, 60.0)
+
+
+@pytest.mark.parametrize("code", [-2, len(FUEL_TYPES)])
+def test_out_of_range_codes_raise(code):
+    with pytest.raises(ValueError, match="category codes"):
+        dummy_predict_batch([10.0, 20.0], np.array([0, code]), "Car", 1, 0.0, 60.0)
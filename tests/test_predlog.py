@@ -0,0 +1,94 @@
+import pytest
+
+from predlog import PredictionLog
+
+FEATURES = {
+    "distance_km": 10.0,
+    "fuel_type": "Diesel",
+    "vehicle_type": "Car",
+    "passengers": 1,
+    "payload_kg": 0.0,
+    "avg_speed_kmph": 50.0,
+}
+
+
+def test_bad_batch_is_counted_and_writer_keeps_running(tmp_path):
+    log = PredictionLog(str(tmp_path / "log.db"), flush_interval_s=0.01)
+    log.log(FEATURES, 2.0, "v1", ts=1e20)  # datetime overflow in the rollup
+    assert log.flush(timeout=5.0)
+    assert (log.written, log.dropped, log.failed_batches) == (0, 1, 1)
+    assert "Error" in log.last_error
+
+    log.log(FEATURES, 2.0, "v1", ts=1_700_000_000)
+    assert log.flush(timeout=5.0)
+    assert log.written == 1
+    assert log.count() == 1
+
+
+def test_running_count_matches_the_table(tmp_path):
+    path = str(tmp_path / "log.db")
+    log = PredictionLog(path, flush_interval_s=0.01)
+    for i, vehicle in enumerate(["Car", "Car", "Van"]):
+        log.log(dict(FEATURES, vehicle_type=vehicle), 1.0, "v1", ts=1_700_000_000 + i)
+    assert log.flush(timeout=5.0)
+    assert log.count() == 3
+    assert log.count(vehicle_type="Car") == 2
+    assert log.count(vehicle_type="Van", fuel_type="Petrol") == 0
+    assert log.count(since=1_700_000_001) == 2
+
+    reopened = PredictionLog(path)
+    assert reopened.count(vehicle_type="Car", fuel_type="Diesel") == 2
+
+
+def filled_log(tmp_path, n=400):
+    import random
+
+    rnd = random.Random(0)
+    log = PredictionLog(str(tmp_path / "log.db"), flush_interval_s=0.01)
+    for i in range(n):
+        features = dict(FEATURES, vehicle_type=rnd.choice(["Car", "Van", "Bus"]), fuel_type=rnd.choice(["Diesel", "Petrol"]))
+        # Several rows share a timestamp; a day boundary every 100 rows.
+        log.log(features, rnd.uniform(0.5, 50.0), "v1", ts=1_700_000_000 + (i // 3) * 2600)
+    assert log.flush(timeout=10.0)
+    return log
+
+
+def test_keyset_pages_walk_the_log_newest_first(tmp_path):
+    log = filled_log(tmp_path)
+    for filters in ({}, {"vehicle_type": "Car"}, {"vehicle_type": "Car", "fuel_type": "Diesel"}):
+        expected = log._reader().execute(
+            "SELECT id FROM predictions" + log._where(**filters)[0] + " ORDER BY ts DESC, id DESC", log._where(**filters)[1]
+        ).fetchall()
+        seen, before = [], None
+        while True:
+            rows = log.recent(17, before, **filters)
+            if not rows:
+                break
+            seen.extend(r["id"] for r in rows)
+            before = (rows[-1]["ts"], rows[-1]["id"])
+        assert seen == [row[0] for row in expected]
+        # A jump lands where walking page by page does.
+        assert log.recent(17, log.cursor(34, **filters), **filters) == log.recent(17, log.cursor(17, log.cursor(17, **filters), **filters), **filters)
+        assert log.cursor(len(expected) + 1, **filters) is None
+
+
+def test_rollup_aggregates_match_the_predictions_table(tmp_path):
+    log = filled_log(tmp_path)
+    conn = log._reader()
+    n, total, lo, hi = conn.execute("SELECT COUNT(*), SUM(pred_kg), MIN(pred_kg), MAX(pred_kg) FROM predictions").fetchone()
+    summary = log.summary()
+    assert (summary["count"], summary["min"], summary["max"]) == (n, lo, hi)
+    assert summary["total"] == pytest.approx(total)
+
+    direct = conn.execute(
+        "SELECT vehicle_type, COUNT(*), SUM(pred_kg), MIN(pred_kg), MAX(pred_kg) FROM predictions WHERE fuel_type = 'Diesel' GROUP BY vehicle_type ORDER BY vehicle_type"
+    ).fetchall()
+    rows = log.breakdown("vehicle_type", fuel_type="Diesel")
+    assert [(r["vehicle_type"], r["count"], r["min"], r["max"]) for r in rows] == [(v, c, a, b) for v, c, _, a, b in direct]
+    assert [r["total"] for r in rows] == pytest.approx([t for _, _, t, _, _ in direct])
+
+    days = conn.execute(
+        "SELECT strftime('%Y-%m-%d', ts, 'unixepoch'), COUNT(*) FROM predictions GROUP BY 1 ORDER BY 1"
+    ).fetchall()
+    assert [(r["day"], r["count"]) for r in log.breakdown("day")] == days
+    assert len(days) > 1
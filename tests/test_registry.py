@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+import pytest
+
+import registry
+import train
+
+
+@pytest.fixture
+def source(tmp_path, engine):
+    return train.save_artifacts(engine.encoder, engine.scaler, engine.model, out_dir=str(tmp_path / "src"))
+
+
+def test_concurrent_publishes_keep_every_version(tmp_path, source):
+    root = str(tmp_path / "registry")
+    errors = []
+
+    def publish():
+        try:
+            registry.publish(source, root=root)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=publish) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    manifest = registry.read_manifest(root)
+    assert sorted(manifest["versions"]) == ["v1", "v2", "v3", "v4"]
+    assert sorted(os.listdir(os.path.join(root, registry.VERSIONS_DIR))) == ["v1", "v2", "v3", "v4"]
+    assert not os.path.exists(os.path.join(root, registry.LOCK_FILE))
+
+
+def test_published_versions_carry_explain_stats(tmp_path, source, engine):
+    import flatmodel
+
+    # The source export has no statistics, so publish rebuilds them...
+    root = str(tmp_path / "registry")
+    assert flatmodel.load_current(source).explain_stats is None
+    rebuilt = flatmodel.load_current(registry.version_dir(registry.publish(source, root=root), root)).explain_stats
+    assert rebuilt is not None
+
+    # ...and copies them when it has (doubled variance marks the copy).
+    stats = dict(rebuilt, explain_residual=rebuilt["explain_residual"] * [2.0, 1.0, 1.0, 1.0])
+    with_stats = train.save_artifacts(engine.encoder, engine.scaler, engine.model, out_dir=str(tmp_path / "src2"), explain_stats=stats)
+    copied = flatmodel.load_current(registry.version_dir(registry.publish(with_stats, root=root), root)).explain_stats
+    for name, value in stats.items():
+        assert (copied[name] == value).all()
+
+
+def test_held_lock_times_out(tmp_path):
+    root = str(tmp_path)
+    with registry.manifest_lock(root):
+        with pytest.raises(TimeoutError, match="manifest.lock"):
+            with registry.manifest_lock(root, timeout=0.1):
+                pass
+
+
+def test_manifest_stat_is_rate_limited(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    registry.write_manifest(dict(registry.empty_manifest(), current="v1", versions={"v1": {}}), root)
+    monkeypatch.setattr(registry, "CHECK_INTERVAL_S", 60.0)
+    assert registry.current_version(root) == "v1"
+
+    # Another process activating v2: not seen until the interval passes.
+    manifest = dict(registry.empty_manifest(), current="v2", versions={"v1": {}, "v2": {}})
+    with open(registry.manifest_path(root) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(registry.manifest_path(root) + ".tmp", registry.manifest_path(root))
+    assert registry.current_version(root) == "v1"
+    monkeypatch.setattr(registry, "CHECK_INTERVAL_S", 0.0)
+    assert registry.current_version(root) == "v2"
+
+
+def test_shadow_times_the_same_call_as_the_primary(tmp_path, source, monkeypatch):
+    import time
+
+    import explain
+
+    root = str(tmp_path / "registry")
+    registry.publish(source, root=root)
+    registry.set_candidate(registry.publish(source, root=root), root)
+    calls = []
+    explain_row = explain.Explainer.explain_row
+    monkeypatch.setattr(explain.Explainer, "explain_row", lambda self, row: calls.append(row) or explain_row(self, row))
+
+    shadow = registry.ShadowScorer(rate=1.0, root=root)
+    _, compiled = registry.get_predictor(root=root)
+    row = {c: 1.0 for c in compiled.num_columns}
+    row.update((c, cats[0]) for c, cats in zip(compiled.cat_columns, compiled.categories))
+    scored = shadow.scored.value
+    assert shadow.offer(row, compiled.predict_row(row), 1e-5)
+    assert shadow.offer(row, compiled.predict_row(row), 1e-5, explained=True)
+    deadline = time.monotonic() + 10.0
+    while shadow.scored.value < scored + 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert shadow.scored.value == scored + 2
+    assert len(calls) == 1
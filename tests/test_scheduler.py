@@ -0,0 +1,44 @@
+import threading
+
+import numpy as np
+import pytest
+
+from predictor import dummy_predict
+from scheduler import BatchScheduler, SchedulerFull
+
+TRIP = {"distance_km": 42.0, "fuel_type": "Diesel", "vehicle_type": "Bus", "passengers": 3, "payload_kg": 100.0, "avg_speed_kmph": 70.0}
+
+
+def test_predictions_match_scalar():
+    scheduler = BatchScheduler(name="test_scalar")
+    rows = [dict(TRIP, distance_km=float(d)) for d in range(1, 40)]
+    futures = [scheduler.submit(row) for row in rows]
+    assert [f.result(timeout=5) for f in futures] == [dummy_predict(**row) for row in rows]
+
+
+def test_submit_refuses_beyond_max_pending():
+    release = threading.Event()
+
+    def slow(rows):
+        release.wait(5)
+        return np.zeros(len(rows))
+
+    scheduler = BatchScheduler(predict_batch=slow, max_batch=1, max_pending=2, name="test_pending")
+    first, second = scheduler.submit(TRIP), scheduler.submit(TRIP)
+    with pytest.raises(SchedulerFull):
+        scheduler.submit(TRIP, block=False)
+    with pytest.raises(SchedulerFull):
+        scheduler.submit(TRIP, timeout=0.01)
+    release.set()
+    assert first.result(timeout=5) == second.result(timeout=5) == 0.0
+    assert scheduler.submit(TRIP, timeout=5).result(timeout=5) == 0.0
+    assert scheduler.rejected.value == 2
+
+
+def test_scheduler_releases_slots_after_failures():
+    def broken(rows):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(predict_batch=broken, max_pending=2, name="test_broken")
+    for _ in range(5):
+        assert isinstance(scheduler.submit(TRIP, timeout=1).exception(timeout=1), RuntimeError)
@@ -0,0 +1,24 @@
+import math
+
+import numpy as np
+
+import selection
+
+
+def test_two_fold_smoke(engine):
+    report = selection.select(folds=2, models=["linear", "ridge"], encoders=["ordinal"], scalers=["robust"], n_jobs=1, use_cache=False)
+    assert [e["cv_r2"] for e in report] == sorted((e["cv_r2"] for e in report), reverse=True)
+    assert {e["candidate"] for e in report} == {"linear/ordinal/robust", "ridge/ordinal/robust"}
+    for entry in report:
+        for key in ("cv_r2", "cv_mae", "cv_rmse", "holdout_r2", "row_p50_us", "row_p99_us", "batch_rows_per_s"):
+            assert math.isfinite(entry[key]), key
+        assert 0.5 < entry["cv_r2"] <= 1.0
+        assert entry["row_p50_us"] <= entry["row_p99_us"]
+
+    # linear/ordinal/robust is the notebook's chain; its holdout refit must
+    # reproduce the shipped model's score on the same split.
+    from sklearn.metrics import r2_score
+
+    _, x_test, _, y_test, _, _ = selection.training_split()
+    linear = next(e for e in report if e["candidate"] == "linear/ordinal/robust")
+    assert np.isclose(linear["holdout_r2"], r2_score(y_test, engine.predict(x_test)), atol=1e-9)
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import numpy as np
+
+from predictor import dummy_predict
+from service import PredictionService
+
+TRIP = {"distance_km": 42.0, "fuel_type": "Diesel", "vehicle_type": "Bus", "passengers": 3, "payload_kg": 100.0, "avg_speed_kmph": 70.0}
+
+
+def test_concurrent_requests_fill_batches_beyond_the_old_concurrency_cap():
+    service = PredictionService(max_batch=256, max_wait_ms=200)
+
+    async def run():
+        body = json.dumps(TRIP).encode()
+        return await asyncio.gather(*(service.handle("POST", "/predict", body) for _ in range(256)))
+
+    batches_before = service.scheduler.batches.value
+    results = asyncio.run(run())
+    assert all(status == 200 for status, _ in results)
+    assert results[0][1]["pred_kg"] == dummy_predict(**TRIP)
+    assert service.scheduler.batches.value - batches_before <= 2
+
+
+def test_full_scheduler_answers_503():
+    service = PredictionService(max_pending=1)
+    service.scheduler._slots.acquire()
+    status, payload = asyncio.run(service.handle("POST", "/predict", json.dumps(TRIP).encode()))
+    assert status == 503
+    assert "pending" in payload["error"]
+
+
+def test_malformed_content_length_is_a_400():
+    service = PredictionService()
+
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        await writer.drain()
+        status_line = await reader.readline()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return status_line
+
+    assert asyncio.run(run()).split()[1] == b"400"
+
+
+def test_batch_route_matches_scalar():
+    service = PredictionService()
+    rows = [dict(TRIP, distance_km=d) for d in np.linspace(1.0, 900.0, 50)]
+    status, payload = asyncio.run(service.handle("POST", "/predict/batch", json.dumps({"rows": rows}).encode()))
+    assert status == 200
+    assert [p["pred_kg"] for p in payload["predictions"]] == [dummy_predict(**r) for r in rows]
+
+
+def test_batch_rows_share_the_pending_budget():
+    service = PredictionService(max_pending=10)
+    body = json.dumps({"rows": [TRIP] * 6}).encode()
+    for _ in range(5):
+        service.scheduler._slots.acquire()
+    status, payload = asyncio.run(service.handle("POST", "/predict/batch", body))
+    assert status == 503
+    assert service.scheduler.rejected.value >= 6
+
+    # The failed reservation gave back the slots it took.
+    for _ in range(5):
+        service.scheduler._slots.release()
+    status, payload = asyncio.run(service.handle("POST", "/predict/batch", body))
+    assert (status, payload["count"]) == (200, 6)
+    status, _ = asyncio.run(service.handle("POST", "/predict/batch", json.dumps({"rows": [TRIP] * 11}).encode()))
+    assert status == 413
+
+
+def test_batch_is_scored_off_the_event_loop():
+    import threading
+
+    service = PredictionService()
+    loop_thread = []
+    score = service._score_batch
+    service._score_batch = lambda *args: loop_thread.append(threading.current_thread()) or score(*args)
+
+    async def run():
+        loop_thread.append(threading.current_thread())
+        return await service.handle("POST", "/predict/batch", json.dumps({"rows": [TRIP]}).encode())
+
+    status, _ = asyncio.run(run())
+    assert status == 200
+    assert loop_thread[0] is not loop_thread[1]
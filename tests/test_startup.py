@@ -0,0 +1,29 @@
+import importlib
+import sys
+
+import startup
+
+
+def test_finder_times_nested_imports_and_restores_loaders(tmp_path, monkeypatch):
+    (tmp_path / "co2_outer.py").write_text("import co2_inner\n")
+    (tmp_path / "co2_inner.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    startup.install()
+    try:
+        outer = importlib.import_module("co2_outer")
+    finally:
+        startup.uninstall()
+        sys.modules.pop("co2_outer", None)
+        sys.modules.pop("co2_inner", None)
+    assert startup._finder not in sys.meta_path
+    records = {r["module"]: r for r in startup.import_records()}
+    assert records["co2_outer"]["depth"] < records["co2_inner"]["depth"]
+    assert records["co2_outer"]["cumulative_s"] >= records["co2_inner"]["cumulative_s"]
+    assert type(outer.__loader__).__name__ == "SourceFileLoader"
+    assert outer.__spec__.loader is outer.__loader__
+
+
+def test_only_the_first_run_starts_at_import(monkeypatch):
+    monkeypatch.setattr(startup, "_first_run", True)
+    assert startup.run_timer().started == startup.IMPORTED_AT
+    assert startup.run_timer().started > startup.IMPORTED_AT
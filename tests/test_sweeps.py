@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import sweeps
+from predictor import FUEL_TYPES, VEHICLE_TYPES, dummy_predict
+
+BASE = {"distance_km": 25.0, "fuel_type": "Petrol", "vehicle_type": "Car", "passengers": 2, "payload_kg": 150.0, "avg_speed_kmph": 70.0}
+
+
+@pytest.mark.parametrize("field", list(sweeps.SWEEP_FIELDS))
+def test_sweep_matches_the_scalar_predictor_at_every_point(field):
+    result = sweeps.sweep(BASE, field, points=40)
+    assert result["pred"].shape == (len(VEHICLE_TYPES), len(FUEL_TYPES), len(result["values"]))
+    for i, vehicle in enumerate(VEHICLE_TYPES):
+        for j, fuel in enumerate(FUEL_TYPES):
+            expected = [
+                dummy_predict(**dict(BASE, vehicle_type=vehicle, fuel_type=fuel, **{field: value}))
+                for value in result["values"].tolist()
+            ]
+            np.testing.assert_allclose(result["pred"][i, j], expected, rtol=1e-12, atol=0)
+
+
+def test_repeated_sweep_is_a_cache_hit():
+    sweeps.clear_cache()
+    first = sweeps.sweep(BASE, "payload_kg", 0.0, 800.0, 100, ["Car", "Truck"], ["Diesel"])
+    hits = sweeps.cache_info().hits
+    # Different values for the swept field and the categoricals share a key.
+    second = sweeps.sweep(dict(BASE, payload_kg=999.0, vehicle_type="Bus"), "payload_kg", 0, 800, 100, ["Car", "Truck"], ["Diesel"])
+    assert sweeps.cache_info().hits == hits + 1
+    assert second["pred"] is first["pred"]
+    assert not second["pred"].flags.writeable
+    sweeps.sweep(dict(BASE, distance_km=26.0), "payload_kg", 0.0, 800.0, 100, ["Car", "Truck"], ["Diesel"])
+    assert sweeps.cache_info().hits == hits + 1
+
+
+def test_unknown_categories_are_rejected():
+    with pytest.raises(ValueError, match="Hovercraft"):
+        sweeps.sweep(BASE, "avg_speed_kmph", vehicles=["Hovercraft"])
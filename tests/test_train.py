@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import train
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    path = tmp_path / "first_project.csv"
+    shutil.copy(train.DATA_PATH, path)
+    return str(path)
+
+
+def parse(path):
+    return pd.read_csv(path, dtype={c: t for c, t in train.CSV_DTYPES.items() if t is not str})
+
+
+def test_cached_frame_is_identical_to_a_fresh_parse(csv_copy, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = train.load_dataset(csv_copy, cache_dir)
+    cached = train.load_dataset(csv_copy, cache_dir)
+    expected = parse(csv_copy)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(cached, expected)
+
+
+def test_missing_strings_survive_the_cache(csv_copy, tmp_path):
+    df = parse(csv_copy)
+    df.loc[[0, 5], "Transmission"] = None
+    df.to_csv(csv_copy, index=False)
+    cache_dir = str(tmp_path / "cache")
+    train.load_dataset(csv_copy, cache_dir)
+    pd.testing.assert_frame_equal(train.load_dataset(csv_copy, cache_dir), parse(csv_copy))
+
+
+def test_stat_match_skips_the_hash_and_touch_keeps_the_cache(csv_copy, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    train.load_dataset(csv_copy, cache_dir)
+    digests = []
+    real_digest = train.source_digest
+    monkeypatch.setattr(train, "source_digest", lambda p: digests.append(p) or real_digest(p))
+    monkeypatch.setattr(train.pd, "read_csv", lambda *a, **k: pytest.fail("cache should have been used"))
+
+    train.load_dataset(csv_copy, cache_dir)
+    assert digests == []
+
+    st = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    train.load_dataset(csv_copy, cache_dir)
+    train.load_dataset(csv_copy, cache_dir)
+    assert len(digests) == 1
+
+
+def test_changed_content_is_parsed_again(csv_copy, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    train.load_dataset(csv_copy, cache_dir)
+    df = parse(csv_copy)
+    df.loc[0, "Cylinders"] = 12
+    df.to_csv(csv_copy, index=False)
+    assert train.load_dataset(csv_copy, cache_dir).loc[0, "Cylinders"] == 12